@@ -3,7 +3,10 @@
 from flask import Flask
 from flask_cors import CORS
 
-from app.db import init_db, db_info
+from app.config import CORS_ORIGINS
+from app.db import init_db, db_info, SessionLocal
+from app.h2h import backfill_pair_keys
+from app.stats import backfill_derived_columns
 from app.routes.admin import bp_admin
 from app.routes.public import bp_public
 from app.routes.predict import bp_predict
@@ -20,21 +23,20 @@ def create_app():
     # ---- CORS ----
     CORS(
         app,
-        resources={
-            r"/api/*": {
-                "origins": [
-                    "https://predizioni-sito.netlify.app",
-                    "http://localhost:5500",
-                    "http://127.0.0.1:5500",
-                ]
-            }
-        },
+        resources={r"/api/*": {"origins": CORS_ORIGINS}},
     )
 
     # ---- Database ----
     init_db()
     db_info()
 
+    session = SessionLocal()
+    try:
+        backfill_pair_keys(session)
+        backfill_derived_columns(session)
+    finally:
+        session.close()
+
     # ---- Routes (Blueprint) ----
     app.register_blueprint(bp_admin)
     app.register_blueprint(bp_public)
@@ -0,0 +1,76 @@
+# backend/app/archive.py
+"""
+Archivio delle risposte grezze di football-data.org.
+
+Ogni payload viene salvato gzip, indirizzato per contenuto (sha256 dei byte
+originali), in objects/<2 char>/<sha>.json.gz: la stessa risposta scaricata due
+volte occupa spazio una volta sola. Ogni fetch aggiunge comunque una riga a
+index.jsonl con i metadati (quando, cosa, parametri, sha, dimensioni), cosi'
+il replay puo' rigiocare le risposte nell'ordine in cui sono arrivate.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from app.db import utcnow_iso
+
+ARCHIVE_DIR = Path(os.getenv("RAW_ARCHIVE_DIR", Path(__file__).resolve().parents[1] / "raw_archive"))
+INDEX_FILE = "index.jsonl"
+
+
+def _object_path(root: Path, sha: str) -> Path:
+    return root / "objects" / sha[:2] / f"{sha}.json.gz"
+
+
+def archive_payload(raw: bytes, kind: str, params: dict, root: Path | None = None) -> str:
+    """Salva il payload (se nuovo) e registra il fetch nell'indice. Ritorna lo sha256."""
+    root = Path(root or ARCHIVE_DIR)
+    sha = hashlib.sha256(raw).hexdigest()
+    path = _object_path(root, sha)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+    entry = {
+        "fetched_at": utcnow_iso(),
+        "kind": kind,
+        "params": params,
+        "sha256": sha,
+        "size": len(raw),
+        "stored_size": path.stat().st_size,
+    }
+    with open(root / INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, sort_keys=True) + "\n")
+    return sha
+
+
+def iter_entries(root: Path | None = None):
+    """Righe dell'indice in ordine di fetch (quelle troncate vengono saltate)."""
+    index = Path(root or ARCHIVE_DIR) / INDEX_FILE
+    if not index.exists():
+        return
+    with open(index, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def load_payload(sha: str, root: Path | None = None) -> dict:
+    """Payload decompresso; verifica che il contenuto corrisponda allo sha."""
+    with gzip.open(_object_path(Path(root or ARCHIVE_DIR), sha), "rb") as f:
+        raw = f.read()
+    if hashlib.sha256(raw).hexdigest() != sha:
+        raise ValueError(f"payload corrotto: {sha}")
+    return json.loads(raw)
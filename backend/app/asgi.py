@@ -0,0 +1,284 @@
+# backend/app/asgi.py
+"""
+Entry point ASGI alternativo (Starlette + SQLAlchemy async).
+
+Le route di lettura piu' usate dal frontend (teams, matches, stats, standings,
+h2h, predict) hanno handler async su AsyncSession (aiosqlite / asyncpg): mentre
+una query e' in attesa il processo serve altre richieste. La logica di calcolo
+e' la stessa dei blueprint Flask, eseguita con AsyncSession.run_sync.
+Tutto il resto (admin, export, leaderboard, ...) passa all'app Flask montata
+come fallback WSGI, quindi l'entry point e' sostituibile a wsgi.py.
+Le risposte passano dalla stessa cache (app.cache) e con le stesse chiavi
+delle route Flask.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import create_app, stats
+from app.cache import MISS, get_cache
+from app.config import CORS_ORIGINS
+from app.db import DATABASE_URL
+from app.h2h import head_to_head
+from app.models import Match
+from app.predictors.rules_v1 import predict_with_session, weights_error
+from app.routes.predict import parse_debug, prediction_tags
+from app.routes.public import MAX_BATCH_TEAMS
+from app.team_index import get_team_index
+from app.versioning import TAG_ALL, pair_tag, tag_versions
+
+
+def async_database_url(url: str) -> str:
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+async_engine = create_async_engine(async_database_url(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def _int_arg(request, name):
+    raw = request.query_params.get(name)
+    if raw is None:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
+async def _run(fn, *args, **kwargs):
+    """Esegue una funzione sync (session, ...) dentro una AsyncSession."""
+    async with AsyncSessionLocal() as session:
+        return await session.run_sync(fn, *args, **kwargs)
+
+
+_inflight = {}
+
+
+async def _cached(namespace, parts, tags, compute):
+    """
+    Come Cache.get_or_compute, con compute async; I/O di cache nel threadpool.
+    Single-flight nel event loop: le richieste identiche concorrenti aspettano
+    lo stesso Future invece di rifare il calcolo.
+    """
+    cache = get_cache()
+    value = await run_in_threadpool(cache.get, namespace, parts)
+    if value is not MISS:
+        return value
+
+    key = cache.make_key(namespace, parts)
+    pending = _inflight.get(key)
+    if pending is not None:
+        await asyncio.wait([pending])
+        if not pending.cancelled():
+            return pending.result()
+        # la richiesta che calcolava e' stata cancellata: si calcola qui
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        versions = await run_in_threadpool(tag_versions)
+        value = await compute()
+        await run_in_threadpool(
+            cache.set, namespace, parts, tags(value) if callable(tags) else tags, value, None, versions,
+        )
+        future.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # segnata come letta: nessun warning se nessuno aspettava
+        raise
+    finally:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+async def get_teams(request):
+    q = request.query_params
+    prefix = (q.get("q") or "").strip()
+    idx = await run_in_threadpool(get_team_index)
+    if prefix:
+        teams = idx.search(prefix, q.get("competition"), _int_arg(request, "season"), limit=_int_arg(request, "limit"))
+    else:
+        teams = idx.teams(q.get("competition"), _int_arg(request, "season"))
+    return JSONResponse({"teams": teams})
+
+
+async def get_matches(request):
+    return JSONResponse(await _cached("matches", [], [TAG_ALL], _upcoming_matches))
+
+
+async def _upcoming_matches():
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                Match.id, Match.competition, Match.season, Match.date,
+                Match.status, Match.home_team, Match.away_team,
+            )
+            .where(Match.status != "FINISHED")
+            .order_by(Match.date.asc())
+        )
+        rows = result.all()
+
+    return {"matches": [
+        {
+            "id": r.id,
+            "competition": r.competition,
+            "season": r.season,
+            "date": r.date or None,
+            "status": r.status,
+            "home_team": r.home_team,
+            "away_team": r.away_team,
+        }
+        for r in rows
+    ]}
+
+
+async def get_stats(request):
+    team = request.query_params.get("team")
+    competition = request.query_params.get("competition")
+    season = _int_arg(request, "season")
+
+    if not team:
+        return JSONResponse({"error": "Parametro 'team' obbligatorio"}, status_code=400)
+    try:
+        sections, lines = _stats_options(request)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    docs = await _team_stats([team], competition, season, sections, lines)
+    return JSONResponse(docs[team])
+
+
+def _stats_options(request):
+    q = request.query_params
+    return stats.parse_sections(q.get("sections") or q.get("fields")), stats.parse_lines(q.get("lines"))
+
+
+async def _team_stats(teams, competition, season, sections=None, lines=None):
+    return await _cached(
+        "stats", [teams, competition, season, sections, lines], [pair_tag(competition, season)],
+        lambda: _run(stats.team_stats, teams, competition, season, sections, lines),
+    )
+
+
+async def get_stats_batch(request):
+    teams = stats.parse_teams_param(request.query_params.get("teams"))
+    competition = request.query_params.get("competition")
+    season = _int_arg(request, "season")
+
+    if not teams:
+        return JSONResponse({"error": "Parametro 'teams' obbligatorio"}, status_code=400)
+    if len(teams) > MAX_BATCH_TEAMS:
+        return JSONResponse({"error": f"Massimo {MAX_BATCH_TEAMS} squadre per richiesta"}, status_code=400)
+    try:
+        sections, lines = _stats_options(request)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    docs = await _team_stats(teams, competition, season, sections, lines)
+    return JSONResponse({
+        "competition": competition or "All",
+        "season": season if season is not None else "All",
+        "teams": docs,
+    })
+
+
+async def standings_snapshot(request):
+    competition = request.query_params.get("competition")
+    season = _int_arg(request, "season")
+    date_limit = request.query_params.get("date")
+
+    if not competition or season is None or not date_limit:
+        return JSONResponse({"error": "Servono competition, season, date"}, status_code=400)
+
+    rows = await _cached(
+        "standings", [competition, season, date_limit], [pair_tag(competition, season)],
+        lambda: _run(stats.load_standings, competition, season, date_limit),
+    )
+    return JSONResponse({"competition": competition, "season": season, "date": date_limit, "standings": rows})
+
+
+async def get_h2h(request):
+    home = request.query_params.get("home")
+    away = request.query_params.get("away")
+    last_n = _int_arg(request, "last")
+
+    if not home or not away:
+        return JSONResponse({"error": "Servono home, away"}, status_code=400)
+
+    last_n = max(0, 10 if last_n is None else last_n)
+    out = await _cached("h2h", [home, away, last_n], [TAG_ALL], lambda: _run(head_to_head, home, away, last_n=last_n))
+    return JSONResponse(out)
+
+
+async def predict_match(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    data = data or {}
+    match_id = data.get("match_id")
+    model = data.get("model", "rules_v1")
+    weights = data.get("weights")
+    debug = parse_debug(data.get("debug", request.query_params.get("debug")))
+
+    if not match_id:
+        return JSONResponse({"error": "match_id obbligatorio"}, status_code=400)
+    if model not in ("rules_v1", "rules"):
+        return JSONResponse({"error": f"model non supportato: {model}"}, status_code=400)
+    error = weights_error(weights)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    out = await _cached(
+        "predict", [int(match_id), weights, debug], prediction_tags,
+        lambda: _run(predict_with_session, int(match_id), weights, debug),
+    )
+    return JSONResponse(out, status_code=(200 if out.get("ok") else 400))
+
+
+def _route(path, endpoint, method="GET"):
+    # CORS per route: il fallback Flask ha gia' flask-cors, niente header doppi
+    return Route(
+        path,
+        endpoint,
+        methods=[method, "OPTIONS"],
+        middleware=[Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_methods=["*"], allow_headers=["*"])],
+    )
+
+
+def create_asgi_app():
+    flask_app = create_app()
+
+    routes = [
+        _route("/api/teams", get_teams),
+        _route("/api/matches", get_matches),
+        _route("/api/stats", get_stats),
+        _route("/api/stats/batch", get_stats_batch),
+        _route("/api/standings", standings_snapshot),
+        _route("/api/h2h", get_h2h),
+        _route("/api/predict", predict_match, method="POST"),
+        # tutto il resto: app Flask esistente
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ]
+
+    return Starlette(routes=routes)
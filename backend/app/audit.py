@@ -0,0 +1,376 @@
+# backend/app/audit.py
+"""
+Audit incrementale della qualita' dei dati, da lanciare dopo ogni import.
+
+Controlla solo le righe cambiate dall'ultimo giro (matches / match_context con
+updated_at >= marker in app_meta) e le coppie (competition, season) che le
+contengono, sempre con query su indice: updated_at, PK, (external_source,
+external_id), (competition, season). Niente COUNT o GROUP BY su tutta la tabella.
+
+Anomalie per partita (sostituite a ogni nuovo controllo della partita):
+  duplicate_external      piu' righe con lo stesso (external_source, external_id);
+                          le partite del gruppo si ricontrollano a ogni giro
+  finished_missing_score  FINISHED senza home_goals / away_goals
+  context_missing         FINISHED con season ma senza riga match_context
+  context_stale           match_context che non corrisponde piu' alla partita
+  context_orphan          match_context senza partita
+Anomalie per coppia (sostituite a ogni nuovo controllo della coppia):
+  season_team_count       numero di squadre dispari o diverso dalla stagione precedente
+  team_match_count        squadra con piu' partite di un doppio girone
+  context_team_count      total_teams del context diverso dalle squadre con partite FINISHED
+
+Le anomalie stanno in audit_findings, servite da GET /api/admin/audit.
+Il primo giro (o full=True) controlla tutto, a blocchi per PK.
+"""
+
+import json
+import time
+
+from sqlalchemy import delete, func, insert, select, union_all
+
+from app.db import SessionLocal, utcnow_iso
+from app.models import AppMeta, AuditFinding, Match, MatchContext
+
+AUDIT_BATCH = 500
+
+MATCHES_MARK_KEY = "audit_matches_mark"
+CONTEXT_MARK_KEY = "audit_context_mark"
+LAST_RUN_KEY = "audit_last_run"
+
+MATCH_KINDS = ("finished_missing_score", "context_missing", "context_stale")
+PAIR_KINDS = ("season_team_count", "team_match_count", "context_team_count")
+
+_MATCH_COLUMNS = (
+    Match.id, Match.external_source, Match.external_id, Match.competition, Match.season,
+    Match.date, Match.status, Match.home_team, Match.away_team, Match.home_goals, Match.away_goals,
+)
+_CONTEXT_IDENTITY = ("competition", "season", "date", "home_team", "away_team")
+
+
+def _get_meta(session, key):
+    row = session.get(AppMeta, key)
+    return row.value if row is not None else None
+
+
+def _set_meta(session, key, value):
+    row = session.get(AppMeta, key)
+    if row is None:
+        session.add(AppMeta(key=key, value=value))
+    else:
+        row.value = value
+
+
+def _finding(kind, match_id=None, competition=None, season=None, **detail):
+    return {
+        "kind": kind,
+        "match_id": match_id,
+        "competition": competition,
+        "season": season,
+        "detail": json.dumps(detail, sort_keys=True, default=str) if detail else None,
+        "found_at": utcnow_iso(),
+    }
+
+
+def _changed_batches(session, columns, id_col, updated_col, mark):
+    """Righe con updated_at >= mark (tutte se mark e' None), a blocchi in ordine di PK."""
+    last_id = None
+    while True:
+        q = select(*columns)
+        if mark is not None:
+            q = q.where(updated_col >= mark)
+        if last_id is not None:
+            q = q.where(id_col > last_id)
+        rows = session.execute(q.order_by(id_col).limit(AUDIT_BATCH)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+# ---- controlli per partita ----
+
+def _check_matches(session, rows):
+    ids = [r.id for r in rows]
+    findings = []
+
+    # duplicati: solo le chiavi del blocco, su ix_matches_external (una query per sorgente)
+    ext_by_source = {}
+    for r in rows:
+        ext_by_source.setdefault(r.external_source, set()).add(r.external_id)
+    dup_rows = []
+    for source, ext_ids in ext_by_source.items():
+        dup_rows += session.execute(
+            select(Match.id, Match.external_source, Match.external_id, Match.competition, Match.season)
+            .where(Match.external_source == source)
+            .where(Match.external_id.in_(ext_ids))
+        ).all()
+    by_key = {}
+    for r in dup_rows:
+        by_key.setdefault((r.external_source, r.external_id), []).append(r)
+    dup_ids = set()
+    for (source, ext_id), group in by_key.items():
+        if len(group) < 2:
+            continue
+        others = sorted(r.id for r in group)
+        for r in group:
+            dup_ids.add(r.id)
+            findings.append(_finding(
+                "duplicate_external", r.id, r.competition, r.season,
+                external_source=source, external_id=ext_id, match_ids=others,
+            ))
+
+    ctx_by_id = {
+        c.match_id: c for c in session.execute(
+            select(MatchContext.match_id, *(getattr(MatchContext, k) for k in _CONTEXT_IDENTITY))
+            .where(MatchContext.match_id.in_(ids))
+        )
+    }
+
+    for r in rows:
+        finished = r.status == "FINISHED"
+        if finished and (r.home_goals is None or r.away_goals is None):
+            findings.append(_finding(
+                "finished_missing_score", r.id, r.competition, r.season,
+                home_goals=r.home_goals, away_goals=r.away_goals,
+            ))
+
+        ctx = ctx_by_id.get(r.id)
+        if ctx is None:
+            if finished and r.season is not None:
+                findings.append(_finding("context_missing", r.id, r.competition, r.season))
+            continue
+
+        diff = {k: [getattr(ctx, k), getattr(r, k)] for k in _CONTEXT_IDENTITY if getattr(ctx, k) != getattr(r, k)}
+        if not finished:
+            diff["status"] = [None, r.status]
+        if diff:
+            findings.append(_finding("context_stale", r.id, r.competition, r.season, context_vs_match=diff))
+
+    session.execute(
+        delete(AuditFinding)
+        .where(AuditFinding.match_id.in_(ids))
+        .where(AuditFinding.kind.in_(MATCH_KINDS))
+    )
+    session.execute(
+        delete(AuditFinding)
+        .where(AuditFinding.match_id.in_(set(ids) | dup_ids))
+        .where(AuditFinding.kind == "duplicate_external")
+    )
+    return findings
+
+
+def _recheck_duplicates(session, skip_ids):
+    """
+    Ricontrolla le partite citate nelle anomalie duplicate_external salvate.
+    Cancellare la riga duplicata non cambia updated_at di quella che resta:
+    senza questo giro l'anomalia non verrebbe mai tolta. Le anomalie di partite
+    che non esistono piu' vengono cancellate. Ritorna (partite ricontrollate, anomalie).
+    """
+    listed = set()
+    for match_id, detail in session.execute(
+        select(AuditFinding.match_id, AuditFinding.detail).where(AuditFinding.kind == "duplicate_external")
+    ):
+        listed.add(match_id)
+        listed.update(json.loads(detail).get("match_ids", []) if detail else [])
+    listed.discard(None)
+
+    ids = sorted(listed - skip_ids)
+    findings = []
+    existing = set()
+    for i in range(0, len(ids), AUDIT_BATCH):
+        rows = session.execute(select(*_MATCH_COLUMNS).where(Match.id.in_(ids[i:i + AUDIT_BATCH]))).all()
+        existing.update(r.id for r in rows)
+        if rows:
+            findings += _check_matches(session, rows)
+
+    gone = listed - skip_ids - existing
+    if gone:
+        session.execute(
+            delete(AuditFinding)
+            .where(AuditFinding.match_id.in_(gone))
+            .where(AuditFinding.kind == "duplicate_external")
+        )
+    return len(existing), findings
+
+
+def _check_contexts(session, rows):
+    ids = [r.match_id for r in rows]
+    existing = set(session.execute(select(Match.id).where(Match.id.in_(ids))).scalars())
+    findings = [
+        _finding("context_orphan", r.match_id, r.competition, r.season)
+        for r in rows if r.match_id not in existing
+    ]
+    session.execute(
+        delete(AuditFinding)
+        .where(AuditFinding.match_id.in_(ids))
+        .where(AuditFinding.kind == "context_orphan")
+    )
+    return findings
+
+
+# ---- controlli per coppia ----
+
+def _team_counts(session, competition, season, finished_only=False):
+    """{squadra: partite} della coppia (lettura su ix_matches_comp_season_total_goals)."""
+    def side(col):
+        q = select(col.label("team")).where(Match.competition == competition).where(Match.season == season)
+        return q.where(Match.status == "FINISHED") if finished_only else q
+
+    sides = union_all(side(Match.home_team), side(Match.away_team)).subquery()
+    return dict(session.execute(select(sides.c.team, func.count()).group_by(sides.c.team)).all())
+
+
+def _check_pair(session, competition, season):
+    findings = []
+    counts = _team_counts(session, competition, season)
+    n_teams = len(counts)
+
+    if n_teams:
+        previous = session.execute(
+            select(func.max(Match.season))
+            .where(Match.competition == competition)
+            .where(Match.season < season)
+        ).scalar()
+        prev_teams = len(_team_counts(session, competition, previous)) if previous is not None else None
+        if n_teams % 2 or (prev_teams and prev_teams != n_teams):
+            findings.append(_finding(
+                "season_team_count", None, competition, season,
+                teams=n_teams, previous_season=previous, previous_teams=prev_teams,
+            ))
+
+        max_matches = 2 * (n_teams - 1)
+        over = {team: n for team, n in counts.items() if n > max_matches}
+        if over:
+            findings.append(_finding(
+                "team_match_count", None, competition, season,
+                max_matches=max_matches, teams=dict(sorted(over.items())),
+            ))
+
+    ctx_totals = sorted(set(session.execute(
+        select(MatchContext.total_teams)
+        .where(MatchContext.competition == competition)
+        .where(MatchContext.season == season)
+        .distinct()
+    ).scalars()))
+    if ctx_totals:
+        finished_teams = len(_team_counts(session, competition, season, finished_only=True))
+        if ctx_totals != [finished_teams]:
+            findings.append(_finding(
+                "context_team_count", None, competition, season,
+                context_total_teams=ctx_totals, finished_teams=finished_teams,
+            ))
+
+    session.execute(
+        delete(AuditFinding)
+        .where(AuditFinding.competition == competition)
+        .where(AuditFinding.season == season)
+        .where(AuditFinding.kind.in_(PAIR_KINDS))
+    )
+    return findings
+
+
+# ---- job ----
+
+def run_audit(full: bool = False) -> dict:
+    """
+    Controlla le righe cambiate dall'ultimo giro (tutto se full o al primo giro),
+    aggiorna audit_findings e i marker. Ritorna il riepilogo salvato in app_meta.
+    """
+    t0 = time.perf_counter()
+    started = utcnow_iso()
+    session = SessionLocal()
+    try:
+        matches_mark = None if full else _get_meta(session, MATCHES_MARK_KEY)
+        context_mark = None if full else _get_meta(session, CONTEXT_MARK_KEY)
+        if full:
+            session.execute(delete(AuditFinding))
+
+        new_findings = []
+        pairs = set()
+        matches_checked = 0
+        checked_ids = set()
+        for rows in _changed_batches(session, _MATCH_COLUMNS, Match.id, Match.updated_at, matches_mark):
+            matches_checked += len(rows)
+            pairs.update((r.competition, r.season) for r in rows if r.season is not None)
+            if matches_mark is not None:
+                checked_ids.update(r.id for r in rows)
+            new_findings += _check_matches(session, rows)
+
+        duplicates_rechecked = 0
+        if matches_mark is not None:
+            duplicates_rechecked, found = _recheck_duplicates(session, checked_ids)
+            new_findings += found
+
+        contexts_checked = 0
+        ctx_columns = (MatchContext.match_id, MatchContext.competition, MatchContext.season)
+        for rows in _changed_batches(session, ctx_columns, MatchContext.match_id, MatchContext.updated_at, context_mark):
+            contexts_checked += len(rows)
+            pairs.update((r.competition, r.season) for r in rows)
+            new_findings += _check_contexts(session, rows)
+
+        for competition, season in sorted(pairs):
+            new_findings += _check_pair(session, competition, season)
+
+        # una riga per (kind, partita / coppia): un duplicato puo' comparire in piu' blocchi
+        unique = {(f["kind"], f["match_id"], f["competition"], f["season"]): f for f in new_findings}
+        if unique:
+            session.execute(insert(AuditFinding), list(unique.values()))
+
+        totals = dict(session.execute(
+            select(AuditFinding.kind, func.count()).group_by(AuditFinding.kind)
+        ).all())
+        summary = {
+            "mode": "full" if matches_mark is None else "incremental",
+            "started_at": started,
+            "elapsed_s": time.perf_counter() - t0,
+            "matches_checked": matches_checked,
+            "duplicates_rechecked": duplicates_rechecked,
+            "contexts_checked": contexts_checked,
+            "pairs_checked": len(pairs),
+            "new_findings": len(unique),
+            "findings": dict(sorted(totals.items())),
+        }
+
+        # le righe scritte durante il giro (updated_at >= started) vengono ricontrollate al prossimo
+        _set_meta(session, MATCHES_MARK_KEY, started)
+        _set_meta(session, CONTEXT_MARK_KEY, started)
+        _set_meta(session, LAST_RUN_KEY, json.dumps(summary))
+        session.commit()
+        return summary
+    finally:
+        session.close()
+
+
+def audit_report(kind=None, competition=None, season=None, limit: int = 100) -> dict:
+    """Ultimo giro + anomalie salvate (filtrabili), per /api/admin/audit."""
+    session = SessionLocal()
+    try:
+        raw = _get_meta(session, LAST_RUN_KEY)
+        q = select(
+            AuditFinding.kind, AuditFinding.match_id, AuditFinding.competition,
+            AuditFinding.season, AuditFinding.detail, AuditFinding.found_at,
+        )
+        if kind:
+            q = q.where(AuditFinding.kind == kind)
+        if competition:
+            q = q.where(AuditFinding.competition == competition)
+        if season is not None:
+            q = q.where(AuditFinding.season == season)
+        rows = session.execute(q.order_by(AuditFinding.id.desc()).limit(limit)).all()
+
+        return {
+            "last_run": json.loads(raw) if raw else None,
+            "findings": [
+                {
+                    "kind": r.kind,
+                    "match_id": r.match_id,
+                    "competition": r.competition,
+                    "season": r.season,
+                    "detail": json.loads(r.detail) if r.detail else None,
+                    "found_at": r.found_at,
+                }
+                for r in rows
+            ],
+        }
+    finally:
+        session.close()
@@ -0,0 +1,114 @@
+# backend/app/bootstrap.py
+"""
+Documenti di /api/matches e /api/bootstrap, condivisi tra le route pubbliche
+e il warm-up della cache (app.warmup): stesse funzioni, stesse voci di cache.
+"""
+
+from sqlalchemy import func, select
+
+from app import stats
+from app.cache import MISS, get_cache
+from app.db import SessionLocal
+from app.models import Match
+from app.predictors.rules_v1 import predict_with_session
+from app.routes.predict import prediction_tags
+from app.team_index import get_team_index
+from app.versioning import TAG_ALL, pair_tag
+
+
+def upcoming_matches():
+    """Partite non FINISHED in ordine di data (voce "matches" di /api/matches)."""
+    session = SessionLocal()
+    try:
+        matches = (
+            session.query(
+                Match.id, Match.competition, Match.season, Match.date,
+                Match.status, Match.home_team, Match.away_team,
+            )
+            .filter(Match.status != "FINISHED")
+            .order_by(Match.date.asc())
+            .all()
+        )
+
+        results = [
+            {
+                "id": m.id,
+                "competition": m.competition,
+                "season": m.season,
+                "date": m.date or None,
+                "status": m.status,
+                "home_team": m.home_team,
+                "away_team": m.away_team,
+            }
+            for m in matches
+        ]
+
+        return {"matches": results}
+    finally:
+        session.close()
+
+
+def with_cached_predictions(cache, matches):
+    """Partite con le probabilita' gia' in cache (voce di /api/predict con debug), senza calcolarne."""
+    out = []
+    for m in matches:
+        pred = cache.get("predict", [m["id"], None, True], count=False)
+        out.append(m if pred is MISS else dict(m, probabilities=pred.get("probabilities")))
+    return out
+
+
+def build_bootstrap(competition, season):
+    """Documento di /api/bootstrap (senza le previsioni in cache del caso non filtrato)."""
+    cache = get_cache()
+    upcoming, _hit = cache.get_or_compute("matches", [], [TAG_ALL], upcoming_matches)
+    matches = [
+        dict(m) for m in upcoming["matches"]
+        if (competition is None or m["competition"] == competition) and (season is None or m["season"] == season)
+    ]
+
+    if not competition or season is None:
+        return {
+            "competition": competition,
+            "season": season,
+            "teams": get_team_index().teams(competition, season),
+            "matches": matches,
+            "standings": None,
+            "standings_date": None,
+        }
+
+    # una sola sessione per tutte le parti non in cache
+    session = SessionLocal()
+    try:
+        for m in matches:
+            # stessa voce del frontend (/api/predict con debug): dopo il bootstrap
+            # la previsione di una partita e' gia' in cache
+            pred, _hit = cache.get_or_compute(
+                "predict", [m["id"], None, True], prediction_tags,
+                lambda: predict_with_session(session, m["id"], None, True),
+            )
+            m["probabilities"] = pred.get("probabilities")
+
+        standings = None
+        standings_date = session.execute(
+            select(func.max(Match.date))
+            .where(Match.status == "FINISHED")
+            .where(Match.competition == competition)
+            .where(Match.season == season)
+        ).scalar()
+        if standings_date:
+            # stessa voce di /api/standings?date=standings_date
+            standings, _hit = cache.get_or_compute(
+                "standings", [competition, season, standings_date], [pair_tag(competition, season)],
+                lambda: stats.load_standings(session, competition, season, standings_date),
+            )
+    finally:
+        session.close()
+
+    return {
+        "competition": competition,
+        "season": season,
+        "teams": get_team_index().teams(competition, season),
+        "matches": matches,
+        "standings": standings,
+        "standings_date": standings_date,
+    }
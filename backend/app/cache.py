@@ -0,0 +1,338 @@
+# backend/app/cache.py
+"""
+Cache delle risposte di lettura, con backend intercambiabile.
+
+CACHE_BACKEND sceglie dove stanno le voci:
+  memory  LRU nel processo, con TTL e numero massimo di voci (default; dev / 1 worker)
+  file    una voce per file sotto CACHE_URL (cartella), condivisa tra i worker
+  redis   qualunque server che parla il protocollo Redis (RESP) a CACHE_URL,
+          redis://host:port/db; bastano GET / SET PX / DEL / SELECT
+  none    disattivata
+
+Ogni voce porta i tag della coppia (competition, season) che l'ha prodotta,
+con la versione di quei tag al momento della scrittura (app.versioning).
+Alla lettura la voce vale solo se le versioni coincidono ancora: un import
+incrementa i tag delle coppie toccate e invalida solo quelle, su qualunque
+backend e in qualunque processo, senza cancellare nulla.
+I contatori hit/miss per namespace sono in stats() (GET /api/admin/cache).
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlparse
+
+from app.singleflight import NOT_FOUND, get_singleflight
+from app.versioning import TAG_ANY, tag_versions
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_KEY_PREFIX = "predcache:"
+
+MISS = object()
+
+
+class CacheError(Exception):
+    pass
+
+
+# ---- backend ----
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, entry = item
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, entry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def size(self):
+        return len(self._data)
+
+
+class FileBackend:
+    """Voce = file JSON {"expires", "entry"}; scrittura su .tmp + rename atomico."""
+    name = "file"
+
+    def __init__(self, root):
+        self.root = Path(root or Path(__file__).resolve().parents[1] / "cache")
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item["expires"] < time.time():
+            self.delete(key)
+            return None
+        return item["entry"]
+
+    def set(self, key, entry, ttl):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"expires": time.time() + ttl, "entry": entry}, f)
+        os.replace(tmp, path)
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def size(self):
+        if not self.root.is_dir():
+            return 0
+        return sum(1 for _ in self.root.glob("*/*.json"))
+
+
+class RedisBackend:
+    """Client RESP minimale (una connessione per thread), senza dipendenze."""
+    name = "redis"
+
+    def __init__(self, url, timeout: float = 1.0):
+        u = urlparse(url or "redis://127.0.0.1:6379/0")
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.password = u.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password:
+                self._call("AUTH", self.password)
+            if self.db:
+                self._call("SELECT", str(self.db))
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[0].close()
+            except OSError:
+                pass
+
+    def _read(self, f):
+        line = f.readline()
+        if not line:
+            raise CacheError("connessione chiusa")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise CacheError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = f.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(f) for _ in range(n)]
+        raise CacheError(f"risposta RESP non valida: {line!r}")
+
+    def _call(self, *args):
+        sock, f = self._conn()
+        parts = [b"*%d\r\n" % len(args)]
+        for a in args:
+            raw = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(raw), raw))
+        try:
+            sock.sendall(b"".join(parts))
+            return self._read(f)
+        except (OSError, CacheError):
+            self._reset()
+            raise
+
+    def get(self, key):
+        raw = self._call("GET", CACHE_KEY_PREFIX + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, entry, ttl):
+        self._call("SET", CACHE_KEY_PREFIX + key, json.dumps(entry), "PX", str(max(1, int(ttl * 1000))))
+
+    def delete(self, key):
+        self._call("DEL", CACHE_KEY_PREFIX + key)
+
+    def size(self):
+        return self._call("DBSIZE")
+
+
+# ---- cache ----
+
+class Cache:
+    """Voci {"value", "tags": {tag: versione}} su un backend, con contatori."""
+
+    def __init__(self, backend, ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, namespace, what):
+        with self._lock:
+            c = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "stale": 0, "errors": 0})
+            c[what] += 1
+
+    @staticmethod
+    def make_key(namespace, parts):
+        return f"{namespace}:{json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))}"
+
+    def get(self, namespace, parts, count: bool = True):
+        """
+        Valore in cache o MISS (voce assente, scaduta o con tag invalidati).
+        count=False: lettura opportunistica (nessun calcolo sul miss), non entra nei contatori.
+        """
+        if self.backend is None:
+            return MISS
+        try:
+            entry = self.backend.get(self.make_key(namespace, parts))
+        except (OSError, CacheError, ValueError):
+            self._count(namespace, "errors")
+            return MISS
+        if entry is None:
+            if count:
+                self._count(namespace, "misses")
+            return MISS
+
+        current = tag_versions()
+        if any(current.get(tag, 0) != version for tag, version in entry["tags"].items()):
+            if count:
+                self._count(namespace, "stale")
+            return MISS
+        if count:
+            self._count(namespace, "hits")
+        return entry["value"]
+
+    def set(self, namespace, parts, tags, value, ttl=None, versions=None):
+        """
+        versions: tag_versions() letto PRIMA di calcolare value. Se un import
+        incrementa un tag durante il calcolo, la voce nasce gia' stale invece
+        di salvare il valore vecchio sotto la versione nuova.
+        """
+        if self.backend is None:
+            return
+        current = tag_versions() if versions is None else versions
+        entry = {
+            "value": value,
+            "tags": {tag: current.get(tag, 0) for tag in set(tags) | {TAG_ANY}},
+        }
+        try:
+            self.backend.set(self.make_key(namespace, parts), entry, self.ttl if ttl is None else ttl)
+        except (OSError, CacheError, TypeError, ValueError):
+            self._count(namespace, "errors")
+
+    def get_or_compute(self, namespace, parts, tags, compute, ttl=None):
+        """
+        (valore, hit). tags puo' essere una funzione del valore calcolato.
+        Sui miss le richieste identiche concorrenti passano da app.singleflight:
+        un solo compute, gli altri ricevono lo stesso valore (hit=True).
+        """
+        value = self.get(namespace, parts)
+        if value is not MISS:
+            return value, True
+
+        def run():
+            versions = tag_versions()
+            value = compute()
+            self.set(namespace, parts, tags(value) if callable(tags) else tags, value, ttl, versions)
+            return value
+
+        def recheck():
+            value = self.get(namespace, parts)
+            return NOT_FOUND if value is MISS else value
+
+        return get_singleflight().do(self.make_key(namespace, parts), run, recheck)
+
+    def stats(self):
+        with self._lock:
+            by_ns = {ns: dict(c) for ns, c in sorted(self._counters.items())}
+        hits = sum(c["hits"] for c in by_ns.values())
+        lookups = sum(c["hits"] + c["misses"] + c["stale"] for c in by_ns.values())
+        try:
+            size = self.backend.size() if self.backend is not None else 0
+        except (OSError, CacheError):
+            size = None
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "ttl": self.ttl,
+            "entries": size,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "namespaces": by_ns,
+            "singleflight": get_singleflight().stats(),
+        }
+
+
+def build_backend(name: str = CACHE_BACKEND, url: str = CACHE_URL):
+    if name == "none":
+        return None
+    if name == "file":
+        return FileBackend(url or None)
+    if name == "redis":
+        return RedisBackend(url)
+    if name == "memory":
+        return MemoryBackend(CACHE_MAX_ENTRIES)
+    raise ValueError(f"CACHE_BACKEND non supportato: {name}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = Cache(build_backend())
+    return _cache
@@ -0,0 +1,8 @@
+# backend/app/config.py
+
+# Origini ammesse per /api/* (usate sia dall'app Flask sia dall'entry point ASGI)
+CORS_ORIGINS = [
+    "https://predizioni-sito.netlify.app",
+    "http://localhost:5500",
+    "http://127.0.0.1:5500",
+]
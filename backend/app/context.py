@@ -0,0 +1,207 @@
+# backend/app/context.py
+"""
+Calcolo di match_context (rank pre-partita) per una coppia (competition, season).
+
+compute_context_rows e' una funzione pura su tuple in memoria: la usa sia il
+rebuild sequenziale sia quello parallelo, dove gira in un processo worker.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import insert, text
+
+from app.models import Match, MatchContext
+
+
+def load_season_rows(session, competition: str, season: int):
+    """Partite FINISHED della stagione come tuple (id, date, home, away, hg, ag), in ordine cronologico."""
+    return [
+        tuple(r) for r in session.query(
+            Match.id, Match.date, Match.home_team, Match.away_team, Match.home_goals, Match.away_goals
+        )
+        .filter(Match.status == "FINISHED")
+        .filter(Match.competition == competition)
+        .filter(Match.season == season)
+        .order_by(Match.date.asc(), Match.id.asc())
+        .all()
+    ]
+
+
+def rank_table(table) -> dict:
+    """{team: rank} da {team: {"points", "gf", "ga", "played"}} (punti, diff. reti, gol fatti, giocate)."""
+    ranked = []
+    for t, v in table.items():
+        gd = v["gf"] - v["ga"]
+        ranked.append((t, v["points"], gd, v["gf"], v["played"]))
+    ranked.sort(key=lambda r: (r[1], r[2], r[3], r[4], r[0]), reverse=True)
+    return {team: idx + 1 for idx, (team, *_rest) in enumerate(ranked)}
+
+
+def compute_context_rows(competition: str, season: int, rows):
+    """Ritorna (context_rows, total_teams) per le partite gia' ordinate."""
+    teams = set()
+    for _id, _date, home, away, _hg, _ag in rows:
+        teams.add(home)
+        teams.add(away)
+    teams = sorted(list(teams))
+    total_teams = len(teams)
+
+    table = {t: {"points": 0, "gf": 0, "ga": 0, "played": 0} for t in teams}
+
+    out = []
+    for match_id, date, home, away, hg, ag in rows:
+        ranks_before = rank_table(table)
+        out.append({
+            "match_id": match_id,
+            "competition": competition,
+            "season": season,
+            "date": date,
+            "home_team": home,
+            "away_team": away,
+            "home_rank_before": ranks_before.get(home, total_teams),
+            "away_rank_before": ranks_before.get(away, total_teams),
+            "total_teams": total_teams,
+        })
+
+        hg = hg or 0
+        ag = ag or 0
+
+        table[home]["played"] += 1
+        table[away]["played"] += 1
+
+        table[home]["gf"] += hg
+        table[home]["ga"] += ag
+        table[away]["gf"] += ag
+        table[away]["ga"] += hg
+
+        if hg > ag:
+            table[home]["points"] += 3
+        elif hg < ag:
+            table[away]["points"] += 3
+        else:
+            table[home]["points"] += 1
+            table[away]["points"] += 1
+
+    return out, total_teams
+
+
+def _compute_job(competition, season, rows):
+    t0 = time.perf_counter()
+    ctx_rows, total_teams = compute_context_rows(competition, season, rows)
+    return competition, season, ctx_rows, total_teams, time.perf_counter() - t0
+
+
+def write_context_rows(session, competition: str, season: int, ctx_rows) -> None:
+    """Sostituisce il context della coppia con un insert bulk. Non fa commit."""
+    session.execute(text("""
+        DELETE FROM match_context
+        WHERE competition = :c AND season = :s
+    """), {"c": competition, "s": season})
+    if ctx_rows:
+        session.execute(insert(MatchContext), ctx_rows)
+
+
+def advance_context(session, competition: str, season: int) -> int:
+    """
+    Aggiunge le righe match_context mancanti di una coppia senza riscriverla.
+
+    Se le partite nuove vengono tutte dopo (date, id) quelle gia' con context,
+    i rank delle righe esistenti non cambiano: si scrivono solo le nuove.
+    Altrimenti (risultato arretrato, squadra nuova) si ricostruisce la coppia.
+    Non fa commit. Ritorna le righe scritte.
+    """
+    rows = load_season_rows(session, competition, season)
+    if not rows:
+        return 0
+
+    existing = dict(
+        session.query(MatchContext.match_id, MatchContext.total_teams)
+        .filter(MatchContext.competition == competition)
+        .filter(MatchContext.season == season)
+        .all()
+    )
+    missing = [r for r in rows if r[0] not in existing]
+    if not missing:
+        return 0
+
+    ctx_rows, total_teams = compute_context_rows(competition, season, rows)
+
+    last_done = max(((r[1], r[0]) for r in rows if r[0] in existing), default=None)
+    first_new = min((r[1], r[0]) for r in missing)
+    same_teams = all(t == total_teams for t in existing.values())
+
+    if last_done is not None and (first_new < last_done or not same_teams):
+        write_context_rows(session, competition, season, ctx_rows)
+        return len(ctx_rows)
+
+    missing_ids = {r[0] for r in missing}
+    session.execute(insert(MatchContext), [c for c in ctx_rows if c["match_id"] in missing_ids])
+    return len(missing_ids)
+
+
+def rebuild_pairs(session, pairs, workers: int = 1):
+    """
+    Ricostruisce match_context per le coppie indicate.
+
+    workers > 1: il calcolo va in un ProcessPoolExecutor (ogni worker riceve la
+    sua stagione in memoria), mentre le scritture restano in questo processo,
+    unico writer, cosi' SQLite non va in contesa.
+    Ritorna un report per coppia con i tempi di load / compute / write.
+    """
+    results = []
+
+    if workers <= 1:
+        for comp, seas in pairs:
+            t0 = time.perf_counter()
+            rows = load_season_rows(session, comp, seas)
+            t1 = time.perf_counter()
+            ctx_rows, total_teams = compute_context_rows(comp, seas, rows)
+            t2 = time.perf_counter()
+            if rows:
+                write_context_rows(session, comp, seas, ctx_rows)
+                session.commit()
+            t3 = time.perf_counter()
+            results.append({
+                "competition": comp,
+                "season": seas,
+                "inserted": len(ctx_rows),
+                "total_teams": total_teams,
+                "timings": {"load_s": t1 - t0, "compute_s": t2 - t1, "write_s": t3 - t2},
+            })
+        return results
+
+    load_times = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for comp, seas in pairs:
+            t0 = time.perf_counter()
+            rows = load_season_rows(session, comp, seas)
+            load_times[(comp, seas)] = time.perf_counter() - t0
+            futures.append(pool.submit(_compute_job, comp, seas, rows))
+
+        for fut in as_completed(futures):
+            comp, seas, ctx_rows, total_teams, compute_s = fut.result()
+            t0 = time.perf_counter()
+            if ctx_rows:
+                write_context_rows(session, comp, seas, ctx_rows)
+                session.commit()
+            results.append({
+                "competition": comp,
+                "season": seas,
+                "inserted": len(ctx_rows),
+                "total_teams": total_teams,
+                "timings": {
+                    "load_s": load_times[(comp, seas)],
+                    "compute_s": compute_s,
+                    "write_s": time.perf_counter() - t0,
+                },
+            })
+
+    results.sort(key=lambda r: (r["competition"], r["season"]))
+    return results
+
+
+def default_workers() -> int:
+    return max(1, min(os.cpu_count() or 1, 8))
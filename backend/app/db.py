@@ -1,5 +1,7 @@
 ﻿import os
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///calcio.db")
@@ -14,10 +16,46 @@ engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def utcnow_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _ensure_columns():
+    """
+    create_all non aggiunge colonne a tabelle gia' esistenti:
+    aggiungiamo qui le colonne nullable nuove (niente Alembic in questo progetto).
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing or not col.nullable:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+            for idx in table.indexes:
+                idx.create(bind=conn, checkfirst=True)
+
+def _backfill_updated_at():
+    """
+    Le righe scritte prima della colonna updated_at l'hanno NULL e nessun filtro
+    "updated_at >= since" (export incrementali, audit) le vedrebbe mai: le datiamo adesso.
+    Su indice, a ogni avvio non tocca nulla.
+    """
+    now = utcnow_iso()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if "updated_at" in table.c:
+                conn.execute(table.update().where(table.c.updated_at.is_(None)).values(updated_at=now))
+
 def init_db():
     # importa qui per evitare import circolari
-    from .models import Match, MatchContext  # noqa: F401
+    from .models import Match, MatchContext, TeamRating, MatchRating, AppMeta, AuditFinding  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    _ensure_columns()
+    _backfill_updated_at()
 
 def db_info():
     from .models import Match
@@ -0,0 +1,143 @@
+# backend/app/export.py
+"""
+Export in streaming (NDJSON / CSV) di matches, match_context e previsioni.
+
+Le righe vengono lette con yield_per + stream_results (cursor lato server su
+Postgres), quindi la memoria resta costante qualunque sia il numero di stagioni.
+
+since filtra su updated_at: le righe precedenti alla colonna hanno la data del
+primo avvio dopo la migrazione (db._backfill_updated_at), non NULL.
+"""
+
+import csv
+import io
+import json
+
+from app.db import SessionLocal
+from app.models import Match, MatchContext
+from app.predictors.rules_v1 import predict_with_session
+
+EXPORT_CHUNK = 1000
+
+DATASETS = ("matches", "context", "predictions")
+FORMATS = ("ndjson", "csv")
+
+PREDICTION_FIELDS = [
+    "match_id", "competition", "season", "date", "home_team", "away_team",
+    "model", "home_win", "draw", "away_win", "error",
+]
+
+
+def _columns(model):
+    return [c.name for c in model.__table__.columns]
+
+
+def _filter(q, model, competition=None, season=None, since=None):
+    if competition:
+        q = q.filter(model.competition == competition)
+    if season is not None:
+        q = q.filter(model.season == season)
+    if since:
+        q = q.filter(model.updated_at >= since)
+    return q
+
+
+def _filtered_query(session, model, competition=None, season=None, since=None):
+    q = _filter(session.query(model), model, competition, season, since)
+    pk = Match.id if model is Match else MatchContext.match_id
+    return q.order_by(pk.asc()).yield_per(EXPORT_CHUNK)
+
+
+def _match_ids(q):
+    """id della query a pagine (keyset): nessun cursore aperto mentre si calcolano le previsioni."""
+    last = None
+    while True:
+        page = q.filter(Match.id > last) if last is not None else q
+        ids = [row.id for row in page.order_by(Match.id.asc()).limit(EXPORT_CHUNK)]
+        if not ids:
+            return
+        yield from ids
+        last = ids[-1]
+
+
+def iter_rows(dataset: str, competition=None, season=None, since=None, status=None):
+    """Generatore di dict, una riga alla volta. La sessione vive quanto il generatore."""
+    session = SessionLocal()
+    try:
+        if dataset == "matches":
+            cols = _columns(Match)
+            for m in _filtered_query(session, Match, competition, season, since):
+                yield {c: getattr(m, c) for c in cols}
+                session.expunge(m)
+
+        elif dataset == "context":
+            cols = _columns(MatchContext)
+            for c in _filtered_query(session, MatchContext, competition, season, since):
+                yield {k: getattr(c, k) for k in cols}
+                session.expunge(c)
+
+        elif dataset == "predictions":
+            q = _filter(session.query(Match.id), Match, competition, season, since)
+            # di default solo le partite da giocare; status="all" per tutto lo storico
+            if status is None:
+                q = q.filter(Match.status != "FINISHED")
+            elif status != "all":
+                q = q.filter(Match.status == status)
+
+            for match_id in _match_ids(q):
+                p = predict_with_session(session, match_id)
+                session.expunge_all()  # memoria costante: niente entita' accumulate nella sessione
+                probs = p.get("probabilities") or {}
+                yield {
+                    "match_id": match_id,
+                    "competition": p.get("competition"),
+                    "season": p.get("season"),
+                    "date": p.get("date"),
+                    "home_team": p.get("home_team"),
+                    "away_team": p.get("away_team"),
+                    "model": p.get("model"),
+                    "home_win": probs.get("home_win"),
+                    "draw": probs.get("draw"),
+                    "away_win": probs.get("away_win"),
+                    "error": p.get("error"),
+                }
+        else:
+            raise ValueError(f"dataset non supportato: {dataset}")
+    finally:
+        session.close()
+
+
+def fieldnames(dataset: str):
+    if dataset == "matches":
+        return _columns(Match)
+    if dataset == "context":
+        return _columns(MatchContext)
+    return list(PREDICTION_FIELDS)
+
+
+def as_ndjson(rows):
+    lines = []
+    for r in rows:
+        lines.append(json.dumps(r, ensure_ascii=False, default=str))
+        if len(lines) >= EXPORT_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def as_csv(rows, fields):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for r in rows:
+        writer.writerow(r)
+        n += 1
+        if n % EXPORT_CHUNK == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    tail = buf.getvalue()
+    if tail:
+        yield tail
@@ -0,0 +1,111 @@
+# backend/app/h2h.py
+"""
+Storico testa a testa tra due squadre.
+
+Ogni partita ha pair_key = "A|B" (nomi ordinati), indicizzata: lo storico
+di una coppia, su tutte le competizioni e stagioni, e' una sola lookup
+sull'indice invece di una scansione con doppio OR sui nomi.
+"""
+
+from sqlalchemy import update
+
+from app.models import Match, pair_key_for
+
+BACKFILL_CHUNK = 1000
+
+
+def backfill_pair_keys(session) -> int:
+    """Valorizza pair_key sulle righe vecchie (calcolato in Python: l'ordinamento non dipende dalla collation)."""
+    done = 0
+    while True:
+        rows = (
+            session.query(Match.id, Match.home_team, Match.away_team)
+            .filter(Match.pair_key.is_(None))
+            .limit(BACKFILL_CHUNK)
+            .all()
+        )
+        if not rows:
+            break
+        # ORM bulk UPDATE per primary key (executemany)
+        session.execute(
+            update(Match),
+            [{"id": match_id, "pair_key": pair_key_for(home, away)} for match_id, home, away in rows],
+        )
+        session.commit()
+        done += len(rows)
+    return done
+
+
+def head_to_head(session, team_a: str, team_b: str, last_n: int = 10) -> dict:
+    """Record e statistiche dal punto di vista di team_a, piu' gli ultimi last_n incontri."""
+    meetings = (
+        session.query(
+            Match.id, Match.competition, Match.season, Match.date,
+            Match.home_team, Match.away_team, Match.home_goals, Match.away_goals,
+        )
+        .filter(Match.pair_key == pair_key_for(team_a, team_b))
+        .filter(Match.status == "FINISHED")
+        .order_by(Match.date.desc(), Match.id.desc())
+        .all()
+    )
+
+    rec = {
+        "matches": 0,
+        "team_a_wins": 0,
+        "draws": 0,
+        "team_b_wins": 0,
+        "team_a_goals": 0,
+        "team_b_goals": 0,
+        "team_a_home": 0,
+        "over_25": 0,
+        "btts": 0,
+    }
+    last = []
+
+    for m in meetings:
+        hg = m.home_goals or 0
+        ag = m.away_goals or 0
+        a_home = (m.home_team == team_a)
+        a_goals = hg if a_home else ag
+        b_goals = ag if a_home else hg
+
+        rec["matches"] += 1
+        rec["team_a_goals"] += a_goals
+        rec["team_b_goals"] += b_goals
+        if a_home:
+            rec["team_a_home"] += 1
+        if a_goals > b_goals:
+            rec["team_a_wins"] += 1
+        elif a_goals < b_goals:
+            rec["team_b_wins"] += 1
+        else:
+            rec["draws"] += 1
+        if hg + ag > 2.5:
+            rec["over_25"] += 1
+        if hg > 0 and ag > 0:
+            rec["btts"] += 1
+
+        if len(last) < last_n:
+            last.append({
+                "id": m.id,
+                "competition": m.competition,
+                "season": m.season,
+                "date": m.date,
+                "home_team": m.home_team,
+                "away_team": m.away_team,
+                "home_goals": m.home_goals,
+                "away_goals": m.away_goals,
+            })
+
+    mp = rec["matches"]
+    rec.update({
+        "team_a_win_rate": (rec["team_a_wins"] / mp) if mp else 0.0,
+        "draw_rate": (rec["draws"] / mp) if mp else 0.0,
+        "team_b_win_rate": (rec["team_b_wins"] / mp) if mp else 0.0,
+        "avg_total_goals": ((rec["team_a_goals"] + rec["team_b_goals"]) / mp) if mp else 0.0,
+        "over_25_rate": (rec["over_25"] / mp) if mp else 0.0,
+        "under_25_rate": ((mp - rec["over_25"]) / mp) if mp else 0.0,
+        "btts_rate": (rec["btts"] / mp) if mp else 0.0,
+    })
+
+    return {"team_a": team_a, "team_b": team_b, "record": rec, "last_meetings": last}
@@ -1,5 +1,5 @@
-﻿from sqlalchemy import Column, Integer, String, BigInteger
-from .db import Base
+﻿from sqlalchemy import Column, Integer, String, BigInteger, Float, Index, event
+from .db import Base, utcnow_iso
 
 class Match(Base):
     __tablename__ = "matches"
@@ -21,6 +21,67 @@ class Match(Base):
     away_goals = Column(Integer, nullable=True)
     season = Column(Integer, nullable=True)
 
+    # marker per export incrementali (ISO UTC, aggiornato solo se la riga cambia)
+    updated_at = Column(String, nullable=True, index=True, default=utcnow_iso, onupdate=utcnow_iso)
+
+    # coppia non ordinata "A|B" (nomi in ordine), per lo storico testa a testa
+    pair_key = Column(String, nullable=True, index=True)
+
+    # derivati dal risultato, valorizzati solo per le FINISHED (gol NULL contano 0).
+    # Li legge l'aggregazione SQL della classifica (stats.load_standings); get_stats e
+    # rules_v1 ricavano l'esito riga per riga perche' leggono anche dagli snapshot
+    # mmap, che hanno solo id, date, squadre e gol.
+    result = Column(String(1), nullable=True)  # H / D / A
+    total_goals = Column(Integer, nullable=True)
+    btts = Column(Integer, nullable=True)  # 0 / 1
+    home_points = Column(Integer, nullable=True)
+    away_points = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # filtri over/under su una stagione senza leggere le righe
+        Index("ix_matches_comp_season_total_goals", "competition", "season", "total_goals"),
+        # upsert e controllo duplicati per id esterno (app.audit)
+        Index("ix_matches_external", "external_source", "external_id"),
+    )
+
+
+DERIVED_COLUMNS = ("result", "total_goals", "btts", "home_points", "away_points")
+
+
+def pair_key_for(team_a: str, team_b: str) -> str:
+    a, b = sorted((team_a or "", team_b or ""))
+    return f"{a}|{b}"
+
+
+def derived_columns(status, home_goals, away_goals) -> dict:
+    """Colonne derivate di una partita; tutte None se non e' FINISHED."""
+    if status != "FINISHED":
+        return dict.fromkeys(DERIVED_COLUMNS)
+    hg = home_goals or 0
+    ag = away_goals or 0
+    if hg > ag:
+        result, home_points, away_points = "H", 3, 0
+    elif hg < ag:
+        result, home_points, away_points = "A", 0, 3
+    else:
+        result, home_points, away_points = "D", 1, 1
+    return {
+        "result": result,
+        "total_goals": hg + ag,
+        "btts": int(hg > 0 and ag > 0),
+        "home_points": home_points,
+        "away_points": away_points,
+    }
+
+
+@event.listens_for(Match, "before_insert")
+@event.listens_for(Match, "before_update")
+def _set_derived(_mapper, _connection, target):
+    # gli insert/update bulk (executemany) non passano di qui: valorizzano a mano
+    target.pair_key = pair_key_for(target.home_team, target.away_team)
+    for key, value in derived_columns(target.status, target.home_goals, target.away_goals).items():
+        setattr(target, key, value)
+
 class MatchContext(Base):
     __tablename__ = "match_context"
 
@@ -37,3 +98,71 @@ class MatchContext(Base):
     away_rank_before = Column(Integer, nullable=False)
 
     total_teams = Column(Integer, nullable=False)
+
+    updated_at = Column(String, nullable=True, index=True, default=utcnow_iso, onupdate=utcnow_iso)
+
+    __table_args__ = (
+        Index("ix_match_context_comp_season", "competition", "season"),
+    )
+
+
+class TeamRating(Base):
+    """Rating Elo corrente per squadra (una riga per nome squadra, cross-competition)."""
+    __tablename__ = "team_ratings"
+
+    team = Column(String, primary_key=True)
+
+    rating = Column(Float, nullable=False)
+    matches = Column(Integer, nullable=False, default=0)
+
+    last_date = Column(String, nullable=True)
+    last_season = Column(Integer, nullable=True)
+    last_competition = Column(String, nullable=True)
+
+
+class MatchRating(Base):
+    """Rating Elo pre/post partita, scritto una volta quando il match diventa FINISHED."""
+    __tablename__ = "match_ratings"
+
+    match_id = Column(Integer, primary_key=True, index=True)
+
+    competition = Column(String, nullable=False)
+    season = Column(Integer, nullable=False)
+    date = Column(String, nullable=False)
+
+    home_team = Column(String, nullable=False)
+    away_team = Column(String, nullable=False)
+
+    home_rating_before = Column(Float, nullable=False)
+    away_rating_before = Column(Float, nullable=False)
+    home_rating_after = Column(Float, nullable=False)
+    away_rating_after = Column(Float, nullable=False)
+
+    home_expected = Column(Float, nullable=False)
+
+
+class AppMeta(Base):
+    """Chiave/valore per stato applicativo condiviso tra worker (es. data_version)."""
+    __tablename__ = "app_meta"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+
+
+class AuditFinding(Base):
+    """Anomalia trovata dal job di audit (app.audit); sostituita a ogni nuovo controllo."""
+    __tablename__ = "audit_findings"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    kind = Column(String, nullable=False, index=True)
+    match_id = Column(Integer, nullable=True, index=True)  # NULL per le anomalie di coppia
+    competition = Column(String, nullable=True)
+    season = Column(Integer, nullable=True)
+
+    detail = Column(String, nullable=True)  # JSON
+    found_at = Column(String, nullable=False, default=utcnow_iso)
+
+    __table_args__ = (
+        Index("ix_audit_findings_pair", "competition", "season"),
+    )
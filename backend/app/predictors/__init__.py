@@ -0,0 +1,23 @@
+# backend/app/predictors/__init__.py
+"""
+Registro dei modelli di predizione.
+
+Ogni modello e' una funzione (session, match_id, weights=None, debug=True) -> dict
+con lo stesso formato di /api/predict ("ok", "probabilities", ...).
+"""
+
+from app.predictors.rules_v1 import predict_with_session
+
+MODELS = {
+    "rules_v1": predict_with_session,
+    "rules": predict_with_session,
+}
+
+
+def register_model(name: str, fn):
+    MODELS[name] = fn
+
+
+def get_model(name: str):
+    """Funzione del modello, o None se il nome non e' registrato."""
+    return MODELS.get(name)
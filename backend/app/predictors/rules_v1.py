@@ -1,8 +1,9 @@
 ﻿import math
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 
 from app.db import SessionLocal
 from app.models import Match, MatchContext
+from app.ratings import ELO_HOME_ADVANTAGE, pre_match_ratings
 
 
 def _safe_div(a: float, b: float) -> float:
@@ -31,16 +32,89 @@ def _get_ctx(session, match_id: int):
 
 
 def _team_past_matches(session, team: str, competition: str, season: int, date_cutoff: str):
-    return (
-        session.query(Match)
-        .filter(Match.status == "FINISHED")
-        .filter(Match.competition == competition)
-        .filter(Match.season == season)
-        .filter(Match.date < date_cutoff)
-        .filter(or_(Match.home_team == team, Match.away_team == team))
+    # sola lettura: righe (id, home_team, home_goals, away_goals), niente entita' ORM
+    return session.execute(
+        select(Match.id, Match.home_team, Match.home_goals, Match.away_goals)
+        .where(Match.status == "FINISHED")
+        .where(Match.competition == competition)
+        .where(Match.season == season)
+        .where(Match.date < date_cutoff)
+        .where(or_(Match.home_team == team, Match.away_team == team))
         .order_by(Match.date.asc(), Match.id.asc())
-        .all()
+    ).all()
+
+
+DEFAULT_WEIGHTS = {
+    "rank_pos_weight": 0.50,
+    "home_win_weight": 3.0,
+    "home_loss_weight": 2.0,
+    "away_win_weight": 3.0,
+    "away_loss_weight": 2.0,
+    "vs_band_weight": 0.8,
+    "vs_band_home_weight": 0.4,
+    "vs_band_away_weight": 0.4,
+    "gf_diff_weight": 1.5,
+    "ga_diff_weight": 1.2,
+    "last5_ppg_weight": 0.8,
+    "draw_base": 3.2,
+    # Elo: disattivato di default, attivabile passando weights
+    "elo_diff_weight": 0.0,
+}
+VS_BAND_WEIGHTS = ("vs_band_weight", "vs_band_home_weight", "vs_band_away_weight")
+BAND_SIZE = 5
+
+
+def weights_error(weights) -> str | None:
+    """Messaggio d'errore se weights non e' un oggetto {peso noto: numero}, altrimenti None."""
+    if weights is None:
+        return None
+    if not isinstance(weights, dict):
+        return "weights deve essere un oggetto"
+    unknown = sorted(set(weights) - set(DEFAULT_WEIGHTS))
+    if unknown:
+        return f"weights: chiavi sconosciute: {', '.join(map(str, unknown))}"
+    bad = sorted(
+        k for k, v in weights.items()
+        if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v)
     )
+    if bad:
+        return f"weights: valori non numerici: {', '.join(bad)}"
+    return None
+
+
+def merge_weights(weights: dict | None) -> dict:
+    error = weights_error(weights)
+    if error:
+        raise ValueError(error)
+    W = dict(DEFAULT_WEIGHTS)
+    if weights:
+        W.update(weights)
+    return W
+
+
+def needs_vs_band(W: dict, debug: bool) -> bool:
+    return debug or any(W[k] for k in VS_BAND_WEIGHTS)
+
+
+def needs_elo(W: dict, debug: bool) -> bool:
+    return debug or bool(W["elo_diff_weight"])
+
+
+def pack_split(b) -> dict:
+    """Blocco split da contatori {"mp", "w", "d", "l", "gf", "ga", "pts"}."""
+    mp = b["mp"]
+    return {
+        "matches": mp,
+        "wins": b["w"],
+        "draws": b["d"],
+        "losses": b["l"],
+        "win_rate": _safe_div(b["w"], mp),
+        "draw_rate": _safe_div(b["d"], mp),
+        "loss_rate": _safe_div(b["l"], mp),
+        "ppg": _safe_div(b["pts"], mp),
+        "avg_gf": _safe_div(b["gf"], mp),
+        "avg_ga": _safe_div(b["ga"], mp),
+    }
 
 
 def _compute_basic_splits(team: str, matches):
@@ -77,22 +151,7 @@ def _compute_basic_splits(team: str, matches):
             else:
                 b["l"] += 1
 
-    def pack(b):
-        mp = b["mp"]
-        return {
-            "matches": mp,
-            "wins": b["w"],
-            "draws": b["d"],
-            "losses": b["l"],
-            "win_rate": _safe_div(b["w"], mp),
-            "draw_rate": _safe_div(b["d"], mp),
-            "loss_rate": _safe_div(b["l"], mp),
-            "ppg": _safe_div(b["pts"], mp),
-            "avg_gf": _safe_div(b["gf"], mp),
-            "avg_ga": _safe_div(b["ga"], mp),
-        }
-
-    out = {"overall": pack(overall), "home": pack(home), "away": pack(away)}
+    out = {"overall": pack_split(overall), "home": pack_split(home), "away": pack_split(away)}
     last5 = overall["seq_pts"][-5:]
     out["overall"]["last5_ppg"] = _safe_div(sum(last5), len(last5)) if last5 else 0.0
     return out
@@ -114,20 +173,36 @@ def _compute_vs_opponent_band_ppg(
     date_cutoff: str,
     opponent_rank_before: int,
     total_teams: int,
-    band_size: int = 5
+    band_size: int = 5,
+    matches=None,
 ):
+    """matches: storico gia' letto con _team_past_matches (evita di rileggerlo)."""
     if not opponent_rank_before or not total_teams:
         return 0.0, 0.0, 0.0, 0, 0, 0
 
-    target_band = _band_label(total_teams, opponent_rank_before, band_size)
-
-    matches = _team_past_matches(session, team, competition, season, date_cutoff)
+    if matches is None:
+        matches = _team_past_matches(session, team, competition, season, date_cutoff)
     if not matches:
         return 0.0, 0.0, 0.0, 0, 0, 0
 
     ids = [m.id for m in matches]
-    ctx_rows = session.query(MatchContext).filter(MatchContext.match_id.in_(ids)).all()
+    ctx_rows = session.execute(
+        select(MatchContext.match_id, MatchContext.home_rank_before, MatchContext.away_rank_before)
+        .where(MatchContext.match_id.in_(ids))
+    ).all()
     ctx_by_id = {c.match_id: c for c in ctx_rows}
+    return vs_band_ppg(team, matches, ctx_by_id, opponent_rank_before, total_teams, band_size)
+
+
+def vs_band_ppg(team: str, matches, ctx_by_id, opponent_rank_before: int, total_teams: int, band_size: int = BAND_SIZE):
+    """
+    PPG di team contro avversari nella stessa fascia di rank dell'avversario di
+    oggi (rank pre-partita da ctx_by_id), senza query.
+    Ritorna (ppg, home_ppg, away_ppg, mp, home_mp, away_mp).
+    """
+    if not opponent_rank_before or not total_teams:
+        return 0.0, 0.0, 0.0, 0, 0, 0
+    target_band = _band_label(total_teams, opponent_rank_before, band_size)
 
     def init():
         return {"mp": 0, "pts": 0}
@@ -172,55 +247,53 @@ def _compute_vs_opponent_band_ppg(
     )
 
 
-def predict_rule_based(match_id: int, weights: dict | None = None) -> dict:
-    W = {
-        "rank_pos_weight": 0.50,
-        "home_win_weight": 3.0,
-        "home_loss_weight": 2.0,
-        "away_win_weight": 3.0,
-        "away_loss_weight": 2.0,
-        "vs_band_weight": 0.8,
-        "vs_band_home_weight": 0.4,
-        "vs_band_away_weight": 0.4,
-        "gf_diff_weight": 1.5,
-        "ga_diff_weight": 1.2,
-        "last5_ppg_weight": 0.8,
-        "draw_base": 3.2,
-    }
-    if weights:
-        W.update(weights)
-
+def predict_rule_based(match_id: int, weights: dict | None = None, debug: bool = True) -> dict:
     session = SessionLocal()
     try:
-        m = session.query(Match).filter(Match.id == match_id).first()
-        if not m:
-            return {"ok": False, "error": "Match non trovato", "match_id": int(match_id)}
-        if m.season is None:
-            return {"ok": False, "error": "Match.season mancante", "match_id": int(match_id)}
-
-        competition = m.competition
-        season = int(m.season)
-        date_cutoff = m.date
-        home_team = m.home_team
-        away_team = m.away_team
-
-        ctx = _get_ctx(session, m.id)
-        if not ctx:
-            total_teams = 20
-            home_rank_before = total_teams // 2
-            away_rank_before = total_teams // 2
-        else:
-            total_teams = ctx.total_teams
-            home_rank_before = ctx.home_rank_before
-            away_rank_before = ctx.away_rank_before
-
-        home_hist = _team_past_matches(session, home_team, competition, season, date_cutoff)
-        away_hist = _team_past_matches(session, away_team, competition, season, date_cutoff)
+        return predict_with_session(session, match_id, weights, debug)
+    finally:
+        session.close()
 
-        home_stats = _compute_basic_splits(home_team, home_hist)
-        away_stats = _compute_basic_splits(away_team, away_hist)
 
-        home_vs_ppg, home_vs_home_ppg, home_vs_away_ppg, hv_mp, _, _ = _compute_vs_opponent_band_ppg(
+def predict_with_session(session, match_id: int, weights: dict | None = None, debug: bool = True) -> dict:
+    """
+    Come predict_rule_based ma su una sessione esistente (usata anche da AsyncSession.run_sync).
+    Con debug=False la risposta non ha il blocco "debug" e le componenti con
+    peso 0 (vs-band, Elo) non vengono calcolate: niente query per quelle parti.
+    """
+    W = merge_weights(weights)
+
+    m = session.query(Match).filter(Match.id == match_id).first()
+    if not m:
+        return {"ok": False, "error": "Match non trovato", "match_id": int(match_id)}
+    if m.season is None:
+        return {"ok": False, "error": "Match.season mancante", "match_id": int(match_id)}
+
+    competition = m.competition
+    season = int(m.season)
+    date_cutoff = m.date
+    home_team = m.home_team
+    away_team = m.away_team
+
+    ctx = _get_ctx(session, m.id)
+    if not ctx:
+        total_teams = 20
+        home_rank_before = total_teams // 2
+        away_rank_before = total_teams // 2
+    else:
+        total_teams = ctx.total_teams
+        home_rank_before = ctx.home_rank_before
+        away_rank_before = ctx.away_rank_before
+
+    home_hist = _team_past_matches(session, home_team, competition, season, date_cutoff)
+    away_hist = _team_past_matches(session, away_team, competition, season, date_cutoff)
+
+    home_stats = _compute_basic_splits(home_team, home_hist)
+    away_stats = _compute_basic_splits(away_team, away_hist)
+
+    home_vs = away_vs = (0.0, 0.0, 0.0, 0)
+    if needs_vs_band(W, debug):
+        home_vs = _compute_vs_opponent_band_ppg(
             session=session,
             team=home_team,
             competition=competition,
@@ -228,9 +301,10 @@ def predict_rule_based(match_id: int, weights: dict | None = None) -> dict:
             date_cutoff=date_cutoff,
             opponent_rank_before=away_rank_before,
             total_teams=total_teams,
-            band_size=5
-        )
-        away_vs_ppg, away_vs_home_ppg, away_vs_away_ppg, av_mp, _, _ = _compute_vs_opponent_band_ppg(
+            band_size=BAND_SIZE,
+            matches=home_hist,
+        )[:4]
+        away_vs = _compute_vs_opponent_band_ppg(
             session=session,
             team=away_team,
             competition=competition,
@@ -238,72 +312,103 @@ def predict_rule_based(match_id: int, weights: dict | None = None) -> dict:
             date_cutoff=date_cutoff,
             opponent_rank_before=home_rank_before,
             total_teams=total_teams,
-            band_size=5
-        )
-
-        rank_diff = (away_rank_before - home_rank_before)
-        rank_score = rank_diff * W["rank_pos_weight"]
-
-        hp = home_stats["home"]
-        ap = away_stats["away"]
-
-        home_perf_score = (hp["win_rate"] * W["home_win_weight"]) - (hp["loss_rate"] * W["home_loss_weight"])
-        away_perf_score = (ap["win_rate"] * W["away_win_weight"]) - (ap["loss_rate"] * W["away_loss_weight"])
-
-        vs_score = (
-            (home_vs_ppg - away_vs_ppg) * W["vs_band_weight"]
-            + (home_vs_home_ppg - away_vs_home_ppg) * W["vs_band_home_weight"]
-            + (home_vs_away_ppg - away_vs_away_ppg) * W["vs_band_away_weight"]
-        )
-
-        gf_diff = (hp["avg_gf"] - ap["avg_gf"])
-        ga_diff = (ap["avg_ga"] - hp["avg_ga"])
-        goals_score = (gf_diff * W["gf_diff_weight"]) + (ga_diff * W["ga_diff_weight"])
-
-        form_diff = (home_stats["overall"]["last5_ppg"] - away_stats["overall"]["last5_ppg"])
-        form_score = form_diff * W["last5_ppg_weight"]
-
-        home_score = rank_score + home_perf_score - away_perf_score + vs_score + goals_score + form_score
-        draw_score = max(0.2, W["draw_base"] - 0.7 * abs(home_score))
-
-        p_home, p_draw, p_away = _softmax3(home_score, draw_score, -home_score)
-
-        return {
-            "ok": True,
-            "match_id": int(m.id),
-            "competition": competition,
-            "season": season,
-            "date": date_cutoff,
-            "home_team": home_team,
-            "away_team": away_team,
-            "model": "rules_v1",
-            "probabilities": {"home_win": p_home, "draw": p_draw, "away_win": p_away},
-            "debug": {
-                "ranks": {
-                    "home_rank_before": home_rank_before,
-                    "away_rank_before": away_rank_before,
-                    "total_teams": total_teams,
-                    "rank_diff": rank_diff,
-                },
-                "components": {
-                    "rank_score": rank_score,
-                    "home_perf_score": home_perf_score,
-                    "away_perf_score_subtracted": -away_perf_score,
-                    "vs_score": vs_score,
-                    "goals_score": goals_score,
-                    "form_score": form_score,
-                    "home_score_total": home_score,
-                    "draw_score": draw_score,
-                },
-                "inputs": {
-                    "home_home": hp,
-                    "away_away": ap,
-                    "home_last5_ppg": home_stats["overall"]["last5_ppg"],
-                    "away_last5_ppg": away_stats["overall"]["last5_ppg"],
-                    "home_vs_band": {"ppg": home_vs_ppg, "home_ppg": home_vs_home_ppg, "away_ppg": home_vs_away_ppg, "mp": hv_mp},
-                    "away_vs_band": {"ppg": away_vs_ppg, "home_ppg": away_vs_home_ppg, "away_ppg": away_vs_away_ppg, "mp": av_mp},
-                }
-            }
+            band_size=BAND_SIZE,
+            matches=away_hist,
+        )[:4]
+
+    elo = pre_match_ratings(session, m) if needs_elo(W, debug) else None
+
+    out = {
+        "ok": True,
+        "match_id": int(m.id),
+        "competition": competition,
+        "season": season,
+        "date": date_cutoff,
+        "home_team": home_team,
+        "away_team": away_team,
+        "model": "rules_v1",
+    }
+    out.update(score_inputs(
+        W, (home_rank_before, away_rank_before, total_teams),
+        home_stats, away_stats, home_vs, away_vs, elo, debug,
+    ))
+    return out
+
+
+def score_inputs(W, ranks, home_stats, away_stats, home_vs, away_vs, elo, debug: bool = True) -> dict:
+    """
+    {"probabilities", "debug"} dagli input gia' calcolati.
+    ranks: (home_rank_before, away_rank_before, total_teams)
+    home_vs / away_vs: (ppg, home_ppg, away_ppg, mp) contro la fascia dell'avversario
+    elo: dict di pre_match_ratings, o None se needs_elo e' falso
+    """
+    home_rank_before, away_rank_before, total_teams = ranks
+    home_vs_ppg, home_vs_home_ppg, home_vs_away_ppg, hv_mp = home_vs
+    away_vs_ppg, away_vs_home_ppg, away_vs_away_ppg, av_mp = away_vs
+
+    rank_diff = (away_rank_before - home_rank_before)
+    rank_score = rank_diff * W["rank_pos_weight"]
+
+    hp = home_stats["home"]
+    ap = away_stats["away"]
+
+    home_perf_score = (hp["win_rate"] * W["home_win_weight"]) - (hp["loss_rate"] * W["home_loss_weight"])
+    away_perf_score = (ap["win_rate"] * W["away_win_weight"]) - (ap["loss_rate"] * W["away_loss_weight"])
+
+    vs_score = (
+        (home_vs_ppg - away_vs_ppg) * W["vs_band_weight"]
+        + (home_vs_home_ppg - away_vs_home_ppg) * W["vs_band_home_weight"]
+        + (home_vs_away_ppg - away_vs_away_ppg) * W["vs_band_away_weight"]
+    )
+
+    gf_diff = (hp["avg_gf"] - ap["avg_gf"])
+    ga_diff = (ap["avg_ga"] - hp["avg_ga"])
+    goals_score = (gf_diff * W["gf_diff_weight"]) + (ga_diff * W["ga_diff_weight"])
+
+    form_diff = (home_stats["overall"]["last5_ppg"] - away_stats["overall"]["last5_ppg"])
+    form_score = form_diff * W["last5_ppg_weight"]
+
+    if elo is not None:
+        elo_diff = (elo["home_rating"] + ELO_HOME_ADVANTAGE - elo["away_rating"]) / 100.0
+        elo_score = elo_diff * W["elo_diff_weight"]
+    else:
+        elo_score = 0.0
+
+    home_score = rank_score + home_perf_score - away_perf_score + vs_score + goals_score + form_score + elo_score
+    draw_score = max(0.2, W["draw_base"] - 0.7 * abs(home_score))
+
+    p_home, p_draw, p_away = _softmax3(home_score, draw_score, -home_score)
+
+    out = {"probabilities": {"home_win": p_home, "draw": p_draw, "away_win": p_away}}
+    if not debug:
+        return out
+
+    out["debug"] = {
+        "ranks": {
+            "home_rank_before": home_rank_before,
+            "away_rank_before": away_rank_before,
+            "total_teams": total_teams,
+            "rank_diff": rank_diff,
+        },
+        "elo": {**elo, "elo_diff": elo_diff},
+        "components": {
+            "rank_score": rank_score,
+            "home_perf_score": home_perf_score,
+            "away_perf_score_subtracted": -away_perf_score,
+            "vs_score": vs_score,
+            "goals_score": goals_score,
+            "form_score": form_score,
+            "elo_score": elo_score,
+            "home_score_total": home_score,
+            "draw_score": draw_score,
+        },
+        "inputs": {
+            "home_home": hp,
+            "away_away": ap,
+            "home_last5_ppg": home_stats["overall"]["last5_ppg"],
+            "away_last5_ppg": away_stats["overall"]["last5_ppg"],
+            "home_vs_band": {"ppg": home_vs_ppg, "home_ppg": home_vs_home_ppg, "away_ppg": home_vs_away_ppg, "mp": hv_mp},
+            "away_vs_band": {"ppg": away_vs_ppg, "home_ppg": away_vs_home_ppg, "away_ppg": away_vs_away_ppg, "mp": av_mp},
         }
-    finally:
-        session.close()
+    }
+    return out
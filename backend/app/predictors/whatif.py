@@ -0,0 +1,229 @@
+# backend/app/predictors/whatif.py
+"""
+Predizioni rules_v1 "what-if": casa, trasferta, competition, season e data
+arbitrari, senza una riga in matches (accoppiamenti ipotetici, date diverse).
+
+Per ogni (competition, season) lo stato cumulato della stagione si costruisce
+una volta e resta valido finche' data_version non cambia:
+  - classifica dopo ogni data di gioco (stesso ordinamento di match_context);
+  - per squadra, contatori overall/home/away cumulati partita per partita.
+Gli input di rules_v1 alla data D si leggono con una bisect su queste serie
+(partite con date < D, come _team_past_matches): nessuna query per richiesta,
+a parte il rating Elo corrente quando serve.
+
+Differenza con /api/predict: i rank pre-partita contano solo i giorni prima
+di D, mentre match_context conta anche le partite dello stesso giorno giocate prima.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import groupby
+
+from sqlalchemy import select
+
+from app.context import load_season_rows, rank_table
+from app.db import SessionLocal
+from app.models import MatchContext
+from app.predictors.rules_v1 import (
+    merge_weights, needs_elo, needs_vs_band, pack_split, score_inputs, vs_band_ppg,
+)
+from app.ratings import current_ratings
+from app.snapshots import ContextRow, MatchRow, get_snapshot
+from app.versioning import current_data_version
+
+MAX_STATES = 32
+DEFAULT_TOTAL_TEAMS = 20  # come /api/predict senza match_context
+
+_ZERO = (0, 0, 0, 0, 0, 0, 0)  # mp, w, d, l, gf, ga, pts
+_SPLIT_KEYS = ("mp", "w", "d", "l", "gf", "ga", "pts")
+
+
+def _add(counts, gf, ga, pts):
+    mp, w, d, l, f, a, p = counts
+    return (mp + 1, w + (gf > ga), d + (gf == ga), l + (gf < ga), f + gf, a + ga, p + pts)
+
+
+class SeasonState:
+    """Stato cumulato di una stagione, interrogabile a qualunque data."""
+
+    def __init__(self, competition, season, version, matches, ctx_rows):
+        self.competition = competition
+        self.season = season
+        self.version = version
+        self.ctx_by_id = {c.match_id: c for c in ctx_rows}
+
+        teams = sorted({m.home_team for m in matches} | {m.away_team for m in matches})
+        self.total_teams = len(teams)
+        table = {t: {"points": 0, "gf": 0, "ga": 0, "played": 0} for t in teams}
+        self._initial_ranks = rank_table(table)
+
+        self._dates = []  # date di gioco crescenti
+        self._ranks = []  # classifica dopo ogni data di gioco
+        self._history = {t: [] for t in teams}  # partite in ordine (date, id)
+        self._team_dates = {t: [] for t in teams}
+        self._cum = {t: [] for t in teams}  # (overall, home, away) dopo ogni partita
+        self._pts = {t: [] for t in teams}
+
+        for day, group in groupby(matches, key=lambda m: m.date):
+            for m in group:
+                hg = m.home_goals or 0
+                ag = m.away_goals or 0
+                for team, gf, ga, is_home in ((m.home_team, hg, ag, True), (m.away_team, ag, hg, False)):
+                    pts = 3 if gf > ga else (1 if gf == ga else 0)
+                    overall, home, away = self._cum[team][-1] if self._cum[team] else (_ZERO, _ZERO, _ZERO)
+                    if is_home:
+                        home = _add(home, gf, ga, pts)
+                    else:
+                        away = _add(away, gf, ga, pts)
+                    self._cum[team].append((_add(overall, gf, ga, pts), home, away))
+                    self._pts[team].append(pts)
+                    self._team_dates[team].append(day)
+                    self._history[team].append(m)
+
+                    row = table[team]
+                    row["played"] += 1
+                    row["gf"] += gf
+                    row["ga"] += ga
+                    row["points"] += pts
+            self._dates.append(day)
+            self._ranks.append(rank_table(table))
+
+    def ranks_before(self, day: str) -> dict:
+        i = bisect_left(self._dates, day)
+        return self._ranks[i - 1] if i else self._initial_ranks
+
+    def played_before(self, team: str, day: str) -> int:
+        return bisect_left(self._team_dates.get(team, []), day)
+
+    def splits(self, team: str, k: int) -> dict:
+        """Come rules_v1._compute_basic_splits sulle prime k partite della squadra."""
+        overall, home, away = self._cum[team][k - 1] if k else (_ZERO, _ZERO, _ZERO)
+        out = {
+            name: pack_split(dict(zip(_SPLIT_KEYS, counts)))
+            for name, counts in (("overall", overall), ("home", home), ("away", away))
+        }
+        last5 = self._pts[team][max(0, k - 5):k] if k else []
+        out["overall"]["last5_ppg"] = (sum(last5) / len(last5)) if last5 else 0.0
+        return out
+
+    def history(self, team: str, k: int):
+        return self._history.get(team, [])[:k]
+
+
+def load_season_state(session, competition: str, season: int, version: int) -> SeasonState:
+    snap = get_snapshot(competition, season)
+    if snap is not None:
+        matches, ctx_rows = snap.rows()
+    else:
+        matches = [MatchRow(*r) for r in load_season_rows(session, competition, season)]
+        ctx_rows = [
+            ContextRow(*r) for r in session.execute(
+                select(
+                    MatchContext.match_id, MatchContext.home_rank_before,
+                    MatchContext.away_rank_before, MatchContext.total_teams,
+                )
+                .where(MatchContext.competition == competition)
+                .where(MatchContext.season == season)
+            )
+        ]
+    return SeasonState(competition, season, version, matches, ctx_rows)
+
+
+_lock = threading.Lock()
+_states = OrderedDict()
+# un lock di caricamento per coppia: _lock protegge solo il dict, cosi' il
+# caricamento di una stagione non blocca le richieste sulle altre
+_loading = {}
+
+
+def _fresh(key, version):
+    """Stato in LRU per la versione indicata, o None. Da chiamare con _lock."""
+    state = _states.get(key)
+    if state is not None and state.version == version:
+        _states.move_to_end(key)
+        return state
+    return None
+
+
+def get_season_state(competition: str, season: int) -> SeasonState:
+    """Stato della coppia per la data_version corrente (LRU di MAX_STATES coppie per processo)."""
+    version = current_data_version()
+    key = (competition, season)
+    with _lock:
+        state = _fresh(key, version)
+        if state is not None:
+            return state
+        loading = _loading.setdefault(key, threading.Lock())
+
+    with loading:
+        with _lock:
+            # caricato da un altro thread mentre si aspettava
+            state = _fresh(key, version)
+            if state is not None:
+                return state
+
+        session = SessionLocal()
+        try:
+            state = load_season_state(session, competition, season, version)
+        finally:
+            session.close()
+
+        with _lock:
+            _states[key] = state
+            _states.move_to_end(key)
+            while len(_states) > MAX_STATES:
+                _states.popitem(last=False)
+        return state
+
+
+def predict_whatif(home_team: str, away_team: str, competition: str, season: int, day: str,
+                   weights: dict | None = None, debug: bool = True) -> dict:
+    """Stesso output di /api/predict (senza match_id) per una partita ipotetica."""
+    W = merge_weights(weights)
+    state = get_season_state(competition, season)
+    total_teams = state.total_teams or DEFAULT_TOTAL_TEAMS
+    ranks = state.ranks_before(day)
+
+    warnings = []
+    for team in (home_team, away_team):
+        if team not in ranks:
+            warnings.append(f"{team}: nessuna partita FINISHED in {competition} {season}")
+
+    home_rank = ranks.get(home_team, total_teams // 2)
+    away_rank = ranks.get(away_team, total_teams // 2)
+    home_k = state.played_before(home_team, day)
+    away_k = state.played_before(away_team, day)
+
+    home_vs = away_vs = (0.0, 0.0, 0.0, 0)
+    if needs_vs_band(W, debug):
+        home_vs = vs_band_ppg(home_team, state.history(home_team, home_k), state.ctx_by_id, away_rank, total_teams)[:4]
+        away_vs = vs_band_ppg(away_team, state.history(away_team, away_k), state.ctx_by_id, home_rank, total_teams)[:4]
+
+    elo = None
+    if needs_elo(W, debug):
+        session = SessionLocal()
+        try:
+            elo = current_ratings(session, home_team, away_team, season)
+        finally:
+            session.close()
+
+    out = {
+        "ok": True,
+        "whatif": True,
+        "competition": competition,
+        "season": season,
+        "date": day,
+        "home_team": home_team,
+        "away_team": away_team,
+        "model": "rules_v1",
+    }
+    out.update(score_inputs(
+        W, (home_rank, away_rank, total_teams),
+        state.splits(home_team, home_k),
+        state.splits(away_team, away_k),
+        home_vs, away_vs, elo, debug,
+    ))
+    if warnings:
+        out["warnings"] = warnings
+    return out
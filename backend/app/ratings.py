@@ -0,0 +1,214 @@
+# backend/app/ratings.py
+"""
+Elo rating incrementale.
+
+I rating sono per nome squadra e attraversano stagioni e competizioni
+(una squadra promossa dalla Serie B porta con se' il suo rating).
+Ogni match FINISHED viene valutato una sola volta: si salvano i rating
+pre/post partita in match_ratings e si aggiorna team_ratings, quindi
+l'import costa O(1) per nuovo risultato invece di rigiocare la storia.
+"""
+
+from sqlalchemy import select
+
+from app.models import Match, MatchRating, TeamRating
+
+ELO_INITIAL = 1500.0
+ELO_K = 20.0
+ELO_HOME_ADVANTAGE = 60.0
+# a inizio stagione il rating viene riavvicinato alla media (1.0 = nessuna regressione)
+ELO_SEASON_CARRY = 0.8
+
+
+def expected_home(home_rating: float, away_rating: float, home_advantage: float = ELO_HOME_ADVANTAGE) -> float:
+    return 1.0 / (1.0 + 10 ** ((away_rating - (home_rating + home_advantage)) / 400.0))
+
+
+def _goal_multiplier(goal_diff: int) -> float:
+    # World Football Elo: vittorie larghe pesano di piu'
+    gd = abs(goal_diff)
+    if gd <= 1:
+        return 1.0
+    if gd == 2:
+        return 1.5
+    return (11.0 + gd) / 8.0
+
+
+def elo_update(home_rating: float, away_rating: float, home_goals: int, away_goals: int):
+    """Ritorna (home_after, away_after, home_expected) per un singolo risultato."""
+    exp = expected_home(home_rating, away_rating)
+    if home_goals > away_goals:
+        actual = 1.0
+    elif home_goals < away_goals:
+        actual = 0.0
+    else:
+        actual = 0.5
+
+    delta = ELO_K * _goal_multiplier(home_goals - away_goals) * (actual - exp)
+    return home_rating + delta, away_rating - delta, exp
+
+
+def _season_adjusted(tr, season):
+    """Rating da usare come 'before' per una partita della stagione indicata."""
+    if tr is None:
+        return ELO_INITIAL
+    if season is not None and tr.last_season is not None and season > tr.last_season:
+        return ELO_INITIAL + (tr.rating - ELO_INITIAL) * ELO_SEASON_CARRY
+    return tr.rating
+
+
+def apply_ratings(session, matches) -> int:
+    """
+    Applica Elo ai match indicati (gia' FINISHED, non ancora valutati),
+    nell'ordine in cui arrivano. Non fa commit.
+    """
+    cache = {}
+
+    def load(team):
+        if team not in cache:
+            cache[team] = session.get(TeamRating, team)
+        return cache[team]
+
+    applied = 0
+    for m in matches:
+        if m.home_goals is None or m.away_goals is None:
+            continue
+
+        home_tr = load(m.home_team)
+        away_tr = load(m.away_team)
+        home_before = _season_adjusted(home_tr, m.season)
+        away_before = _season_adjusted(away_tr, m.season)
+
+        home_after, away_after, exp = elo_update(home_before, away_before, m.home_goals, m.away_goals)
+
+        session.add(MatchRating(
+            match_id=m.id,
+            competition=m.competition,
+            season=m.season,
+            date=m.date,
+            home_team=m.home_team,
+            away_team=m.away_team,
+            home_rating_before=home_before,
+            away_rating_before=away_before,
+            home_rating_after=home_after,
+            away_rating_after=away_after,
+            home_expected=exp,
+        ))
+
+        for team, tr, after in ((m.home_team, home_tr, home_after), (m.away_team, away_tr, away_after)):
+            if tr is None:
+                tr = TeamRating(team=team, rating=after, matches=0)
+                session.add(tr)
+                cache[team] = tr
+            tr.rating = after
+            tr.matches = (tr.matches or 0) + 1
+            tr.last_date = m.date
+            tr.last_season = m.season
+            tr.last_competition = m.competition
+
+        applied += 1
+
+    return applied
+
+
+def update_ratings(session) -> int:
+    """
+    Valuta tutti i match FINISHED senza riga in match_ratings, in ordine cronologico.
+    Chiamata a fine import: tocca solo i risultati nuovi.
+    """
+    pending = (
+        session.query(Match)
+        .outerjoin(MatchRating, MatchRating.match_id == Match.id)
+        .filter(MatchRating.match_id.is_(None))
+        .filter(Match.status == "FINISHED")
+        .filter(Match.season.isnot(None))
+        .order_by(Match.date.asc(), Match.id.asc())
+        .all()
+    )
+    applied = apply_ratings(session, pending)
+    session.commit()
+    return applied
+
+
+def rewind_ratings(session, since_date: str) -> int:
+    """
+    Annulla l'Elo dei match dal giorno since_date in poi (es. un risultato
+    corretto): team_ratings torna allo stato dell'ultima partita precedente,
+    poi update_ratings rigioca solo la coda. Non fa commit.
+    """
+    undone = session.query(MatchRating).filter(MatchRating.date >= since_date).all()
+    if not undone:
+        return 0
+    teams = {r.home_team for r in undone} | {r.away_team for r in undone}
+    for r in undone:
+        session.delete(r)
+    session.flush()
+
+    state = {}
+    for r in (
+        session.query(MatchRating)
+        .filter(MatchRating.home_team.in_(teams) | MatchRating.away_team.in_(teams))
+        .order_by(MatchRating.date.asc(), MatchRating.match_id.asc())
+    ):
+        for team, after in ((r.home_team, r.home_rating_after), (r.away_team, r.away_rating_after)):
+            if team in teams:
+                matches = state[team]["matches"] + 1 if team in state else 1
+                state[team] = dict(rating=after, matches=matches, last_date=r.date,
+                                   last_season=r.season, last_competition=r.competition)
+
+    for team in teams:
+        tr = session.get(TeamRating, team)
+        if team not in state:
+            if tr is not None:
+                session.delete(tr)
+            continue
+        if tr is None:
+            tr = TeamRating(team=team)
+            session.add(tr)
+        for key, value in state[team].items():
+            setattr(tr, key, value)
+    session.flush()
+    return len(undone)
+
+
+def rebuild_ratings(session) -> int:
+    """Azzera e rigioca tutta la storia (solo per manutenzione)."""
+    session.query(MatchRating).delete()
+    session.query(TeamRating).delete()
+    session.commit()
+    return update_ratings(session)
+
+
+def pre_match_ratings(session, match) -> dict:
+    """
+    Rating pre-partita per il predictor.
+    Match gia' valutati: valori salvati; match futuri: rating corrente delle squadre.
+    """
+    mr = session.get(MatchRating, match.id)
+    if mr is None:
+        return current_ratings(session, match.home_team, match.away_team, match.season)
+
+    home, away = mr.home_rating_before, mr.away_rating_before
+    return {
+        "home_rating": home,
+        "away_rating": away,
+        "home_expected": expected_home(home, away),
+        "source": "match",
+    }
+
+
+def current_ratings(session, home_team: str, away_team: str, season) -> dict:
+    """Rating corrente delle due squadre (con il rientro verso la media a inizio stagione)."""
+    rows = session.execute(
+        select(TeamRating).where(TeamRating.team.in_([home_team, away_team]))
+    ).scalars().all()
+    by_team = {r.team: r for r in rows}
+    home = _season_adjusted(by_team.get(home_team), season)
+    away = _season_adjusted(by_team.get(away_team), season)
+
+    return {
+        "home_rating": home,
+        "away_rating": away,
+        "home_expected": expected_home(home, away),
+        "source": "current",
+    }
@@ -3,13 +3,23 @@
 import os
 import sys
 import subprocess
+import time
 from pathlib import Path
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from sqlalchemy import text
 
-from app.db import SessionLocal
-from app.models import Match, MatchContext
+from app.db import SessionLocal, utcnow_iso
+from app import export
+from app.audit import audit_report, run_audit
+from app.context import compute_context_rows, default_workers, load_season_rows, rebuild_pairs, write_context_rows
+from app.models import Match
+from app.ratings import rebuild_ratings, update_ratings
+from app.snapshots import publish_snapshots
+from app.team_index import refresh_team_index
+from app.cache import get_cache
+from app.versioning import bump_data_version, current_data_version, pair_tag
+from app.warmup import start_warmup, warm_cache, warmup_status
 
 bp_admin = Blueprint("admin", __name__)
 
@@ -27,11 +37,11 @@ def require_admin():
     return True, None
 
 
-def _rebuild_context_all_internal(only_finished: bool = True, limit=None):
+def _rebuild_context_all_internal(only_finished: bool = True, limit=None, workers: int = 1):
     """
     Ricostruisce match_context per tutte le coppie (competition, season).
-    Usata internamente dopo /api/admin/import per automatizzare top/mid/bottom + ranking.
-    (Questa funzione arriva dal tuo vecchio app.py) :contentReference[oaicite:2]{index=2}
+    Usata da /api/admin/context/rebuild-all (l'import ricostruisce solo le coppie cambiate).
+    Con workers > 1 le coppie vengono calcolate in parallelo (vedi app.context.rebuild_pairs).
     """
     session = SessionLocal()
     try:
@@ -50,93 +60,19 @@ def _rebuild_context_all_internal(only_finished: bool = True, limit=None):
 
         pairs = [(p[0], int(p[1])) for p in pairs if p[0] is not None and p[1] is not None]
 
-        results = []
-
-        for comp, seas in pairs:
-            matches = (
-                session.query(Match)
-                .filter(Match.status == "FINISHED")
-                .filter(Match.competition == comp)
-                .filter(Match.season == seas)
-                .order_by(Match.date.asc(), Match.id.asc())
-                .all()
-            )
-
-            if not matches:
-                results.append({"competition": comp, "season": seas, "inserted": 0, "total_teams": 0})
-                continue
-
-            teams = set()
-            for m in matches:
-                teams.add(m.home_team)
-                teams.add(m.away_team)
-            teams = sorted(list(teams))
-            total_teams = len(teams)
-
-            session.execute(text("""
-                DELETE FROM match_context
-                WHERE competition = :c AND season = :s
-            """), {"c": comp, "s": seas})
-
-            table = {t: {"points": 0, "gf": 0, "ga": 0, "played": 0} for t in teams}
-
-            def rank_map():
-                rows = []
-                for t, v in table.items():
-                    gd = v["gf"] - v["ga"]
-                    rows.append((t, v["points"], gd, v["gf"], v["played"]))
-                rows.sort(key=lambda r: (r[1], r[2], r[3], r[4], r[0]), reverse=True)
-                return {team: idx + 1 for idx, (team, *_rest) in enumerate(rows)}
-
-            inserted = 0
-
-            for m in matches:
-                ranks_before = rank_map()
-                home_rank_before = ranks_before.get(m.home_team, total_teams)
-                away_rank_before = ranks_before.get(m.away_team, total_teams)
-
-                session.add(MatchContext(
-                    match_id=m.id,
-                    competition=comp,
-                    season=seas,
-                    date=m.date,
-                    home_team=m.home_team,
-                    away_team=m.away_team,
-                    home_rank_before=home_rank_before,
-                    away_rank_before=away_rank_before,
-                    total_teams=total_teams
-                ))
-                inserted += 1
-
-                hg = m.home_goals or 0
-                ag = m.away_goals or 0
-
-                table[m.home_team]["played"] += 1
-                table[m.away_team]["played"] += 1
-
-                table[m.home_team]["gf"] += hg
-                table[m.home_team]["ga"] += ag
-                table[m.away_team]["gf"] += ag
-                table[m.away_team]["ga"] += hg
-
-                if hg > ag:
-                    table[m.home_team]["points"] += 3
-                elif hg < ag:
-                    table[m.away_team]["points"] += 3
-                else:
-                    table[m.home_team]["points"] += 1
-                    table[m.away_team]["points"] += 1
+        t0 = time.perf_counter()
+        results = rebuild_pairs(session, pairs, workers=workers)
+        elapsed = time.perf_counter() - t0
 
-            session.commit()
-
-            results.append({
-                "competition": comp,
-                "season": seas,
-                "inserted": inserted,
-                "total_teams": total_teams
-            })
-
-        return {"ok": True, "pairs": len(results), "results": results}
+        inserted = sum(r["inserted"] for r in results)
+        return {
+            "ok": True,
+            "pairs": len(results),
+            "workers": workers,
+            "elapsed_s": elapsed,
+            "rows_per_s": (inserted / elapsed) if elapsed else 0.0,
+            "results": results,
+        }
     finally:
         session.close()
 
@@ -155,19 +91,64 @@ def admin_import():
     try:
         script_path = Path(__file__).resolve().parents[2] / "update_leagues.py"
         result = subprocess.run(
-            [sys.executable, str(script_path)],
+            # audit una sola volta, qui sotto
+            [sys.executable, str(script_path), "--no-audit"],
             capture_output=True,
             text=True,
             check=True
         )
 
-        rebuild_summary = _rebuild_context_all_internal(only_finished=True)
+        # lo script ha gia' ricostruito context ed Elo delle coppie cambiate,
+        # incrementato data_version e pubblicato gli snapshot: qui solo audit
+        data_version = current_data_version(max_age=0)
+        refresh_team_index()
+        audit = run_audit()
+        # il warm-up gira in background: la risposta non lo aspetta
+        warmup = start_warmup()
 
         return jsonify({
             "ok": True,
             "stdout": (result.stdout or "")[-4000:],
             "stderr": (result.stderr or "")[-4000:],
-            "context_rebuild": rebuild_summary
+            "data_version": data_version,
+            "audit": audit,
+            "warmup": warmup,
+        }), 200
+
+    except subprocess.CalledProcessError as e:
+        return jsonify({
+            "ok": False,
+            "stdout": (e.stdout or "")[-4000:],
+            "stderr": (e.stderr or "")[-4000:],
+        }), 500
+
+
+@bp_admin.route("/api/admin/import-live", methods=["POST"])
+def admin_import_live():
+    """
+    Ingest leggero per i giorni di partita: solo la finestra di date intorno a oggi,
+    context ed Elo avanzati in modo incrementale (niente rebuild-all).
+    """
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    payload = request.get_json(silent=True) or {}
+    days_back = int(payload.get("days_back", 1))
+    days_ahead = int(payload.get("days_ahead", 1))
+
+    try:
+        script_path = Path(__file__).resolve().parents[2] / "update_leagues.py"
+        result = subprocess.run(
+            [sys.executable, str(script_path), "--live", "--days-back", str(days_back), "--days-ahead", str(days_ahead)],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return jsonify({
+            "ok": True,
+            "stdout": (result.stdout or "")[-4000:],
+            "stderr": (result.stderr or "")[-4000:],
         }), 200
 
     except subprocess.CalledProcessError as e:
@@ -256,87 +237,23 @@ def admin_rebuild_context():
 
     session = SessionLocal()
     try:
-        matches = (
-            session.query(Match)
-            .filter(Match.status == "FINISHED")
-            .filter(Match.competition == competition)
-            .filter(Match.season == season)
-            .order_by(Match.date.asc(), Match.id.asc())
-            .all()
-        )
+        rows = load_season_rows(session, competition, season)
 
-        if not matches:
+        if not rows:
             return jsonify({"ok": True, "message": "No FINISHED matches found", "inserted": 0, "total_teams": 0}), 200
 
-        teams = set()
-        for m in matches:
-            teams.add(m.home_team)
-            teams.add(m.away_team)
-        teams = sorted(list(teams))
-        total_teams = len(teams)
-
-        session.execute(text("""
-            DELETE FROM match_context
-            WHERE competition = :competition AND season = :season
-        """), {"competition": competition, "season": season})
-
-        table = {t: {"points": 0, "gf": 0, "ga": 0, "played": 0} for t in teams}
-
-        def rank_map():
-            rows = []
-            for t, v in table.items():
-                gd = v["gf"] - v["ga"]
-                rows.append((t, v["points"], gd, v["gf"], v["played"]))
-            rows.sort(key=lambda r: (r[1], r[2], r[3], r[4], r[0]), reverse=True)
-            return {team: idx + 1 for idx, (team, *_rest) in enumerate(rows)}
-
-        inserted = 0
-
-        for m in matches:
-            ranks_before = rank_map()
-            home_rank_before = ranks_before.get(m.home_team, total_teams)
-            away_rank_before = ranks_before.get(m.away_team, total_teams)
-
-            session.add(MatchContext(
-                match_id=m.id,
-                competition=competition,
-                season=season,
-                date=m.date,
-                home_team=m.home_team,
-                away_team=m.away_team,
-                home_rank_before=home_rank_before,
-                away_rank_before=away_rank_before,
-                total_teams=total_teams
-            ))
-            inserted += 1
-
-            hg = m.home_goals or 0
-            ag = m.away_goals or 0
-
-            table[m.home_team]["played"] += 1
-            table[m.away_team]["played"] += 1
-
-            table[m.home_team]["gf"] += hg
-            table[m.home_team]["ga"] += ag
-            table[m.away_team]["gf"] += ag
-            table[m.away_team]["ga"] += hg
-
-            if hg > ag:
-                table[m.home_team]["points"] += 3
-            elif hg < ag:
-                table[m.away_team]["points"] += 3
-            else:
-                table[m.home_team]["points"] += 1
-                table[m.away_team]["points"] += 1
-
+        ctx_rows, total_teams = compute_context_rows(competition, season, rows)
+        write_context_rows(session, competition, season, ctx_rows)
         session.commit()
+        publish_snapshots(bump_data_version(tags=[pair_tag(competition, season)]))
 
         return jsonify({
             "ok": True,
             "competition": competition,
             "season": season,
             "total_teams": total_teams,
-            "inserted": inserted
+            "inserted": len(ctx_rows),
+            "warmup": start_warmup(pairs=[(competition, season)]),
         }), 200
     finally:
         session.close()
@@ -351,6 +268,147 @@ def admin_rebuild_context_all():
     payload = request.get_json(force=True) or {}
     only_finished = payload.get("only_finished", True)
     limit = payload.get("limit")
-
-    summary = _rebuild_context_all_internal(only_finished=bool(only_finished), limit=limit)
+    # "parallel": true usa un worker per core, oppure "workers": N esplicito
+    workers = payload.get("workers")
+    if workers is None:
+        workers = default_workers() if payload.get("parallel") else 1
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        return jsonify({"error": "workers deve essere un intero >= 1"}), 400
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+        return jsonify({"error": "limit deve essere un intero >= 1"}), 400
+    # mai piu' processi dei core (default_workers e' gia' limitato a 8)
+    workers = min(workers, default_workers())
+
+    summary = _rebuild_context_all_internal(only_finished=bool(only_finished), limit=limit, workers=workers)
+    summary["data_version"] = bump_data_version()
+    publish_snapshots(summary["data_version"])
+    summary["warmup"] = start_warmup()
     return jsonify(summary), 200
+
+
+@bp_admin.route("/api/admin/ratings/update", methods=["POST"])
+def admin_ratings_update():
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    payload = request.get_json(silent=True) or {}
+    full = bool(payload.get("rebuild", False))
+
+    session = SessionLocal()
+    try:
+        rated = rebuild_ratings(session) if full else update_ratings(session)
+        if rated:
+            version = bump_data_version(session)
+            session.commit()
+            publish_snapshots(version)
+        return jsonify({"ok": True, "rebuild": full, "rated": rated}), 200
+    finally:
+        session.close()
+
+
+@bp_admin.route("/api/admin/export/<dataset>", methods=["GET"])
+def admin_export(dataset):
+    """
+    Bulk export in streaming.
+
+    dataset: matches | context | predictions
+    Query params:
+      - format: ndjson (default) | csv
+      - competition, season (optional)
+      - since (optional): ISO UTC, rows with updated_at >= since
+      - status (predictions only): default non-FINISHED, "all" for everything
+
+    L'header X-Export-Marker va usato come `since` della chiamata successiva.
+    """
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if dataset not in export.DATASETS:
+        return jsonify({"error": f"dataset non supportato: {dataset}", "datasets": list(export.DATASETS)}), 400
+    if fmt not in export.FORMATS:
+        return jsonify({"error": f"format non supportato: {fmt}", "formats": list(export.FORMATS)}), 400
+
+    marker = utcnow_iso()
+    rows = export.iter_rows(
+        dataset,
+        competition=request.args.get("competition"),
+        season=request.args.get("season", type=int),
+        since=request.args.get("since"),
+        status=request.args.get("status"),
+    )
+
+    if fmt == "csv":
+        body = export.as_csv(rows, export.fieldnames(dataset))
+        mimetype = "text/csv"
+    else:
+        body = export.as_ndjson(rows)
+        mimetype = "application/x-ndjson"
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={
+            "X-Export-Marker": marker,
+            "Content-Disposition": f'attachment; filename="{dataset}.{fmt}"',
+        },
+    )
+
+
+@bp_admin.route("/api/admin/cache", methods=["GET"])
+def admin_cache_stats():
+    """Backend, numero di voci e contatori hit/miss/stale per namespace (per processo), stato del warm-up."""
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+    return jsonify(dict(get_cache().stats(), warmup=warmup_status())), 200
+
+
+@bp_admin.route("/api/admin/cache/warm", methods=["POST"])
+def admin_cache_warm():
+    """
+    Riscalda la cache per le stagioni attive e aspetta il report (a fine import
+    parte gia' in background); {"workers": N} opzionale.
+    """
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    payload = request.get_json(silent=True) or {}
+    workers = payload.get("workers")
+    return jsonify(warm_cache() if workers is None else warm_cache(workers=int(workers))), 200
+
+
+@bp_admin.route("/api/admin/audit", methods=["GET"])
+def admin_audit():
+    """
+    Ultimo giro dell'audit e anomalie salvate (lette da audit_findings, niente scansioni).
+
+    Query params:
+      - kind, competition, season (optional): filters
+      - limit (optional, int): max findings (default 100, max 1000)
+    """
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    limit = max(1, min(request.args.get("limit", default=100, type=int), 1000))
+    return jsonify(audit_report(
+        kind=request.args.get("kind"),
+        competition=request.args.get("competition"),
+        season=request.args.get("season", type=int),
+        limit=limit,
+    )), 200
+
+
+@bp_admin.route("/api/admin/audit/run", methods=["POST"])
+def admin_audit_run():
+    """Lancia l'audit sulle righe cambiate; {"full": true} ricontrolla tutto."""
+    ok, resp = require_admin()
+    if not ok:
+        return resp
+
+    payload = request.get_json(silent=True) or {}
+    return jsonify(run_audit(full=bool(payload.get("full", False)))), 200
@@ -1,7 +1,12 @@
 # backend/app/routes/predict.py
 
+from datetime import date
+
 from flask import Blueprint, request, jsonify
-from app.predictors.rules_v1 import predict_rule_based
+from app.cache import get_cache
+from app.predictors.rules_v1 import predict_rule_based, weights_error
+from app.predictors.whatif import predict_whatif
+from app.versioning import pair_tag
 
 bp_predict = Blueprint("predict", __name__)
 
@@ -11,6 +16,8 @@ def predict_match():
     data = request.get_json(force=True) or {}
     match_id = data.get("match_id")
     model = data.get("model", "rules_v1")
+    weights = data.get("weights")
+    debug = parse_debug(data.get("debug", request.args.get("debug")))
 
     if not match_id:
         return jsonify({"error": "match_id obbligatorio"}), 400
@@ -18,5 +25,56 @@ def predict_match():
     if model not in ("rules_v1", "rules"):
         return jsonify({"error": f"model non supportato: {model}"}), 400
 
-    out = predict_rule_based(int(match_id))
+    error = weights_error(weights)
+    if error:
+        return jsonify({"error": error}), 400
+
+    out, _hit = get_cache().get_or_compute(
+        "predict",
+        [int(match_id), weights, debug],
+        prediction_tags,
+        lambda: predict_rule_based(int(match_id), weights=weights, debug=debug),
+    )
     return jsonify(out), (200 if out.get("ok") else 400)
+
+
+@bp_predict.route("/api/predict/whatif", methods=["POST"])
+def predict_whatif_match():
+    """rules_v1 per una partita ipotetica: nessuna riga in matches, input alla data indicata."""
+    data = request.get_json(force=True) or {}
+    home_team = (data.get("home_team") or "").strip()
+    away_team = (data.get("away_team") or "").strip()
+    competition = (data.get("competition") or "").strip()
+    weights = data.get("weights")
+    debug = parse_debug(data.get("debug", request.args.get("debug")))
+
+    if not home_team or not away_team or not competition:
+        return jsonify({"error": "home_team, away_team e competition obbligatori"}), 400
+    if home_team == away_team:
+        return jsonify({"error": "home_team e away_team devono essere diverse"}), 400
+    try:
+        season = int(data.get("season"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "season deve essere un intero"}), 400
+    try:
+        day = date.fromisoformat(str(data.get("date"))).isoformat()
+    except ValueError:
+        return jsonify({"error": "date deve essere YYYY-MM-DD"}), 400
+    error = weights_error(weights)
+    if error:
+        return jsonify({"error": error}), 400
+
+    return jsonify(predict_whatif(home_team, away_team, competition, season, day, weights=weights, debug=debug))
+
+
+def prediction_tags(out):
+    return [pair_tag(out.get("competition"), out.get("season"))]
+
+
+def parse_debug(value) -> bool:
+    """debug nel body o ?debug=: 0 / false / no / off lo disattivano (default: attivo)."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return bool(value)
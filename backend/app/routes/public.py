@@ -3,65 +3,101 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy import or_
 
+from app import stats
+from app.bootstrap import build_bootstrap, upcoming_matches, with_cached_predictions
+from app.cache import get_cache
 from app.db import SessionLocal
-from app.models import Match, MatchContext
+from app.h2h import head_to_head
+from app.models import Match, MatchRating, TeamRating
+from app.predictors import get_model
+from app.simulate import DEFAULT_SIMULATIONS, simulate_season
+from app.team_index import get_team_index
+from app.versioning import TAG_ALL, pair_tag
 
 bp_public = Blueprint("public", __name__)
 
+MAX_BATCH_TEAMS = 40
+
 
 @bp_public.route("/api/teams", methods=["GET"])
 def get_teams():
+    """
+    Teams with at least one FINISHED match, served from the in-memory team index.
+
+    Query params:
+      - competition, season (optional)
+      - q (optional): case-insensitive name prefix, for type-ahead
+      - limit (optional, int): max results with q
+    """
     competition = request.args.get("competition")
     season = request.args.get("season", type=int)
+    prefix = (request.args.get("q") or "").strip()
+    limit = request.args.get("limit", type=int)
 
-    session = SessionLocal()
-    try:
-        q = session.query(Match).filter(Match.status == "FINISHED")
+    idx = get_team_index()
+    if prefix:
+        teams = idx.search(prefix, competition, season, limit=limit)
+    else:
+        teams = idx.teams(competition, season)
 
-        if competition:
-            q = q.filter(Match.competition == competition)
-        if season is not None:
-            q = q.filter(Match.season == season)
-
-        teams = set()
-        for m in q.all():
-            if m.home_team:
-                teams.add(m.home_team)
-            if m.away_team:
-                teams.add(m.away_team)
-
-        return jsonify({"teams": sorted(list(teams))})
-    finally:
-        session.close()
+    return jsonify({"teams": teams})
 
 
 @bp_public.route("/api/matches", methods=["GET"])
 def get_matches():
-    session = SessionLocal()
-    try:
-        matches = (
-            session.query(Match)
-            .filter(Match.status != "FINISHED")
-            .order_by(Match.date.asc())
-            .all()
-        )
-
-        results = [
-            {
-                "id": m.id,
-                "competition": m.competition,
-                "season": m.season,
-                "date": m.date.isoformat() if m.date else None,
-                "status": m.status,
-                "home_team": m.home_team,
-                "away_team": m.away_team,
-            }
-            for m in matches
-        ]
-
-        return jsonify({"matches": results})
-    finally:
-        session.close()
+    out, _hit = get_cache().get_or_compute("matches", [], [TAG_ALL], upcoming_matches)
+    return jsonify(out)
+
+
+@bp_public.route("/api/bootstrap", methods=["GET"])
+def get_bootstrap():
+    """
+    Everything the frontend loads at startup, in one round-trip.
+
+    Query params:
+      - competition, season (optional): filter teams and fixtures; with both, each
+        fixture also has the probabilities of /api/predict and the response has the
+        current standings (up to the last FINISHED date)
+
+    Response: teams (as /api/teams), matches (as /api/matches), standings + standings_date.
+    Without both filters (page load with "Tutte") there are no standings and only the
+    fixtures whose prediction is already cached have probabilities: predicting every
+    upcoming fixture would make the first call the slowest.
+    Parts are read from / written to the same cache entries as those endpoints.
+    """
+    competition = request.args.get("competition") or None
+    season = request.args.get("season", type=int)
+
+    cache = get_cache()
+    out, _hit = cache.get_or_compute(
+        "bootstrap", [competition, season], [pair_tag(competition, season)],
+        lambda: build_bootstrap(competition, season),
+    )
+    if not competition or season is None:
+        # fuori dalla voce bootstrap: le previsioni entrano in cache anche dopo
+        out = dict(out, matches=with_cached_predictions(cache, out["matches"]))
+    return jsonify(out)
+
+
+def _team_stats(teams, competition, season, sections=None, lines=None):
+    """Documenti /api/stats per squadra, dalla cache (tag della coppia) o calcolati."""
+    def compute():
+        session = SessionLocal()
+        try:
+            return stats.team_stats(session, teams, competition, season, sections, lines)
+        finally:
+            session.close()
+
+    docs, _hit = get_cache().get_or_compute(
+        "stats", [teams, competition, season, sections, lines], [pair_tag(competition, season)], compute,
+    )
+    return docs
+
+
+def _stats_options():
+    """(sections, lines) da sections= (alias fields=) e lines=; ValueError se non validi."""
+    sections = stats.parse_sections(request.args.get("sections") or request.args.get("fields"))
+    return sections, stats.parse_lines(request.args.get("lines"))
 
 
 @bp_public.route("/api/stats", methods=["GET"])
@@ -73,6 +109,11 @@ def get_stats():
       - team (required)
       - competition (optional)
       - season (optional, int)
+      - sections / fields (optional): comma separated subset of stats.STATS_SECTIONS,
+        e.g. sections=overall,form; only those parts are computed.
+        "histogram" (goal histograms, exact scores, clean sheets) is opt-in
+      - lines (optional): over/under lines replacing 0.5-4.5, e.g. lines=1.5,2.5,5.5;
+        also adds the same lines on goals scored / conceded (over_under.team_lines)
 
     Response format is aligned to frontend/script.js renderStats().
     """
@@ -82,329 +123,45 @@ def get_stats():
 
     if not team:
         return jsonify({"error": "Parametro 'team' obbligatorio"}), 400
-
-    session = SessionLocal()
     try:
-        q = session.query(Match).filter(Match.status == "FINISHED")
-        if competition:
-            q = q.filter(Match.competition == competition)
-        if season_param is not None:
-            q = q.filter(Match.season == season_param)
-
-        q = q.filter(or_(Match.home_team == team, Match.away_team == team))
-        matches = q.order_by(Match.date.asc(), Match.id.asc()).all()
-
-        # Helper accumulators
-        def empty_bucket():
-            return {
-                "matches": 0,
-                "wins": 0,
-                "draws": 0,
-                "losses": 0,
-                "goals_scored": 0,
-                "goals_conceded": 0,
-                "failed_to_score": 0,
-                "tot_goals": 0,  # scored + conceded per match (sum)
-                "ou": {  # counts
-                    0.5: {"over": 0, "under": 0},
-                    1.5: {"over": 0, "under": 0},
-                    2.5: {"over": 0, "under": 0},
-                    3.5: {"over": 0, "under": 0},
-                    4.5: {"over": 0, "under": 0},
-                },
-                "btts": 0,
-                "last": [],  # list of (result_char, gf, ga)
-            }
-
-        def push_match(bucket, gf, ga, result_char):
-            bucket["matches"] += 1
-            bucket["goals_scored"] += gf
-            bucket["goals_conceded"] += ga
-            bucket["tot_goals"] += (gf + ga)
-            if gf == 0:
-                bucket["failed_to_score"] += 1
-
-            if result_char == "W":
-                bucket["wins"] += 1
-            elif result_char == "D":
-                bucket["draws"] += 1
-            else:
-                bucket["losses"] += 1
-
-            total = gf + ga
-            for line in (0.5, 1.5, 2.5, 3.5, 4.5):
-                if total > line:
-                    bucket["ou"][line]["over"] += 1
-                else:
-                    bucket["ou"][line]["under"] += 1
-
-            if gf > 0 and ga > 0:
-                bucket["btts"] += 1
-
-            bucket["last"].append((result_char, gf, ga))
-
-        overall = empty_bucket()
-        home_b = empty_bucket()
-        away_b = empty_bucket()
-
-        match_ids = []
-        for m in matches:
-            hg = m.home_goals or 0
-            ag = m.away_goals or 0
-            is_home = (m.home_team == team)
-
-            gf = hg if is_home else ag
-            ga = ag if is_home else hg
-
-            if gf > ga:
-                res = "W"
-            elif gf < ga:
-                res = "L"
-            else:
-                res = "D"
-
-            push_match(overall, gf, ga, res)
-            if is_home:
-                push_match(home_b, gf, ga, res)
-            else:
-                push_match(away_b, gf, ga, res)
-
-            match_ids.append(m.id)
-
-        def summarize(bucket):
-            mp = bucket["matches"]
-            wins = bucket["wins"]
-            draws = bucket["draws"]
-            losses = bucket["losses"]
-            gf = bucket["goals_scored"]
-            ga = bucket["goals_conceded"]
-            pts = wins * 3 + draws
-
-            win_rate = (wins / mp) if mp else 0.0
-            draw_rate = (draws / mp) if mp else 0.0
-            loss_rate = (losses / mp) if mp else 0.0
-
-            avg_scored = (gf / mp) if mp else 0.0
-            avg_conceded = (ga / mp) if mp else 0.0
-            avg_total_goals = (bucket["tot_goals"] / mp) if mp else 0.0
-
-            # Over/Under lines
-            lines = {}
-            for line in (0.5, 1.5, 2.5, 3.5, 4.5):
-                over = bucket["ou"][line]["over"]
-                under = bucket["ou"][line]["under"]
-                lines[str(line).replace(".", "_")] = {
-                    "line": line,
-                    "over": over,
-                    "under": under,
-                    "over_rate": (over / mp) if mp else 0.0,
-                    "under_rate": (under / mp) if mp else 0.0,
-                }
+        sections, lines = _stats_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-            ou = {
-                "over_25": bucket["ou"][2.5]["over"],
-                "under_25": bucket["ou"][2.5]["under"],
-                "btts": bucket["btts"],
-                "over_25_rate": (bucket["ou"][2.5]["over"] / mp) if mp else 0.0,
-                "under_25_rate": (bucket["ou"][2.5]["under"] / mp) if mp else 0.0,
-                "btts_rate": (bucket["btts"] / mp) if mp else 0.0,
-                "lines": lines,
-            }
-
-            fts = {
-                "count": bucket["failed_to_score"],
-                "rate": (bucket["failed_to_score"] / mp) if mp else 0.0,
-            }
-
-            # Form: last 5/10 (from bucket["last"])
-            def form_block(n):
-                last_n = bucket["last"][-n:] if n > 0 else []
-                w = sum(1 for r, _, __ in last_n if r == "W")
-                d = sum(1 for r, _, __ in last_n if r == "D")
-                l = sum(1 for r, _, __ in last_n if r == "L")
-                pts_n = w * 3 + d
-                gf_n = sum(gf1 for _, gf1, __ in last_n)
-                ga_n = sum(ga1 for _, __, ga1 in last_n)
-                return {
-                    "matches": len(last_n),
-                    "record": f"{w}W-{d}D-{l}L",
-                    "points": pts_n,
-                    "goals_scored": gf_n,
-                    "goals_conceded": ga_n,
-                }
+    return jsonify(_team_stats([team], competition, season_param, sections, lines)[team])
 
-            form = {
-                "last_5": form_block(5),
-                "last_10": form_block(10),
-            }
-
-            return {
-                "matches": mp,
-                "wins": wins,
-                "draws": draws,
-                "losses": losses,
-                "win_rate": win_rate,
-                "draw_rate": draw_rate,
-                "loss_rate": loss_rate,
-                "goals_scored": gf,
-                "goals_conceded": ga,
-                "avg_scored": avg_scored,
-                "avg_conceded": avg_conceded,
-                "avg_total_goals": avg_total_goals,
-                "points": pts,
-                "ppg": (pts / mp) if mp else 0.0,
-                "over_under": ou,
-                "failed_to_score": fts,
-                "form": form,
-            }
-
-        # Build vs-rank groups using MatchContext (only if comp+season are provided)
-        vsg = None
-        if competition and (season_param is not None) and match_ids:
-            ctx_rows = (
-                session.query(MatchContext)
-                .filter(MatchContext.competition == competition)
-                .filter(MatchContext.season == season_param)
-                .filter(MatchContext.match_id.in_(match_ids))
-                .all()
-            )
 
-            if ctx_rows:
-                total_teams = max((c.total_teams or 0) for c in ctx_rows) or 0
-                top_n = 6 if total_teams >= 18 else (max(3, total_teams // 3) if total_teams else 6)
-                bottom_n = 5 if total_teams >= 18 else (max(3, total_teams // 4) if total_teams else 5)
-                bottom_threshold_rank = max(1, total_teams - bottom_n + 1) if total_teams else None
-
-                def empty_group():
-                    return {"matches": 0, "wins": 0, "draws": 0, "losses": 0, "goals_for": 0, "goals_against": 0}
-
-                groups_overall = {"Top": empty_group(), "Mid": empty_group(), "Bottom": empty_group()}
-                groups_home = {"Top": empty_group(), "Mid": empty_group(), "Bottom": empty_group()}
-                groups_away = {"Top": empty_group(), "Mid": empty_group(), "Bottom": empty_group()}
-
-                match_map = {m.id: m for m in matches}
-
-                for c in ctx_rows:
-                    m = match_map.get(c.match_id)
-                    if not m:
-                        continue
-
-                    is_home = (m.home_team == team)
-                    hg = m.home_goals or 0
-                    ag = m.away_goals or 0
-                    gf = hg if is_home else ag
-                    ga = ag if is_home else hg
-
-                    if gf > ga:
-                        res = "W"
-                    elif gf < ga:
-                        res = "L"
-                    else:
-                        res = "D"
-
-                    opp_rank = c.away_rank_before if is_home else c.home_rank_before
-                    if not opp_rank:
-                        band = "Mid"
-                    elif opp_rank <= top_n:
-                        band = "Top"
-                    elif bottom_threshold_rank and opp_rank >= bottom_threshold_rank:
-                        band = "Bottom"
-                    else:
-                        band = "Mid"
-
-                    for target in (groups_overall, (groups_home if is_home else groups_away)):
-                        g = target[band]
-                        g["matches"] += 1
-                        g["goals_for"] += gf
-                        g["goals_against"] += ga
-                        if res == "W":
-                            g["wins"] += 1
-                        elif res == "D":
-                            g["draws"] += 1
-                        else:
-                            g["losses"] += 1
-
-                def finalize_group(g):
-                    mp = g["matches"]
-                    pts = g["wins"] * 3 + g["draws"]
-                    return {
-                        "matches": mp,
-                        "wins": g["wins"],
-                        "draws": g["draws"],
-                        "losses": g["losses"],
-                        "win_rate": (g["wins"] / mp) if mp else 0.0,
-                        "ppg": (pts / mp) if mp else 0.0,
-                        "goals_for": g["goals_for"],
-                        "goals_against": g["goals_against"],
-                    }
-
-                bands = ["Top", "Mid", "Bottom"]
-                vsg = {
-                    "competition": competition,
-                    "season": season_param,
-                    "total_teams": total_teams,
-                    "top_n": top_n,
-                    "bottom_n": bottom_n,
-                    "bottom_threshold_rank": bottom_threshold_rank,
-                    "rank_bands": bands,
-                    "bands": {b: finalize_group(groups_overall[b]) for b in bands},
-                    "bands_home": {b: finalize_group(groups_home[b]) for b in bands},
-                    "bands_away": {b: finalize_group(groups_away[b]) for b in bands},
-                    "vs_top": finalize_group(groups_overall["Top"]),
-                    "vs_mid": finalize_group(groups_overall["Mid"]),
-                    "vs_bottom": finalize_group(groups_overall["Bottom"]),
-                    "home": {
-                        "vs_top": finalize_group(groups_home["Top"]),
-                        "vs_mid": finalize_group(groups_home["Mid"]),
-                        "vs_bottom": finalize_group(groups_home["Bottom"]),
-                    },
-                    "away": {
-                        "vs_top": finalize_group(groups_away["Top"]),
-                        "vs_mid": finalize_group(groups_away["Mid"]),
-                        "vs_bottom": finalize_group(groups_away["Bottom"]),
-                    },
-                }
+@bp_public.route("/api/stats/batch", methods=["GET"])
+def get_stats_batch():
+    """
+    Same per-team document as /api/stats for several teams, in one pass.
 
-        overall_s = summarize(overall)
-        home_s = summarize(home_b)
-        away_s = summarize(away_b)
+    Query params:
+      - teams (required): comma separated, e.g. teams=Inter,Milan
+      - competition (optional)
+      - season (optional, int)
+      - sections / fields, lines (optional): as in /api/stats
+    """
+    raw = request.args.get("teams") or ""
+    competition = request.args.get("competition")
+    season_param = request.args.get("season", type=int)
 
-        mp = overall_s["matches"]
-        out = {
-            "team": team,
-            "competition": competition or "All",
-            "season": season_param if season_param is not None else "All",
-
-            "matches_played": mp,
-            "wins": overall_s["wins"],
-            "draws": overall_s["draws"],
-            "losses": overall_s["losses"],
-            "win_rate": overall_s["win_rate"],
-            "draw_rate": overall_s["draw_rate"],
-            "loss_rate": overall_s["loss_rate"],
-
-            "goals_scored": overall_s["goals_scored"],
-            "goals_conceded": overall_s["goals_conceded"],
-            "goals": {
-                "avg_scored": overall_s["avg_scored"],
-                "avg_conceded": overall_s["avg_conceded"],
-                "avg_total_goals": overall_s["avg_total_goals"],
-                "goal_difference": overall_s["goals_scored"] - overall_s["goals_conceded"],
-            },
-
-            "over_under": overall_s["over_under"],
-            "failed_to_score": overall_s["failed_to_score"],
-            "form": overall_s["form"],
-
-            "home": home_s,
-            "away": away_s,
-
-            "vs_rank_groups": vsg or {"note": "MatchContext non disponibile (serve competition + season + rebuild context)"},
-        }
+    teams = stats.parse_teams_param(raw)
 
-        return jsonify(out)
-    finally:
-        session.close()
+    if not teams:
+        return jsonify({"error": "Parametro 'teams' obbligatorio"}), 400
+    if len(teams) > MAX_BATCH_TEAMS:
+        return jsonify({"error": f"Massimo {MAX_BATCH_TEAMS} squadre per richiesta"}), 400
+    try:
+        sections, lines = _stats_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "competition": competition or "All",
+        "season": season_param if season_param is not None else "All",
+        "teams": _team_stats(teams, competition, season_param, sections, lines),
+    })
 
 
 @bp_public.route("/api/standings", methods=["GET"])
@@ -416,78 +173,216 @@ def standings_snapshot():
     if not competition or season is None or not date_limit:
         return jsonify({"error": "Servono competition, season, date"}), 400
 
+    def compute():
+        session = SessionLocal()
+        try:
+            return stats.load_standings(session, competition, season, date_limit)
+        finally:
+            session.close()
+
+    rows, _hit = get_cache().get_or_compute(
+        "standings", [competition, season, date_limit], [pair_tag(competition, season)], compute,
+    )
+    return jsonify({"competition": competition, "season": season, "date": date_limit, "standings": rows})
+
+
+@bp_public.route("/api/simulate", methods=["GET"])
+def simulate():
+    """
+    Monte Carlo of the remaining fixtures: final position distribution per team.
+
+    Query params:
+      - competition, season (required)
+      - model (optional): registered model for the 1X2 probabilities (default rules_v1)
+      - europe / relegation (optional, int): places counted as European / relegation (default 4 / 3)
+
+    Always DEFAULT_SIMULATIONS seasons with a random seed: n and seed are not
+    public, otherwise every value would be a separate full-cost cache entry.
+    """
+    competition = request.args.get("competition")
+    season = request.args.get("season", type=int)
+    model = request.args.get("model") or "rules_v1"
+    europe = request.args.get("europe", default=4, type=int)
+    relegation = request.args.get("relegation", default=3, type=int)
+
+    if not competition or season is None:
+        return jsonify({"error": "Servono competition, season"}), 400
+    if get_model(model) is None:
+        return jsonify({"error": f"model non supportato: {model}"}), 400
+
+    options = {"n": DEFAULT_SIMULATIONS, "model": model, "europe": max(0, europe), "relegation": max(0, relegation)}
+
+    out, _hit = get_cache().get_or_compute(
+        "simulate", [competition, season, options], [pair_tag(competition, season)],
+        lambda: simulate_season(competition, season, **options),
+    )
+    return jsonify(out)
+
+
+@bp_public.route("/api/ratings", methods=["GET"])
+def get_ratings():
+    """
+    Elo ratings.
+
+    Query params:
+      - competition / season (optional): only teams that played there
+      - team (optional): adds the per-match rating history of that team
+      - limit (optional, int): history length (default 50)
+    """
+    competition = request.args.get("competition")
+    season = request.args.get("season", type=int)
+    team = request.args.get("team")
+    limit = request.args.get("limit", default=50, type=int)
+
     session = SessionLocal()
     try:
-        matches = (
-            session.query(Match)
-            .filter(Match.status == "FINISHED")
-            .filter(Match.competition == competition)
-            .filter(Match.season == season)
-            .filter(Match.date <= date_limit)
-            .order_by(Match.date.asc(), Match.id.asc())
-            .all()
-        )
-
-        table = {}
-
-        def ensure(team):
-            if team not in table:
-                table[team] = {
-                    "team": team,
-                    "played": 0,
-                    "wins": 0,
-                    "draws": 0,
-                    "losses": 0,
-                    "gf": 0,
-                    "ga": 0,
-                    "points": 0,
+        q = session.query(TeamRating)
+
+        if competition or season is not None:
+            home_q = session.query(Match.home_team.label("team"))
+            away_q = session.query(Match.away_team.label("team"))
+            if competition:
+                home_q = home_q.filter(Match.competition == competition)
+                away_q = away_q.filter(Match.competition == competition)
+            if season is not None:
+                home_q = home_q.filter(Match.season == season)
+                away_q = away_q.filter(Match.season == season)
+            q = q.filter(TeamRating.team.in_(home_q.union(away_q)))
+
+        rows = q.order_by(TeamRating.rating.desc(), TeamRating.team.asc()).all()
+
+        out = {
+            "competition": competition or "All",
+            "season": season if season is not None else "All",
+            "ratings": [
+                {
+                    "rank": i,
+                    "team": r.team,
+                    "rating": r.rating,
+                    "matches": r.matches,
+                    "last_date": r.last_date,
+                    "last_competition": r.last_competition,
+                    "last_season": r.last_season,
+                }
+                for i, r in enumerate(rows, start=1)
+            ],
+        }
+
+        if team:
+            hist = (
+                session.query(MatchRating)
+                .filter(or_(MatchRating.home_team == team, MatchRating.away_team == team))
+                .order_by(MatchRating.date.desc(), MatchRating.match_id.desc())
+                .limit(max(1, limit))
+                .all()
+            )
+            out["history"] = [
+                {
+                    "match_id": h.match_id,
+                    "competition": h.competition,
+                    "season": h.season,
+                    "date": h.date,
+                    "opponent": h.away_team if h.home_team == team else h.home_team,
+                    "home": h.home_team == team,
+                    "rating_before": h.home_rating_before if h.home_team == team else h.away_rating_before,
+                    "rating_after": h.home_rating_after if h.home_team == team else h.away_rating_after,
                 }
+                for h in hist
+            ]
 
-        for m in matches:
-            home = m.home_team
-            away = m.away_team
-            if not home or not away:
-                continue
-
-            ensure(home)
-            ensure(away)
-
-            hg = m.home_goals or 0
-            ag = m.away_goals or 0
-
-            table[home]["played"] += 1
-            table[away]["played"] += 1
-
-            table[home]["gf"] += hg
-            table[home]["ga"] += ag
-            table[away]["gf"] += ag
-            table[away]["ga"] += hg
-
-            if hg > ag:
-                table[home]["wins"] += 1
-                table[away]["losses"] += 1
-                table[home]["points"] += 3
-            elif hg < ag:
-                table[away]["wins"] += 1
-                table[home]["losses"] += 1
-                table[away]["points"] += 3
-            else:
-                table[home]["draws"] += 1
-                table[away]["draws"] += 1
-                table[home]["points"] += 1
-                table[away]["points"] += 1
-
-        rows = list(table.values())
-        for r in rows:
-            r["gd"] = r["gf"] - r["ga"]
-
-        rows.sort(
-            key=lambda r: (r["points"], r["gd"], r["gf"], r["played"], r["team"]),
-            reverse=True,
-        )
-        for i, r in enumerate(rows, start=1):
-            r["rank"] = i
-
-        return jsonify({"competition": competition, "season": season, "date": date_limit, "standings": rows})
+        return jsonify(out)
     finally:
         session.close()
+
+
+def _leaderboard_rows(competition, season):
+    """({split: [(team, metriche)]}, hit): un calcolo per coppia, poi solo ordinamento."""
+    def compute():
+        session = SessionLocal()
+        try:
+            teams = get_team_index().teams(competition, season)
+            matches, _ctx = stats.season_rows(session, None, competition, season)
+            return stats.leaderboard_rows(stats.fold_matches(teams, matches))
+        finally:
+            session.close()
+
+    return get_cache().get_or_compute("leaderboard", [competition, season], [pair_tag(competition, season)], compute)
+
+
+@bp_public.route("/api/leaderboard", methods=["GET"])
+def get_leaderboard():
+    """
+    All teams of a competition/season ranked by one /api/stats metric.
+
+    Query params:
+      - competition, season (required)
+      - metric (default over_25_rate): e.g. btts_rate, failed_to_score_rate, ppg, avg_scored
+      - split: overall (default) | home | away
+      - order: desc (default) | asc
+      - k (optional, int): top-k
+      - min_matches (optional, int): skip teams with fewer matches in the split
+    """
+    competition = request.args.get("competition")
+    season = request.args.get("season", type=int)
+    metric = request.args.get("metric") or "over_25_rate"
+    split = request.args.get("split") or "overall"
+    order = (request.args.get("order") or "desc").lower()
+    k = request.args.get("k", type=int)
+    min_matches = request.args.get("min_matches", default=0, type=int)
+
+    if not competition or season is None:
+        return jsonify({"error": "Servono competition, season"}), 400
+    if split not in stats.LEADERBOARD_SPLITS:
+        return jsonify({"error": f"split non valido: {split}", "splits": list(stats.LEADERBOARD_SPLITS)}), 400
+    if order not in ("asc", "desc"):
+        return jsonify({"error": f"order non valido: {order}"}), 400
+
+    rows_by_split, cached = _leaderboard_rows(competition, season)
+    rows = [r for r in rows_by_split[split] if r[1]["matches"] >= max(min_matches, 1)]
+
+    metrics = sorted(rows[0][1].keys()) if rows else []
+    if rows and metric not in rows[0][1]:
+        return jsonify({"error": f"metric non valida: {metric}", "metrics": metrics}), 400
+
+    picked = stats.top_k(rows, metric, k=k if k and k > 0 else None, ascending=(order == "asc"))
+
+    return jsonify({
+        "competition": competition,
+        "season": season,
+        "metric": metric,
+        "split": split,
+        "order": order,
+        "cached": cached,
+        "metrics": metrics,
+        "leaderboard": [
+            {"rank": i, "team": team, "value": m[metric], "matches": m["matches"]}
+            for i, (team, m) in enumerate(picked, start=1)
+        ],
+    })
+
+
+@bp_public.route("/api/h2h", methods=["GET"])
+def get_h2h():
+    """
+    Head-to-head history across all competitions and seasons.
+
+    Query params:
+      - home, away (required): record is from the `home` team's point of view
+      - last (optional, int): number of recent meetings (default 10)
+    """
+    home = request.args.get("home")
+    away = request.args.get("away")
+    last_n = request.args.get("last", default=10, type=int)
+
+    if not home or not away:
+        return jsonify({"error": "Servono home, away"}), 400
+
+    def compute():
+        session = SessionLocal()
+        try:
+            return head_to_head(session, home, away, last_n=max(0, last_n))
+        finally:
+            session.close()
+
+    out, _hit = get_cache().get_or_compute("h2h", [home, away, max(0, last_n)], [TAG_ALL], compute)
+    return jsonify(out)
@@ -0,0 +1,250 @@
+# backend/app/simulate.py
+"""
+Simulazione Monte Carlo del resto di una stagione.
+
+Input: classifica attuale (partite FINISHED) e partite ancora da giocare della
+coppia (competition, season), con le probabilita' 1X2 di un modello registrato
+in app.predictors (default rules_v1, senza debug).
+Ogni blocco simula n stagioni insieme con array NumPy (n x partite):
+  - esito estratto dalle probabilita' della partita;
+  - punteggio estratto tra quelli della stagione con lo stesso esito
+    (servono differenza reti e gol fatti per gli spareggi);
+  - classifica finale con lo stesso ordine di standings_sort_key
+    (punti, diff. reti, gol fatti, giocate, nome).
+Ritorna per squadra la distribuzione delle posizioni finali e le probabilita'
+di titolo, posti europei (prime `europe`) e retrocessione (ultime `relegation`).
+
+Con workers > 1 i blocchi vanno in un ProcessPoolExecutor (ogni blocco ha il
+suo seed da SeedSequence: stesso seed, stesso risultato con qualunque workers).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import select
+
+from app.context import load_season_rows
+from app.db import SessionLocal
+from app.models import Match
+from app.predictors import get_model
+
+DEFAULT_SIMULATIONS = 10_000
+MAX_SIMULATIONS = 100_000
+CHUNK_SIMULATIONS = 10_000
+DEFAULT_SEED = 20240801
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", "1"))
+
+# status che non verranno piu' giocati (oltre a FINISHED)
+CLOSED_STATUSES = ("FINISHED", "CANCELLED", "AWARDED")
+
+# punteggio di riserva per esito se la stagione non ne ha ancora (H, D, A)
+_FALLBACK_SCORES = ([(1, 0)], [(1, 1)], [(0, 1)])
+
+
+def _outcome(hg, ag) -> int:
+    return 0 if hg > ag else (1 if hg == ag else 2)
+
+
+def load_inputs(session, competition: str, season: int, model: str = "rules_v1", weights: dict | None = None) -> dict:
+    """Classifica attuale, partite rimanenti con probabilita' e punteggi osservati, come array."""
+    predict = get_model(model)
+    if predict is None:
+        raise ValueError(f"model non supportato: {model}")
+
+    finished = [r for r in load_season_rows(session, competition, season) if r[2] and r[3]]
+    remaining = session.execute(
+        select(Match.id, Match.date, Match.home_team, Match.away_team)
+        .where(Match.competition == competition)
+        .where(Match.season == season)
+        .where(Match.status.not_in(CLOSED_STATUSES))
+        .where(Match.home_team != "")
+        .where(Match.away_team != "")
+        .order_by(Match.date.asc(), Match.id.asc())
+    ).all()
+
+    teams = sorted({t for r in finished for t in r[2:4]} | {t for r in remaining for t in r[2:4]})
+    idx = {t: i for i, t in enumerate(teams)}
+    n_teams = len(teams)
+
+    base = np.zeros((4, n_teams), dtype=np.int64)  # points, gf, ga, played
+    scores = ([], [], [])
+    for _mid, _date, home, away, hg, ag in finished:
+        hg = hg or 0
+        ag = ag or 0
+        o = _outcome(hg, ag)
+        h, a = idx[home], idx[away]
+        base[0, h] += (3, 1, 0)[o]
+        base[0, a] += (0, 1, 3)[o]
+        base[1, h] += hg
+        base[2, h] += ag
+        base[1, a] += ag
+        base[2, a] += hg
+        base[3, h] += 1
+        base[3, a] += 1
+        scores[o].append((hg, ag))
+
+    counts = np.array([len(s) for s in scores], dtype=float)
+    fallback_probs = counts / counts.sum() if counts.sum() else np.full(3, 1 / 3)
+
+    probs = np.empty((len(remaining), 3))
+    warnings = []
+    for j, m in enumerate(remaining):
+        out = predict(session, m.id, weights=weights, debug=False)
+        if out.get("ok"):
+            p = out["probabilities"]
+            probs[j] = (p["home_win"], p["draw"], p["away_win"])
+        else:
+            probs[j] = fallback_probs
+            warnings.append(f"match {m.id}: {out.get('error')}, usate le frequenze della stagione")
+
+    return {
+        "teams": teams,
+        "base": base,
+        "home": np.array([idx[m.home_team] for m in remaining], dtype=np.int64),
+        "away": np.array([idx[m.away_team] for m in remaining], dtype=np.int64),
+        "probs": probs,
+        "scores": [np.array(s or fb, dtype=np.int64) for s, fb in zip(scores, _FALLBACK_SCORES)],
+        "fixtures": [
+            {"match_id": m.id, "date": m.date, "home_team": m.home_team, "away_team": m.away_team}
+            for m in remaining
+        ],
+        "warnings": warnings,
+    }
+
+
+def simulate_chunk(inputs: dict, n: int, seed) -> tuple:
+    """
+    n stagioni simulate. Ritorna (counts, points_sum): counts[t, p] = volte in cui
+    la squadra t finisce in posizione p (0 = prima), points_sum[t] = punti totali.
+    """
+    rng = np.random.default_rng(seed)
+    base = inputs["base"]
+    home, away = inputs["home"], inputs["away"]
+    n_teams = base.shape[1]
+    n_fix = len(home)
+
+    points = np.broadcast_to(base[0], (n, n_teams)).astype(np.int64)
+    gf = np.broadcast_to(base[1], (n, n_teams)).astype(np.int64)
+    ga = np.broadcast_to(base[2], (n, n_teams)).astype(np.int64)
+    played = base[3] + np.bincount(home, minlength=n_teams) + np.bincount(away, minlength=n_teams)
+
+    if n_fix:
+        cum = np.cumsum(inputs["probs"], axis=1)
+        u = rng.random((n, n_fix))
+        outcome = (u > cum[:, 0]).astype(np.int64) + (u > cum[:, 1])
+
+        hg = np.empty((n, n_fix), dtype=np.int64)
+        ag = np.empty((n, n_fix), dtype=np.int64)
+        for o, pool in enumerate(inputs["scores"]):
+            mask = outcome == o
+            picked = pool[rng.integers(0, len(pool), size=int(mask.sum()))]
+            hg[mask] = picked[:, 0]
+            ag[mask] = picked[:, 1]
+
+        home_pts = np.array([3.0, 1.0, 0.0])[outcome]
+        away_pts = np.array([0.0, 1.0, 3.0])[outcome]
+        # somme per squadra come prodotti con le matrici di incidenza partita -> squadra
+        # (float: BLAS, risultati interi esatti)
+        h_onehot = np.zeros((n_fix, n_teams))
+        a_onehot = np.zeros((n_fix, n_teams))
+        h_onehot[np.arange(n_fix), home] = 1
+        a_onehot[np.arange(n_fix), away] = 1
+        hg = hg.astype(float)
+        ag = ag.astype(float)
+        points = points + (home_pts @ h_onehot + away_pts @ a_onehot).astype(np.int64)
+        gf = gf + (hg @ h_onehot + ag @ a_onehot).astype(np.int64)
+        ga = ga + (ag @ h_onehot + hg @ a_onehot).astype(np.int64)
+
+    # standings_sort_key con reverse=True: tutto decrescente, anche il nome
+    name_key = np.broadcast_to(-np.arange(n_teams), (n, n_teams))
+    played_key = np.broadcast_to(-played, (n, n_teams))
+    order = np.lexsort((name_key, played_key, -gf, -(gf - ga), -points), axis=1)
+
+    position = np.empty_like(order)
+    np.put_along_axis(position, order, np.broadcast_to(np.arange(n_teams), (n, n_teams)), axis=1)
+    flat = (np.arange(n_teams) * n_teams + position).ravel()
+    counts = np.bincount(flat, minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    return counts, points.sum(axis=0)
+
+
+def _chunks(n: int):
+    sizes = [CHUNK_SIMULATIONS] * (n // CHUNK_SIMULATIONS)
+    if n % CHUNK_SIMULATIONS:
+        sizes.append(n % CHUNK_SIMULATIONS)
+    return sizes
+
+
+def run_simulation(inputs: dict, n: int = DEFAULT_SIMULATIONS, seed: int = DEFAULT_SEED, workers: int = 1):
+    """(counts, points_sum) su n stagioni, a blocchi di CHUNK_SIMULATIONS."""
+    n_teams = len(inputs["teams"])
+    sizes = _chunks(n)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_sum = np.zeros(n_teams, dtype=np.int64)
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            results = list(pool.map(simulate_chunk, [inputs] * len(sizes), sizes, seeds))
+    else:
+        results = [simulate_chunk(inputs, size, s) for size, s in zip(sizes, seeds)]
+    for c, p in results:
+        counts += c
+        points_sum += p
+    return counts, points_sum
+
+
+def simulate_season(competition: str, season: int, n: int = DEFAULT_SIMULATIONS, model: str = "rules_v1",
+                    weights: dict | None = None, europe: int = 4, relegation: int = 3,
+                    seed: int = DEFAULT_SEED, workers: int = SIM_WORKERS) -> dict:
+    """Probabilita' di posizione finale per squadra, ordinate per punti attesi."""
+    t0 = time.perf_counter()
+    session = SessionLocal()
+    try:
+        inputs = load_inputs(session, competition, season, model=model, weights=weights)
+    finally:
+        session.close()
+    t1 = time.perf_counter()
+
+    n = max(1, min(int(n), MAX_SIMULATIONS))
+    teams = inputs["teams"]
+    n_teams = len(teams)
+    counts, points_sum = run_simulation(inputs, n, seed, workers) if n_teams else (np.zeros((0, 0)), np.zeros(0))
+    t2 = time.perf_counter()
+
+    europe = max(0, min(europe, n_teams))
+    relegation = max(0, min(relegation, n_teams))
+    dist = counts / n
+    positions = np.arange(1, n_teams + 1)
+
+    rows = []
+    for i, team in enumerate(teams):
+        rows.append({
+            "team": team,
+            "points": int(inputs["base"][0, i]),
+            "played": int(inputs["base"][3, i]),
+            "expected_points": float(points_sum[i] / n),
+            "expected_position": float(dist[i] @ positions),
+            "title": float(dist[i, 0]),
+            "europe": float(dist[i, :europe].sum()),
+            "relegation": float(dist[i, n_teams - relegation:].sum()) if relegation else 0.0,
+            "positions": [float(p) for p in dist[i]],
+        })
+    rows.sort(key=lambda r: (-r["expected_points"], r["expected_position"], r["team"]))
+
+    out = {
+        "competition": competition,
+        "season": season,
+        "model": model,
+        "simulations": n,
+        "seed": seed,
+        "europe_places": europe,
+        "relegation_places": relegation,
+        "remaining_matches": len(inputs["fixtures"]),
+        "teams": rows,
+        "timings": {"load_s": t1 - t0, "simulate_s": t2 - t1},
+    }
+    if inputs["warnings"]:
+        out["warnings"] = inputs["warnings"]
+    return out
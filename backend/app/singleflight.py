@@ -0,0 +1,183 @@
+# backend/app/singleflight.py
+"""
+Single-flight: richieste identiche concorrenti condividono un solo calcolo.
+
+Subito dopo un import la cache e' vuota e molti utenti aprono le stesse pagine:
+senza coalescenza ogni richiesta rifarebbe la stessa get_stats / predict sul DB.
+Con SingleFlight.do(key, fn) il primo thread con quella chiave esegue fn, gli
+altri thread del processo aspettano e ricevono lo stesso risultato (o la stessa
+eccezione).
+
+Tra worker diversi (opzionale, SINGLEFLIGHT_LOCK_DIR): il thread che calcola
+prende anche un flock su un file della cartella (chiave -> uno di
+SINGLEFLIGHT_STRIPES file). Chi ha dovuto aspettare il lock prima ricontrolla
+(recheck, di solito la cache condivisa) e calcola solo se il valore non c'e'.
+Serve un backend di cache condiviso (file / redis); senza fcntl (Windows) si
+coalescono solo i thread.
+
+Calcoli annidati (bootstrap -> matches / predict / standings): un thread non
+riprende uno stripe che tiene gia' (il flock non e' rientrante tra file aperti
+due volte) e, se tiene gia' un lock, non ne aspetta un altro: se lo stripe
+interno e' occupato calcola subito. Cosi' due worker non restano bloccati
+ognuno sul lock dell'altro.
+
+Dopo SINGLEFLIGHT_TIMEOUT secondi di attesa si calcola comunque: un calcolo
+bloccato non blocca anche tutte le richieste che lo aspettano.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo coalescenza tra thread
+    fcntl = None
+
+SINGLEFLIGHT_LOCK_DIR = os.getenv("SINGLEFLIGHT_LOCK_DIR", "")
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "30"))
+SINGLEFLIGHT_STRIPES = int(os.getenv("SINGLEFLIGHT_STRIPES", "1024"))
+LOCK_POLL = 0.02
+
+NOT_FOUND = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.shared = False
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=SINGLEFLIGHT_LOCK_DIR, timeout: float = SINGLEFLIGHT_TIMEOUT,
+                 stripes: int = SINGLEFLIGHT_STRIPES):
+        self.lock_dir = Path(lock_dir) if lock_dir and fcntl is not None else None
+        self.timeout = timeout
+        self.stripes = max(1, stripes)
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._local = threading.local()
+        self._counters = {
+            "leaders": 0, "waiters": 0, "shared_across_workers": 0, "timeouts": 0, "nested_unlocked": 0,
+        }
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    def _count(self, what):
+        with self._lock:
+            self._counters[what] += 1
+
+    def _held(self):
+        """(chiavi, stripe) dei calcoli in corso in questo thread."""
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = (set(), set())
+        return held
+
+    def _stripe(self, key: str) -> int:
+        return int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % self.stripes
+
+    def do(self, key: str, fn, recheck=None):
+        """
+        (valore, shared): shared=True se il valore e' stato calcolato da un'altra
+        richiesta (thread di questo processo o, con il lock su file, un altro worker).
+        recheck() ritorna il valore gia' pronto o NOT_FOUND.
+        """
+        keys, _stripes = self._held()
+        if key in keys:
+            # la stessa chiave dentro il proprio calcolo: aspettarla sarebbe aspettare se' stessi
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._count("waiters")
+            if not call.done.wait(self.timeout):
+                self._count("timeouts")
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        self._count("leaders")
+        keys.add(key)
+        try:
+            call.value, call.shared = self._run(key, fn, recheck)
+            return call.value, call.shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            keys.discard(key)
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run(self, key, fn, recheck):
+        if self.lock_dir is None:
+            return fn(), False
+
+        _keys, stripes = self._held()
+        stripe = self._stripe(key)
+        if stripe in stripes:
+            # chiave interna sullo stesso stripe di un calcolo esterno di questo thread
+            self._count("nested_unlocked")
+            return fn(), False
+
+        with open(self.lock_dir / f"{stripe:04x}.lock", "a+b") as f:
+            waited = False
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if stripes:
+                        # chi tiene gia' un lock non ne aspetta un altro (niente attese incrociate)
+                        self._count("nested_unlocked")
+                        return fn(), False
+                    waited = True
+                    if time.monotonic() >= deadline:
+                        self._count("timeouts")
+                        return fn(), False
+                    time.sleep(LOCK_POLL)
+            stripes.add(stripe)
+            try:
+                if waited and recheck is not None:
+                    value = recheck()
+                    if value is not NOT_FOUND:
+                        self._count("shared_across_workers")
+                        return value, True
+                return fn(), False
+            finally:
+                stripes.discard(stripe)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "lock_dir": str(self.lock_dir) if self.lock_dir is not None else None,
+                "in_flight": len(self._calls),
+                **self._counters,
+            }
+
+
+_singleflight = None
+_singleflight_lock = threading.Lock()
+
+
+def get_singleflight() -> SingleFlight:
+    global _singleflight
+    if _singleflight is None:
+        with _singleflight_lock:
+            if _singleflight is None:
+                _singleflight = SingleFlight()
+    return _singleflight
@@ -0,0 +1,252 @@
+# backend/app/snapshots.py
+"""
+Snapshot binari per (competition, season), condivisi tra i worker via mmap.
+
+Dopo ogni import/rebuild publish_snapshots scrive, per ogni coppia, le partite
+FINISHED con il loro match_context in un file versionato
+<slug>_<season>.v<data_version>.snap (scrittura su .tmp + rename atomico).
+I worker lo mappano in sola lettura: le pagine stanno una volta sola nella
+page cache del sistema, qualunque sia il numero di worker gunicorn, e un worker
+appena partito non deve leggere la stagione dal DB.
+Un worker passa alla versione nuova appena data_version cambia e il file
+corrispondente esiste; se il file non c'e' (o e' vecchio) si legge dal DB.
+
+Formato (little endian):
+  header   HEADER: magic, formato, data_version, season, n_teams, n_matches
+  stringhe competition + nomi squadra, ciascuna u16 lunghezza + UTF-8
+  record   RECORD per partita, in ordine (date, id)
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from app.context import load_season_rows
+from app.db import DATABASE_URL, SessionLocal
+from app.models import Match, MatchContext
+from app.versioning import current_data_version
+
+# una sottocartella per database: DB diversi sulla stessa macchina non si mescolano
+SNAPSHOT_DIR = (
+    Path(os.getenv("SNAPSHOT_DIR", Path(__file__).resolve().parents[1] / "snapshots"))
+    / hashlib.sha1(DATABASE_URL.encode("utf-8")).hexdigest()[:12]
+)
+KEEP_VERSIONS = 2
+
+MAGIC = b"PSNP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHQiII")
+# id, date, home idx, away idx, home goals, away goals (-1 = NULL), rank home/away prima, total teams (0 = no context)
+RECORD = struct.Struct("<i10sHHhhHHH")
+U16 = struct.Struct("<H")
+
+MatchRow = namedtuple("MatchRow", "id date home_team away_team home_goals away_goals")
+ContextRow = namedtuple("ContextRow", "match_id home_rank_before away_rank_before total_teams")
+
+_NAME_RE = re.compile(r"^(?P<slug>.+)_(?P<season>-?\d+)\.v(?P<version>\d+)\.snap$")
+
+
+def _slug(competition: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", competition.lower()).strip("-") or "x"
+
+
+def snapshot_path(competition: str, season: int, version: int, root: Path | None = None) -> Path:
+    return Path(root or SNAPSHOT_DIR) / f"{_slug(competition)}_{season}.v{version}.snap"
+
+
+def _versions(competition: str, season: int, root: Path):
+    """[(version, path)] dei file esistenti per la coppia."""
+    if not root.is_dir():
+        return []
+    slug = _slug(competition)
+    out = []
+    for entry in os.scandir(root):
+        m = _NAME_RE.match(entry.name)
+        if m and m["slug"] == slug and int(m["season"]) == season:
+            out.append((int(m["version"]), Path(entry.path)))
+    return sorted(out)
+
+
+# ---- scrittura ----
+
+def encode_snapshot(competition: str, season: int, version: int, rows, ctx_by_id) -> bytes:
+    """rows: tuple (id, date, home, away, hg, ag) in ordine; ctx_by_id: {id: (home_rank, away_rank, total)}."""
+    teams = sorted({r[2] for r in rows} | {r[3] for r in rows})
+    idx = {t: i for i, t in enumerate(teams)}
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, version, season, len(teams), len(rows))]
+    for s in [competition] + teams:
+        raw = s.encode("utf-8")
+        parts.append(U16.pack(len(raw)))
+        parts.append(raw)
+
+    for match_id, date, home, away, hg, ag in rows:
+        hr, ar, total = ctx_by_id.get(match_id, (0, 0, 0))
+        parts.append(RECORD.pack(
+            match_id, (date or "").encode("ascii")[:10], idx[home], idx[away],
+            -1 if hg is None else hg, -1 if ag is None else ag,
+            hr or 0, ar or 0, total or 0,
+        ))
+    return b"".join(parts)
+
+
+def write_snapshot(session, competition: str, season: int, version: int, root: Path | None = None) -> Path:
+    root = Path(root or SNAPSHOT_DIR)
+    rows = load_season_rows(session, competition, season)
+    ctx_by_id = {
+        match_id: (hr, ar, total)
+        for match_id, hr, ar, total in session.query(
+            MatchContext.match_id, MatchContext.home_rank_before,
+            MatchContext.away_rank_before, MatchContext.total_teams,
+        )
+        .filter(MatchContext.competition == competition)
+        .filter(MatchContext.season == season)
+    }
+
+    root.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(competition, season, version, root)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(encode_snapshot(competition, season, version, rows, ctx_by_id))
+    os.replace(tmp, path)
+    return path
+
+
+def _restamp(src: Path, competition: str, season: int, version: int, root: Path) -> Path:
+    """Copia di uno snapshot con la sola versione nell'header cambiata: niente DB."""
+    data = bytearray(src.read_bytes())
+    magic, fmt, _old, seas, n_teams, n_matches = HEADER.unpack_from(data, 0)
+    HEADER.pack_into(data, 0, magic, fmt, version, seas, n_teams, n_matches)
+    path = snapshot_path(competition, season, version, root)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def publish_snapshots(version: int | None = None, root: Path | None = None, pairs=None) -> int:
+    """
+    Scrive gli snapshot di tutte le coppie con partite FINISHED per la versione
+    indicata (default: quella corrente) e rimuove le versioni vecchie.
+    Da chiamare dopo il commit che ha incrementato data_version.
+
+    pairs: se indicato, si rileggono dal DB solo queste coppie; le altre, se il
+    loro file e' alla versione precedente, vengono solo ri-timbrate con la nuova.
+    """
+    root = Path(root or SNAPSHOT_DIR)
+    version = current_data_version(max_age=0) if version is None else version
+    dirty = None if pairs is None else set(pairs)
+    session = SessionLocal()
+    try:
+        all_pairs = (
+            session.query(Match.competition, Match.season)
+            .filter(Match.status == "FINISHED")
+            .filter(Match.season.isnot(None))
+            .distinct()
+            .all()
+        )
+        for competition, season in all_pairs:
+            if dirty is not None and (competition, season) not in dirty:
+                available = _versions(competition, season, root)
+                if available and available[-1][0] == version - 1:
+                    _restamp(available[-1][1], competition, season, version, root)
+                    continue
+            write_snapshot(session, competition, season, version, root)
+    finally:
+        session.close()
+
+    for competition, season in all_pairs:
+        for _old, path in _versions(competition, season, root)[:-KEEP_VERSIONS]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    return len(all_pairs)
+
+
+# ---- lettura ----
+
+class SeasonSnapshot:
+    """Vista read-only su un file snapshot mappato in memoria."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, self.data_version, self.season, n_teams, self.n_matches = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"snapshot non valido: {path}")
+
+        offset = HEADER.size
+        names = []
+        for _ in range(n_teams + 1):
+            (n,) = U16.unpack_from(self._mm, offset)
+            offset += U16.size
+            names.append(self._mm[offset:offset + n].decode("utf-8"))
+            offset += n
+        self.competition = names[0]
+        self.teams = names[1:]
+        self._records = offset
+
+    def rows(self, teams=None):
+        """
+        (matches, context) come righe per fold_matches, opzionalmente solo per
+        le partite che coinvolgono teams. I record sono decodificati al volo:
+        nel processo restano solo le righe richieste.
+        """
+        wanted = None
+        if teams is not None:
+            pos = {t: i for i, t in enumerate(self.teams)}
+            wanted = {pos[t] for t in teams if t in pos}
+            if not wanted:
+                return [], []
+
+        end = self._records + RECORD.size * self.n_matches
+        matches = []
+        context = []
+        names = self.teams
+        for match_id, date, h, a, hg, ag, hr, ar, total in RECORD.iter_unpack(memoryview(self._mm)[self._records:end]):
+            if wanted is not None and h not in wanted and a not in wanted:
+                continue
+            matches.append(MatchRow(
+                match_id, date.rstrip(b"\0").decode("ascii"), names[h], names[a],
+                None if hg < 0 else hg, None if ag < 0 else ag,
+            ))
+            if total:
+                context.append(ContextRow(match_id, hr, ar, total))
+        return matches, context
+
+
+_lock = threading.Lock()
+_open = {}
+
+
+def get_snapshot(competition: str, season: int, root: Path | None = None):
+    """
+    Snapshot della coppia allineato alla data_version corrente, o None
+    (nessun file per questa versione: il chiamante legge dal DB).
+    """
+    root = Path(root or SNAPSHOT_DIR)
+    version = current_data_version()
+    key = (str(root), competition, season)
+
+    with _lock:
+        snap = _open.get(key)
+        if snap is not None and snap.data_version >= version:
+            return snap
+
+        available = _versions(competition, season, root)
+        if not available or available[-1][0] < version:
+            return None
+
+        try:
+            snap = SeasonSnapshot(available[-1][1])
+        except (OSError, ValueError):
+            return None
+        # il vecchio mmap si chiude quando l'ultima richiesta che lo usa lo rilascia
+        _open[key] = snap
+        return snap
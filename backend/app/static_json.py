@@ -0,0 +1,210 @@
+# backend/app/static_json.py
+"""
+Pubblicazione di JSON statici per le stagioni attive, da servire da CDN
+insieme al frontend (la maggior parte delle pagine cambia una volta al giorno).
+
+Per ogni coppia attiva (competition, season) scrive sotto <out>/<slug>/<season>/:
+  teams.json                  come /api/teams?competition=&season=
+  standings.json              come /api/standings alla data dell'ultima partita FINISHED
+  matches.json                partite non FINISHED con le probabilita' (come /api/bootstrap)
+  stats/<team>.json           come /api/stats?team=&competition=&season=
+  stats.json                  {squadra: percorso del suo stats/<team>.json}
+  predictions/<match_id>.json come /api/predict (con debug)
+e <out>/index.json con l'elenco delle coppie e dei percorsi.
+
+Un file viene riscritto solo se lo sha256 del contenuto cambia rispetto a
+<out>/manifest.json (scrittura su .tmp + rename); i file del manifest non piu'
+prodotti (es. previsioni di partite ormai giocate) vengono rimossi.
+Con pairs= (publish_static.py --pair) si tocca solo la cartella delle coppie
+indicate: gli altri file restano nel manifest e le altre coppie in index.json.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from app import stats
+from app.db import SessionLocal, utcnow_iso
+from app.models import Match
+from app.predictors.rules_v1 import predict_with_session
+from app.versioning import current_data_version
+
+STATIC_JSON_DIR = os.getenv("STATIC_JSON_DIR", "")
+MANIFEST = "manifest.json"
+
+
+def slug(value) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-") or "x"
+
+
+def encode(doc) -> bytes:
+    # chiavi ordinate come jsonify: stesso documento, stessi byte
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def active_pairs(session):
+    """Coppie con partite ancora da giocare, piu' l'ultima stagione di ogni competizione."""
+    pending = session.execute(
+        select(Match.competition, Match.season)
+        .where(Match.status != "FINISHED")
+        .where(Match.season.isnot(None))
+        .distinct()
+    ).all()
+    latest = session.execute(
+        select(Match.competition, func.max(Match.season))
+        .where(Match.season.isnot(None))
+        .group_by(Match.competition)
+    ).all()
+    return sorted({(c, int(s)) for c, s in pending} | {(c, int(s)) for c, s in latest})
+
+
+def render_pair(session, competition: str, season: int) -> dict:
+    """{percorso relativo: documento} per una coppia."""
+    base = f"{slug(competition)}/{season}"
+    files = {}
+
+    matches, _ctx = stats.season_rows(session, None, competition, season, with_context=False)
+    teams = sorted({m.home_team for m in matches} | {m.away_team for m in matches})
+    files[f"{base}/teams.json"] = {"teams": teams}
+
+    last_date = session.execute(
+        select(func.max(Match.date))
+        .where(Match.status == "FINISHED")
+        .where(Match.competition == competition)
+        .where(Match.season == season)
+    ).scalar()
+    files[f"{base}/standings.json"] = {
+        "competition": competition,
+        "season": season,
+        "date": last_date,
+        "standings": stats.load_standings(session, competition, season, last_date) if last_date else [],
+    }
+
+    stats_paths = {}
+    for team, doc in stats.team_stats(session, teams, competition, season).items():
+        path = f"{base}/stats/{slug(team)}.json"
+        stats_paths[team] = path
+        files[path] = doc
+
+    upcoming = session.execute(
+        select(Match.id, Match.date, Match.status, Match.home_team, Match.away_team)
+        .where(Match.status != "FINISHED")
+        .where(Match.competition == competition)
+        .where(Match.season == season)
+        .order_by(Match.date.asc(), Match.id.asc())
+    ).all()
+    fixtures = []
+    for m in upcoming:
+        pred = predict_with_session(session, m.id)
+        path = f"{base}/predictions/{m.id}.json"
+        files[path] = pred
+        fixtures.append({
+            "id": m.id,
+            "competition": competition,
+            "season": season,
+            "date": m.date or None,
+            "status": m.status,
+            "home_team": m.home_team,
+            "away_team": m.away_team,
+            "probabilities": pred.get("probabilities"),
+            "prediction": path,
+        })
+    files[f"{base}/matches.json"] = {"matches": fixtures}
+    files[f"{base}/stats.json"] = {"teams": stats_paths}
+    return files
+
+
+def _write(root: Path, rel: str, data: bytes):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def publish_static(out_dir=None, pairs=None) -> dict:
+    """
+    Rende i JSON delle coppie attive (o di quelle indicate) in out_dir
+    (default STATIC_JSON_DIR) e scrive solo i file cambiati. Ritorna il riepilogo.
+    """
+    if not (out_dir or STATIC_JSON_DIR):
+        raise ValueError("serve una cartella di destinazione (out_dir o STATIC_JSON_DIR)")
+    root = Path(out_dir or STATIC_JSON_DIR)
+
+    t0 = time.perf_counter()
+    partial = pairs is not None
+    session = SessionLocal()
+    try:
+        pairs = active_pairs(session) if pairs is None else sorted(pairs)
+        files = {}
+        for competition, season in pairs:
+            files.update(render_pair(session, competition, season))
+    finally:
+        session.close()
+    t1 = time.perf_counter()
+
+    manifest_path = root / MANIFEST
+    try:
+        old = json.loads(manifest_path.read_text(encoding="utf-8"))["files"]
+    except (OSError, ValueError, KeyError):
+        old = {}
+
+    index_pairs = set(pairs)
+    new = {}
+    if partial:
+        # solo le cartelle delle coppie indicate: il resto del manifest e dell'indice resta
+        prefixes = tuple(f"{slug(c)}/{s}/" for c, s in pairs)
+        new = {rel: digest for rel, digest in old.items() if rel != "index.json" and not rel.startswith(prefixes)}
+        try:
+            old_index = json.loads((root / "index.json").read_text(encoding="utf-8"))["pairs"]
+            index_pairs |= {(p["competition"], int(p["season"])) for p in old_index}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    files["index.json"] = {
+        "data_version": current_data_version(max_age=0),
+        "pairs": [
+            {
+                "competition": c,
+                "season": s,
+                "path": f"{slug(c)}/{s}",
+            }
+            for c, s in sorted(index_pairs)
+        ],
+    }
+
+    kept = len(new)
+    written = 0
+    for rel, doc in sorted(files.items()):
+        data = encode(doc)
+        digest = hashlib.sha256(data).hexdigest()
+        new[rel] = digest
+        if old.get(rel) != digest or not (root / rel).exists():
+            _write(root, rel, data)
+            written += 1
+
+    removed = 0
+    for rel in sorted(set(old) - set(new)):
+        try:
+            (root / rel).unlink()
+            removed += 1
+        except OSError:
+            pass
+
+    _write(root, MANIFEST, json.dumps({"published_at": utcnow_iso(), "files": new}, indent=1, sort_keys=True).encode("utf-8"))
+
+    return {
+        "out_dir": str(root),
+        "pairs": len(pairs),
+        "files": len(new),
+        "written": written,
+        "unchanged": len(new) - kept - written,
+        "kept": kept,
+        "removed": removed,
+        "timings": {"render_s": t1 - t0, "write_s": time.perf_counter() - t1},
+    }
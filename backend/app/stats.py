@@ -0,0 +1,777 @@
+# backend/app/stats.py
+"""
+Calcolo delle statistiche squadra usate da /api/stats.
+
+Separato dalla route cosi' piu' squadre possono essere calcolate con un solo
+passaggio sulle partite della stagione (vedi /api/stats/batch).
+
+Ogni bucket tiene gli istogrammi dei gol (totali, fatti, subiti e risultato
+esatto): qualunque linea over/under, di squadra o clean sheet si ricava dalle
+somme cumulate, senza contatori per linea ne' un'altra scansione.
+"""
+
+import heapq
+import math
+
+from sqlalchemy import and_, case, func, literal, or_, select, union_all, update
+
+from app.models import Match, MatchContext, derived_columns
+from app.snapshots import get_snapshot
+
+OU_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+MAX_LINES = 20
+MAX_LINE_VALUE = 20.0
+RANK_BANDS = ["Top", "Mid", "Bottom"]
+# sezioni del documento /api/stats selezionabili con sections= (o fields=);
+# team / competition / season ci sono sempre, histogram solo se richiesto
+STATS_SECTIONS = (
+    "overall", "goals", "over_under", "failed_to_score", "form", "home", "away", "vs_rank_groups", "histogram",
+)
+DEFAULT_SECTIONS = STATS_SECTIONS[:-1]
+SUMMARY_PARTS = ("over_under", "failed_to_score", "form")
+BACKFILL_CHUNK = 1000
+
+# Le letture delle route sono in sola lettura: si selezionano solo le colonne
+# usate e si ottengono Row (tuple con accesso per nome), senza entita' ORM,
+# identity map e change tracking.
+MATCH_ROW_COLUMNS = (Match.id, Match.home_team, Match.away_team, Match.home_goals, Match.away_goals)
+CONTEXT_ROW_COLUMNS = (
+    MatchContext.match_id, MatchContext.home_rank_before, MatchContext.away_rank_before, MatchContext.total_teams,
+)
+
+
+def _stale_derived():
+    """Righe le cui colonne derivate non corrispondono a derived_columns(status, gol)."""
+    hg = func.coalesce(Match.home_goals, 0)
+    ag = func.coalesce(Match.away_goals, 0)
+    expected = {
+        Match.result: case((hg > ag, "H"), (hg < ag, "A"), else_="D"),
+        Match.total_goals: hg + ag,
+        Match.btts: case((and_(hg > 0, ag > 0), 1), else_=0),
+        Match.home_points: case((hg > ag, 3), (hg < ag, 0), else_=1),
+        Match.away_points: case((hg > ag, 0), (hg < ag, 3), else_=1),
+    }
+    return or_(
+        and_(
+            Match.status == "FINISHED",
+            or_(*(or_(col.is_(None), col != value) for col, value in expected.items())),
+        ),
+        and_(
+            or_(Match.status.is_(None), Match.status != "FINISHED"),
+            or_(*(col.isnot(None) for col in expected)),
+        ),
+    )
+
+
+def backfill_derived_columns(session) -> int:
+    """
+    Riallinea result/total_goals/btts/punti dove non corrispondono a status e
+    gol: righe scritte prima delle colonne derivate, copiate da un altro DB o
+    corrette con UPDATE che non passano da derived_columns.
+    """
+    stale = _stale_derived()
+    done = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Match.id, Match.status, Match.home_goals, Match.away_goals)
+            .filter(stale)
+            .filter(Match.id > last_id)
+            .order_by(Match.id)
+            .limit(BACKFILL_CHUNK)
+            .all()
+        )
+        if not rows:
+            break
+        session.execute(
+            update(Match),
+            [{"id": match_id, **derived_columns(status, hg, ag)} for match_id, status, hg, ag in rows],
+        )
+        session.commit()
+        done += len(rows)
+        last_id = rows[-1][0]
+    return done
+
+
+def load_matches(session, teams, competition=None, season=None):
+    """
+    Partite FINISHED che coinvolgono almeno una delle squadre, in ordine cronologico,
+    come righe MATCH_ROW_COLUMNS. teams=None: tutte le partite del filtro.
+    """
+    q = select(*MATCH_ROW_COLUMNS).where(Match.status == "FINISHED")
+    if competition:
+        q = q.where(Match.competition == competition)
+    if season is not None:
+        q = q.where(Match.season == season)
+
+    if teams is None:
+        pass
+    elif len(teams) == 1:
+        team = teams[0]
+        q = q.where(or_(Match.home_team == team, Match.away_team == team))
+    else:
+        q = q.where(or_(Match.home_team.in_(teams), Match.away_team.in_(teams)))
+
+    return session.execute(q.order_by(Match.date.asc(), Match.id.asc())).all()
+
+
+def load_context(session, teams, competition, season):
+    """Righe match_context della stagione per le squadre (solo con competition + season)."""
+    if not competition or season is None:
+        return []
+    q = (
+        select(*CONTEXT_ROW_COLUMNS)
+        .where(MatchContext.competition == competition)
+        .where(MatchContext.season == season)
+    )
+    if teams is not None:
+        q = q.where(or_(MatchContext.home_team.in_(teams), MatchContext.away_team.in_(teams)))
+    return session.execute(q).all()
+
+
+def parse_teams_param(raw: str):
+    """"A, B,A" -> ["A", "B"] (ordine preservato, senza duplicati)."""
+    teams = []
+    for t in (raw or "").split(","):
+        t = t.strip()
+        if t and t not in teams:
+            teams.append(t)
+    return teams
+
+
+def parse_sections(raw: str | None):
+    """
+    "overall,form" -> ("overall", "form") in ordine canonico.
+    None = documento standard (parametro assente o uguale a DEFAULT_SECTIONS).
+    ValueError se ci sono sezioni sconosciute.
+    """
+    names = [s.strip() for s in (raw or "").split(",") if s.strip()]
+    if not names:
+        return None
+    unknown = sorted(set(names) - set(STATS_SECTIONS))
+    if unknown:
+        raise ValueError(f"Sezioni non valide: {', '.join(unknown)} (disponibili: {', '.join(STATS_SECTIONS)})")
+    picked = tuple(s for s in STATS_SECTIONS if s in names)
+    return None if picked == DEFAULT_SECTIONS else picked
+
+
+def parse_lines(raw: str | None):
+    """
+    "0.5,2.5,3" -> (0.5, 2.5, 3.0) ordinate e senza duplicati; None = OU_LINES.
+    ValueError se non numeriche, fuori da [0, MAX_LINE_VALUE] o piu' di MAX_LINES.
+    """
+    parts = [p.strip() for p in (raw or "").split(",") if p.strip()]
+    if not parts:
+        return None
+    try:
+        values = sorted({float(p) for p in parts})
+    except ValueError:
+        raise ValueError(f"Linee non valide: {raw}") from None
+    if any(not (0 <= v <= MAX_LINE_VALUE) for v in values):
+        raise ValueError(f"Le linee devono essere tra 0 e {MAX_LINE_VALUE:g}")
+    if len(values) > MAX_LINES:
+        raise ValueError(f"Massimo {MAX_LINES} linee per richiesta")
+    return tuple(values)
+
+
+def season_rows(session, teams, competition=None, season=None, with_context=True):
+    """(partite, context): dallo snapshot mmap se allineato a data_version, altrimenti dal DB."""
+    if competition and season is not None:
+        snap = get_snapshot(competition, season)
+        if snap is not None:
+            return snap.rows(teams)
+    matches = load_matches(session, teams, competition, season)
+    ctx_rows = load_context(session, teams, competition, season) if matches and with_context else []
+    return matches, ctx_rows
+
+
+def team_stats(session, teams, competition=None, season=None, sections=None, lines=None):
+    """
+    Carica partite + context una volta e ritorna {team: documento /api/stats}.
+    Con sections si calcolano solo quelle sezioni; senza vs_rank_groups la
+    query su MatchContext non viene fatta. lines sostituisce OU_LINES.
+    """
+    with_context = sections is None or "vs_rank_groups" in sections
+    matches, ctx_rows = season_rows(session, teams, competition, season, with_context)
+    return compute_stats(teams, matches, ctx_rows, competition, season, sections, lines)
+
+
+def _result(gf, ga):
+    if gf > ga:
+        return "W"
+    if gf < ga:
+        return "L"
+    return "D"
+
+
+def empty_bucket():
+    return {
+        "matches": 0,
+        "wins": 0,
+        "draws": 0,
+        "losses": 0,
+        "goals_scored": 0,
+        "goals_conceded": 0,
+        "failed_to_score": 0,
+        "tot_goals": 0,  # scored + conceded per match (sum)
+        # istogrammi: indice = numero di gol, valore = partite
+        "hist_total": [],
+        "hist_for": [],
+        "hist_against": [],
+        "scores": {},  # (gf, ga) -> partite
+        "btts": 0,
+        "last": [],  # list of (result_char, gf, ga)
+    }
+
+
+def _hist_add(hist, k):
+    if k >= len(hist):
+        hist.extend([0] * (k + 1 - len(hist)))
+    hist[k] += 1
+
+
+def cumulative(hist):
+    """tail[k] = partite con almeno k gol (tail[len(hist)] = 0)."""
+    tail = [0] * (len(hist) + 1)
+    for k in range(len(hist) - 1, -1, -1):
+        tail[k] = tail[k + 1] + hist[k]
+    return tail
+
+
+def _ou_line_key(line):
+    return str(line).replace(".", "_")
+
+
+def line_stats(tail, mp, line):
+    """
+    Over/under di una linea da un istogramma cumulato, a costo costante.
+    Over = gol > line; sulle linee intere i gol == line sono "push" (rimborso).
+    """
+    def at(k):
+        return tail[k] if 0 <= k < len(tail) else 0
+
+    over = at(math.floor(line) + 1)
+    push = (at(int(line)) - at(int(line) + 1)) if line == int(line) else 0
+    under = mp - over - push
+    out = {
+        "line": line,
+        "over": over,
+        "under": under,
+        "over_rate": (over / mp) if mp else 0.0,
+        "under_rate": (under / mp) if mp else 0.0,
+    }
+    if line == int(line):
+        out["push"] = push
+        out["push_rate"] = (push / mp) if mp else 0.0
+    return out
+
+
+def push_match(bucket, gf, ga, result_char):
+    bucket["matches"] += 1
+    bucket["goals_scored"] += gf
+    bucket["goals_conceded"] += ga
+    bucket["tot_goals"] += (gf + ga)
+    if gf == 0:
+        bucket["failed_to_score"] += 1
+
+    if result_char == "W":
+        bucket["wins"] += 1
+    elif result_char == "D":
+        bucket["draws"] += 1
+    else:
+        bucket["losses"] += 1
+
+    _hist_add(bucket["hist_total"], gf + ga)
+    _hist_add(bucket["hist_for"], gf)
+    _hist_add(bucket["hist_against"], ga)
+    bucket["scores"][(gf, ga)] = bucket["scores"].get((gf, ga), 0) + 1
+
+    if gf > 0 and ga > 0:
+        bucket["btts"] += 1
+
+    bucket["last"].append((result_char, gf, ga))
+
+
+def summarize(bucket, parts=SUMMARY_PARTS, lines=None):
+    """
+    Blocco riassuntivo di un bucket; parts sceglie quali tra over_under /
+    failed_to_score / form / histogram calcolare. lines sostituisce OU_LINES e
+    aggiunge le stesse linee sui gol fatti / subiti (team_lines).
+    """
+    mp = bucket["matches"]
+    wins = bucket["wins"]
+    draws = bucket["draws"]
+    losses = bucket["losses"]
+    gf = bucket["goals_scored"]
+    ga = bucket["goals_conceded"]
+    pts = wins * 3 + draws
+
+    win_rate = (wins / mp) if mp else 0.0
+    draw_rate = (draws / mp) if mp else 0.0
+    loss_rate = (losses / mp) if mp else 0.0
+
+    avg_scored = (gf / mp) if mp else 0.0
+    avg_conceded = (ga / mp) if mp else 0.0
+    avg_total_goals = (bucket["tot_goals"] / mp) if mp else 0.0
+
+    out = {
+        "matches": mp,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "win_rate": win_rate,
+        "draw_rate": draw_rate,
+        "loss_rate": loss_rate,
+        "goals_scored": gf,
+        "goals_conceded": ga,
+        "avg_scored": avg_scored,
+        "avg_conceded": avg_conceded,
+        "avg_total_goals": avg_total_goals,
+        "points": pts,
+        "ppg": (pts / mp) if mp else 0.0,
+    }
+
+    # Over/Under lines
+    if "over_under" in parts:
+        total_tail = cumulative(bucket["hist_total"])
+        o25 = line_stats(total_tail, mp, 2.5)
+
+        out["over_under"] = {
+            "over_25": o25["over"],
+            "under_25": o25["under"],
+            "btts": bucket["btts"],
+            "over_25_rate": o25["over_rate"],
+            "under_25_rate": o25["under_rate"],
+            "btts_rate": (bucket["btts"] / mp) if mp else 0.0,
+            "lines": {_ou_line_key(line): line_stats(total_tail, mp, line) for line in (lines or OU_LINES)},
+        }
+        if lines is not None:
+            for_tail = cumulative(bucket["hist_for"])
+            against_tail = cumulative(bucket["hist_against"])
+            out["over_under"]["team_lines"] = {
+                "scored": {_ou_line_key(line): line_stats(for_tail, mp, line) for line in lines},
+                "conceded": {_ou_line_key(line): line_stats(against_tail, mp, line) for line in lines},
+            }
+
+    if "failed_to_score" in parts:
+        out["failed_to_score"] = {
+            "count": bucket["failed_to_score"],
+            "rate": (bucket["failed_to_score"] / mp) if mp else 0.0,
+        }
+
+    # Form: last 5/10 (from bucket["last"])
+    def form_block(n):
+        last_n = bucket["last"][-n:] if n > 0 else []
+        w = sum(1 for r, _, __ in last_n if r == "W")
+        d = sum(1 for r, _, __ in last_n if r == "D")
+        l = sum(1 for r, _, __ in last_n if r == "L")
+        pts_n = w * 3 + d
+        gf_n = sum(gf1 for _, gf1, __ in last_n)
+        ga_n = sum(ga1 for _, __, ga1 in last_n)
+        return {
+            "matches": len(last_n),
+            "record": f"{w}W-{d}D-{l}L",
+            "points": pts_n,
+            "goals_scored": gf_n,
+            "goals_conceded": ga_n,
+        }
+
+    if "form" in parts:
+        out["form"] = {
+            "last_5": form_block(5),
+            "last_10": form_block(10),
+        }
+
+    if "histogram" in parts:
+        against = bucket["hist_against"]
+        out["histogram"] = {
+            "total": list(bucket["hist_total"]),
+            "scored": list(bucket["hist_for"]),
+            "conceded": list(against),
+            "scores": {f"{gf}-{ga}": n for (gf, ga), n in sorted(bucket["scores"].items())},
+            "clean_sheets": against[0] if against else 0,
+            "clean_sheet_rate": ((against[0] if against else 0) / mp) if mp else 0.0,
+        }
+
+    return out
+
+
+def _empty_group():
+    return {"matches": 0, "wins": 0, "draws": 0, "losses": 0, "goals_for": 0, "goals_against": 0}
+
+
+def _finalize_group(g):
+    mp = g["matches"]
+    pts = g["wins"] * 3 + g["draws"]
+    return {
+        "matches": mp,
+        "wins": g["wins"],
+        "draws": g["draws"],
+        "losses": g["losses"],
+        "win_rate": (g["wins"] / mp) if mp else 0.0,
+        "ppg": (pts / mp) if mp else 0.0,
+        "goals_for": g["goals_for"],
+        "goals_against": g["goals_against"],
+    }
+
+
+def vs_rank_groups(items, total_teams, competition, season):
+    """
+    Top/Mid/Bottom dell'avversario (rank pre-partita da MatchContext).
+    items: lista di (is_home, gf, ga, result_char, opp_rank).
+    """
+    top_n = 6 if total_teams >= 18 else (max(3, total_teams // 3) if total_teams else 6)
+    bottom_n = 5 if total_teams >= 18 else (max(3, total_teams // 4) if total_teams else 5)
+    bottom_threshold_rank = max(1, total_teams - bottom_n + 1) if total_teams else None
+
+    groups_overall = {b: _empty_group() for b in RANK_BANDS}
+    groups_home = {b: _empty_group() for b in RANK_BANDS}
+    groups_away = {b: _empty_group() for b in RANK_BANDS}
+
+    for is_home, gf, ga, res, opp_rank in items:
+        if not opp_rank:
+            band = "Mid"
+        elif opp_rank <= top_n:
+            band = "Top"
+        elif bottom_threshold_rank and opp_rank >= bottom_threshold_rank:
+            band = "Bottom"
+        else:
+            band = "Mid"
+
+        for target in (groups_overall, (groups_home if is_home else groups_away)):
+            g = target[band]
+            g["matches"] += 1
+            g["goals_for"] += gf
+            g["goals_against"] += ga
+            if res == "W":
+                g["wins"] += 1
+            elif res == "D":
+                g["draws"] += 1
+            else:
+                g["losses"] += 1
+
+    bands = list(RANK_BANDS)
+    return {
+        "competition": competition,
+        "season": season,
+        "total_teams": total_teams,
+        "top_n": top_n,
+        "bottom_n": bottom_n,
+        "bottom_threshold_rank": bottom_threshold_rank,
+        "rank_bands": bands,
+        "bands": {b: _finalize_group(groups_overall[b]) for b in bands},
+        "bands_home": {b: _finalize_group(groups_home[b]) for b in bands},
+        "bands_away": {b: _finalize_group(groups_away[b]) for b in bands},
+        "vs_top": _finalize_group(groups_overall["Top"]),
+        "vs_mid": _finalize_group(groups_overall["Mid"]),
+        "vs_bottom": _finalize_group(groups_overall["Bottom"]),
+        "home": {
+            "vs_top": _finalize_group(groups_home["Top"]),
+            "vs_mid": _finalize_group(groups_home["Mid"]),
+            "vs_bottom": _finalize_group(groups_home["Bottom"]),
+        },
+        "away": {
+            "vs_top": _finalize_group(groups_away["Top"]),
+            "vs_mid": _finalize_group(groups_away["Mid"]),
+            "vs_bottom": _finalize_group(groups_away["Bottom"]),
+        },
+    }
+
+
+def _empty_acc():
+    return {
+        "overall": empty_bucket(),
+        "home": empty_bucket(),
+        "away": empty_bucket(),
+        "vs_items": [],
+        "ctx_total_teams": 0,
+        "ctx_rows": 0,
+    }
+
+
+def compute_stats(teams, matches, ctx_rows, competition=None, season=None, sections=None, lines=None):
+    """
+    Un solo passaggio sulle partite per tutte le squadre richieste.
+    Ritorna {team: documento /api/stats}, limitato a sections se indicate.
+    """
+    want = DEFAULT_SECTIONS if sections is None else sections
+    accs = fold_matches(
+        teams, matches, ctx_rows if "vs_rank_groups" in want else (), competition, season,
+        splits="home" in want or "away" in want,
+    )
+    return {t: build_document(t, accs[t], competition, season, sections, lines) for t in teams}
+
+
+def fold_matches(teams, matches, ctx_rows=(), competition=None, season=None, splits=True):
+    """
+    Accumulatori overall/home/away (+ item vs-rank) per squadra, in un solo passaggio.
+    splits=False non riempie i bucket home/away.
+    """
+    use_ctx = bool(competition) and season is not None
+    ctx_by_id = {c.match_id: c for c in ctx_rows} if use_ctx else {}
+    accs = {t: _empty_acc() for t in teams}
+
+    for m in matches:
+        hg = m.home_goals or 0
+        ag = m.away_goals or 0
+        ctx = ctx_by_id.get(m.id)
+
+        for team, is_home in ((m.home_team, True), (m.away_team, False)):
+            acc = accs.get(team)
+            if acc is None:
+                continue
+
+            gf = hg if is_home else ag
+            ga = ag if is_home else hg
+            # esito ricavato qui: le righe dello snapshot non hanno le colonne derivate
+            res = _result(gf, ga)
+
+            push_match(acc["overall"], gf, ga, res)
+            if splits:
+                push_match(acc["home"] if is_home else acc["away"], gf, ga, res)
+
+            if ctx is not None:
+                opp_rank = ctx.away_rank_before if is_home else ctx.home_rank_before
+                acc["vs_items"].append((is_home, gf, ga, res, opp_rank))
+                acc["ctx_rows"] += 1
+                acc["ctx_total_teams"] = max(acc["ctx_total_teams"], ctx.total_teams or 0)
+
+    return accs
+
+
+def build_document(team, acc, competition, season, sections=None, lines=None):
+    want = DEFAULT_SECTIONS if sections is None else sections
+    split_parts = SUMMARY_PARTS + (("histogram",) if "histogram" in want else ())
+    overall_s = summarize(acc["overall"], [p for p in split_parts if p in want], lines)
+
+    doc = {
+        "team": team,
+        "competition": competition or "All",
+        "season": season if season is not None else "All",
+    }
+
+    if "overall" in want:
+        doc.update({
+            "matches_played": overall_s["matches"],
+            "wins": overall_s["wins"],
+            "draws": overall_s["draws"],
+            "losses": overall_s["losses"],
+            "win_rate": overall_s["win_rate"],
+            "draw_rate": overall_s["draw_rate"],
+            "loss_rate": overall_s["loss_rate"],
+
+            "goals_scored": overall_s["goals_scored"],
+            "goals_conceded": overall_s["goals_conceded"],
+        })
+    if "goals" in want:
+        doc["goals"] = {
+            "avg_scored": overall_s["avg_scored"],
+            "avg_conceded": overall_s["avg_conceded"],
+            "avg_total_goals": overall_s["avg_total_goals"],
+            "goal_difference": overall_s["goals_scored"] - overall_s["goals_conceded"],
+        }
+
+    for part in SUMMARY_PARTS:
+        if part in want:
+            doc[part] = overall_s[part]
+
+    if "home" in want:
+        doc["home"] = summarize(acc["home"], split_parts, lines)
+    if "away" in want:
+        doc["away"] = summarize(acc["away"], split_parts, lines)
+
+    if "vs_rank_groups" in want:
+        vsg = None
+        if acc["ctx_rows"]:
+            vsg = vs_rank_groups(acc["vs_items"], acc["ctx_total_teams"], competition, season)
+        doc["vs_rank_groups"] = vsg or {"note": "MatchContext non disponibile (serve competition + season + rebuild context)"}
+
+    if "histogram" in want:
+        doc["histogram"] = overall_s["histogram"]
+
+    return doc
+
+
+# ---- Leaderboard ----
+
+LEADERBOARD_SPLITS = ("overall", "home", "away")
+
+
+def _line_key(line):
+    return str(line).replace(".", "")
+
+
+def flat_metrics(summary):
+    """Metriche numeriche piatte di un blocco summarize(), ordinabili nella leaderboard."""
+    ou = summary["over_under"]
+    out = {
+        k: summary[k] for k in (
+            "matches", "wins", "draws", "losses", "win_rate", "draw_rate", "loss_rate",
+            "goals_scored", "goals_conceded", "avg_scored", "avg_conceded", "avg_total_goals",
+            "points", "ppg",
+        )
+    }
+    out["goal_difference"] = summary["goals_scored"] - summary["goals_conceded"]
+    out["btts"] = ou["btts"]
+    out["btts_rate"] = ou["btts_rate"]
+    out["failed_to_score"] = summary["failed_to_score"]["count"]
+    out["failed_to_score_rate"] = summary["failed_to_score"]["rate"]
+    for line_data in ou["lines"].values():
+        key = _line_key(line_data["line"])
+        out[f"over_{key}"] = line_data["over"]
+        out[f"under_{key}"] = line_data["under"]
+        out[f"over_{key}_rate"] = line_data["over_rate"]
+        out[f"under_{key}_rate"] = line_data["under_rate"]
+    out["form_5_points"] = summary["form"]["last_5"]["points"]
+    out["form_10_points"] = summary["form"]["last_10"]["points"]
+    return out
+
+
+def leaderboard_rows(accs):
+    """{team: accumulatore di fold_matches} -> {split: [(team, metriche)]}."""
+    rows = {split: [] for split in LEADERBOARD_SPLITS}
+    for team, acc in accs.items():
+        for split in LEADERBOARD_SPLITS:
+            rows[split].append((team, flat_metrics(summarize(acc[split]))))
+    return rows
+
+
+def top_k(rows, metric, k=None, ascending=False):
+    """Ordina per metrica (parita': nome squadra) e tiene i primi k."""
+    if ascending:
+        key = lambda r: (r[1][metric], r[0])  # noqa: E731
+        picked = heapq.nsmallest(k, rows, key=key) if k else sorted(rows, key=key)
+    else:
+        key = lambda r: (-r[1][metric], r[0])  # noqa: E731
+        picked = heapq.nsmallest(k, rows, key=key) if k else sorted(rows, key=key)
+    return picked
+
+
+# ---- Standings ----
+
+def load_standings(session, competition, season, date_limit):
+    """
+    Classifica alla data aggregata in SQL sulle colonne derivate (punti, esito):
+    una riga per squadra invece di tutte le partite. Stesso risultato di
+    compute_standings sulle partite FINISHED fino a date_limit.
+    """
+    def side(team_col, result_win, result_loss, gf_col, ga_col, points_col):
+        return (
+            select(
+                team_col.label("team"),
+                literal(1).label("played"),
+                case((Match.result == result_win, 1), else_=0).label("wins"),
+                case((Match.result == "D", 1), else_=0).label("draws"),
+                case((Match.result == result_loss, 1), else_=0).label("losses"),
+                func.coalesce(gf_col, 0).label("gf"),
+                func.coalesce(ga_col, 0).label("ga"),
+                func.coalesce(points_col, 0).label("points"),
+            )
+            .where(Match.status == "FINISHED")
+            .where(Match.competition == competition)
+            .where(Match.season == season)
+            .where(Match.date <= date_limit)
+            .where(Match.home_team != "")
+            .where(Match.away_team != "")
+        )
+
+    sides = union_all(
+        side(Match.home_team, "H", "A", Match.home_goals, Match.away_goals, Match.home_points),
+        side(Match.away_team, "A", "H", Match.away_goals, Match.home_goals, Match.away_points),
+    ).subquery()
+
+    totals = session.execute(
+        select(
+            sides.c.team,
+            func.sum(sides.c.played),
+            func.sum(sides.c.wins),
+            func.sum(sides.c.draws),
+            func.sum(sides.c.losses),
+            func.sum(sides.c.gf),
+            func.sum(sides.c.ga),
+            func.sum(sides.c.points),
+        ).group_by(sides.c.team)
+    ).all()
+
+    rows = [
+        {
+            "team": team,
+            "played": int(played),
+            "wins": int(wins),
+            "draws": int(draws),
+            "losses": int(losses),
+            "gf": int(gf),
+            "ga": int(ga),
+            "points": int(points),
+        }
+        for team, played, wins, draws, losses, gf, ga, points in totals
+    ]
+    return rank_standings(rows)
+
+
+def rank_standings(rows):
+    for r in rows:
+        r["gd"] = r["gf"] - r["ga"]
+
+    rows.sort(key=standings_sort_key, reverse=True)
+    for i, r in enumerate(rows, start=1):
+        r["rank"] = i
+    return rows
+
+
+def standings_sort_key(r):
+    """Ordine classifica (da usare con reverse=True): punti, diff reti, gol fatti, giocate, nome."""
+    return (r["points"], r["gd"], r["gf"], r["played"], r["team"])
+
+
+def compute_standings(matches):
+    table = {}
+
+    def ensure(team):
+        if team not in table:
+            table[team] = {
+                "team": team,
+                "played": 0,
+                "wins": 0,
+                "draws": 0,
+                "losses": 0,
+                "gf": 0,
+                "ga": 0,
+                "points": 0,
+            }
+
+    for m in matches:
+        home = m.home_team
+        away = m.away_team
+        if not home or not away:
+            continue
+
+        ensure(home)
+        ensure(away)
+
+        hg = m.home_goals or 0
+        ag = m.away_goals or 0
+
+        table[home]["played"] += 1
+        table[away]["played"] += 1
+
+        table[home]["gf"] += hg
+        table[home]["ga"] += ag
+        table[away]["gf"] += ag
+        table[away]["ga"] += hg
+
+        if hg > ag:
+            table[home]["wins"] += 1
+            table[away]["losses"] += 1
+            table[home]["points"] += 3
+        elif hg < ag:
+            table[away]["wins"] += 1
+            table[home]["losses"] += 1
+            table[away]["points"] += 3
+        else:
+            table[home]["draws"] += 1
+            table[away]["draws"] += 1
+            table[home]["points"] += 1
+            table[away]["points"] += 1
+
+    return rank_standings(list(table.values()))
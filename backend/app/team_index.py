@@ -0,0 +1,90 @@
+# backend/app/team_index.py
+"""
+Indice in memoria delle squadre per (competition, season).
+
+Costruito con una sola query DISTINCT (niente oggetti Match) e ricostruito
+quando cambia data_version, cioe' dopo ogni import. Le chiavi usano None
+come "tutte": (comp, None), (None, season), (None, None).
+"""
+
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import select, union
+
+from app.db import SessionLocal
+from app.models import Match
+from app.versioning import current_data_version
+
+
+class TeamIndex:
+    def __init__(self, version: int, buckets: dict):
+        self.version = version
+        self._names = {}
+        self._folded = {}
+        for key, teams in buckets.items():
+            self._names[key] = sorted(teams)
+            # per la ricerca per prefisso case-insensitive
+            self._folded[key] = sorted((t.casefold(), t) for t in teams)
+
+    def teams(self, competition=None, season=None):
+        return self._names.get((competition or None, season), [])
+
+    def search(self, prefix: str, competition=None, season=None, limit=None):
+        folded = self._folded.get((competition or None, season), [])
+        p = prefix.casefold()
+        out = []
+        i = bisect_left(folded, (p,))
+        while i < len(folded) and folded[i][0].startswith(p):
+            out.append(folded[i][1])
+            i += 1
+            if limit and len(out) >= limit:
+                break
+        return sorted(out)
+
+
+def build_team_index(session, version: int) -> TeamIndex:
+    finished = Match.status == "FINISHED"
+    q = union(
+        select(Match.competition, Match.season, Match.home_team.label("team")).where(finished),
+        select(Match.competition, Match.season, Match.away_team.label("team")).where(finished),
+    )
+
+    buckets = {}
+    for comp, season, team in session.execute(q):
+        if not team:
+            continue
+        for key in ((comp, season), (comp, None), (None, season), (None, None)):
+            buckets.setdefault(key, set()).add(team)
+
+    return TeamIndex(version, buckets)
+
+
+_lock = threading.Lock()
+_index = {"current": None}
+
+
+def get_team_index() -> TeamIndex:
+    version = current_data_version()
+    idx = _index["current"]
+    if idx is not None and idx.version == version:
+        return idx
+
+    with _lock:
+        idx = _index["current"]
+        if idx is not None and idx.version == version:
+            return idx
+        session = SessionLocal()
+        try:
+            idx = build_team_index(session, version)
+        finally:
+            session.close()
+        _index["current"] = idx
+        return idx
+
+
+def refresh_team_index() -> TeamIndex:
+    """Forza la ricostruzione (chiamata a fine import)."""
+    with _lock:
+        _index["current"] = None
+    return get_team_index()
@@ -0,0 +1,113 @@
+# backend/app/versioning.py
+"""
+Versione dei dati, condivisa tra worker tramite la tabella app_meta.
+
+Ogni import/rebuild incrementa data_version; le strutture in memoria
+(indici, cache) la confrontano per sapere quando sono vecchie.
+La lettura e' memorizzata per DATA_VERSION_TTL secondi per non fare
+una query a ogni richiesta.
+
+Per la cache delle risposte ci sono anche le versioni per tag
+(tag:<competition>|<season>, tag:all, tag:*): un import che conosce le
+coppie toccate incrementa solo quelle, le voci degli altri tag restano valide.
+"""
+
+import os
+import threading
+import time
+
+from app.db import SessionLocal
+from app.models import AppMeta
+
+DATA_VERSION_KEY = "data_version"
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "5"))
+
+TAG_PREFIX = "tag:"
+TAG_ALL = "all"  # risposte non limitate a una coppia (tutte le stagioni, h2h, ...)
+TAG_ANY = "*"  # presente su ogni voce: incrementarlo invalida tutto
+
+_lock = threading.Lock()
+_cached = {"version": None, "checked_at": 0.0}
+_tags_cached = {"data_version": None, "tags": {}}
+
+
+def pair_tag(competition, season) -> str:
+    """Tag di cache di una coppia; senza competition + season la risposta e' TAG_ALL."""
+    if not competition or season is None:
+        return TAG_ALL
+    return f"{competition}|{int(season)}"
+
+
+def _incr(session, key) -> int:
+    row = session.get(AppMeta, key)
+    if row is None:
+        row = AppMeta(key=key, value="0")
+        session.add(row)
+    value = int(row.value or 0) + 1
+    row.value = str(value)
+    return value
+
+
+def bump_data_version(session=None, tags=None) -> int:
+    """
+    Incrementa e ritorna la versione. Con session esterna non fa commit.
+    tags: coppie toccate (pair_tag) -> si invalidano solo quelle + TAG_ALL;
+    None (default) -> si invalida tutta la cache.
+    """
+    own = session is None
+    if own:
+        session = SessionLocal()
+    try:
+        version = _incr(session, DATA_VERSION_KEY)
+        for tag in ([TAG_ANY] if tags is None else sorted(set(tags) | {TAG_ALL})):
+            _incr(session, TAG_PREFIX + tag)
+        if own:
+            session.commit()
+    finally:
+        if own:
+            session.close()
+
+    with _lock:
+        _cached["version"] = version
+        _cached["checked_at"] = time.monotonic()
+    return version
+
+
+def current_data_version(max_age: float | None = None) -> int:
+    ttl = DATA_VERSION_TTL if max_age is None else max_age
+    now = time.monotonic()
+    with _lock:
+        if _cached["version"] is not None and now - _cached["checked_at"] < ttl:
+            return _cached["version"]
+
+    session = SessionLocal()
+    try:
+        row = session.get(AppMeta, DATA_VERSION_KEY)
+        version = int(row.value or 0) if row else 0
+    finally:
+        session.close()
+
+    with _lock:
+        _cached["version"] = version
+        _cached["checked_at"] = now
+    return version
+
+
+def tag_versions() -> dict:
+    """{tag: versione}; riletta da app_meta solo quando data_version cambia."""
+    version = current_data_version()
+    with _lock:
+        if _tags_cached["data_version"] == version:
+            return _tags_cached["tags"]
+
+    session = SessionLocal()
+    try:
+        rows = session.query(AppMeta.key, AppMeta.value).filter(AppMeta.key.startswith(TAG_PREFIX)).all()
+    finally:
+        session.close()
+    tags = {key[len(TAG_PREFIX):]: int(value or 0) for key, value in rows}
+
+    with _lock:
+        _tags_cached["data_version"] = version
+        _tags_cached["tags"] = tags
+    return tags
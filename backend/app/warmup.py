@@ -0,0 +1,253 @@
+# backend/app/warmup.py
+"""
+Riscaldamento della cache a fine import / rebuild, per le stagioni attive.
+
+Senza warm-up il primo visitatore di ogni pagina paga il calcolo a freddo.
+Le voci vengono scritte con le stesse chiavi delle route, in ordine di priorita':
+  predictions  /api/predict delle partite in programma, per data
+  pages        /api/matches, /api/bootstrap (tutte le coppie e per coppia,
+               con la classifica all'ultima data FINISHED) e indice squadre
+  stats        /api/stats di ogni squadra delle coppie attive (una passata per coppia)
+I task girano su un pool di CACHE_WARM_WORKERS thread (una sessione per task)
+e vengono sottomessi in quest'ordine; il report ha i tempi per fase.
+
+Le route di import / rebuild non aspettano il warm-up: start_warmup lo lancia
+in un thread di sfondo (uno alla volta, le richieste nel frattempo si accodano)
+e la risposta torna subito; POST /api/admin/cache/warm resta il passo esplicito.
+
+Con CACHE_BACKEND=memory si scalderebbe solo il worker che esegue il warm-up:
+con piu' worker (WEB_CONCURRENCY o --workers in GUNICORN_CMD_ARGS) si salta,
+serve un backend condiviso (file / redis).
+"""
+
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sqlalchemy import select
+
+from app import stats
+from app.cache import get_cache
+from app.db import SessionLocal
+from app.models import Match
+from app.predictors.rules_v1 import predict_with_session
+from app.routes.predict import prediction_tags
+from app.bootstrap import build_bootstrap, upcoming_matches
+from app.static_json import active_pairs
+from app.team_index import get_team_index
+from app.versioning import TAG_ALL, pair_tag, tag_versions
+
+CACHE_WARM_WORKERS = int(os.getenv("CACHE_WARM_WORKERS", "4"))
+PREDICTION_CHUNK = 20
+
+STAGES = ("predictions", "pages", "stats")
+
+
+def _warm_predictions(match_ids):
+    """Stesse voci di /api/predict con debug (frontend), lette anche da /api/bootstrap."""
+    cache = get_cache()
+    session = SessionLocal()
+    try:
+        for match_id in match_ids:
+            cache.get_or_compute(
+                "predict", [match_id, None, True], prediction_tags,
+                lambda: predict_with_session(session, match_id, None, True),
+            )
+    finally:
+        session.close()
+    return len(match_ids)
+
+
+def _warm_pages(pairs):
+    cache = get_cache()
+    get_team_index()
+    cache.get_or_compute("matches", [], [TAG_ALL], upcoming_matches)
+    cache.get_or_compute("bootstrap", [None, None], [TAG_ALL], lambda: build_bootstrap(None, None))
+    for competition, season in pairs:
+        cache.get_or_compute(
+            "bootstrap", [competition, season], [pair_tag(competition, season)],
+            lambda: build_bootstrap(competition, season),
+        )
+    return 2 + len(pairs)
+
+
+def _warm_stats(competition, season):
+    """Documenti /api/stats di tutte le squadre della coppia con una sola lettura delle partite."""
+    cache = get_cache()
+    teams = get_team_index().teams(competition, season)
+    versions = tag_versions()  # prima del calcolo, come get_or_compute
+    session = SessionLocal()
+    try:
+        docs = stats.team_stats(session, teams, competition, season)
+    finally:
+        session.close()
+    for team, doc in docs.items():
+        # stessa forma di _team_stats([team], ...): {squadra: documento}
+        cache.set(
+            "stats", [[team], competition, season, None, None], [pair_tag(competition, season)], {team: doc},
+            versions=versions,
+        )
+    return len(docs)
+
+
+def _plan(session, pairs):
+    """[(fase, funzione, argomenti)] in ordine di priorita'."""
+    upcoming = []
+    for competition, season in pairs:
+        upcoming += session.execute(
+            select(Match.date, Match.id)
+            .where(Match.status != "FINISHED")
+            .where(Match.competition == competition)
+            .where(Match.season == season)
+        ).all()
+    ids = [match_id for _date, match_id in sorted(upcoming, key=lambda r: (r[0] or "", r[1]))]
+
+    tasks = [
+        ("predictions", _warm_predictions, (ids[i:i + PREDICTION_CHUNK],))
+        for i in range(0, len(ids), PREDICTION_CHUNK)
+    ]
+    tasks.append(("pages", _warm_pages, (pairs,)))
+    tasks += [("stats", _warm_stats, pair) for pair in pairs]
+    return tasks
+
+
+def server_workers() -> int:
+    """Processi del server: WEB_CONCURRENCY, altrimenti -w / --workers in GUNICORN_CMD_ARGS (default 1)."""
+    raw = os.getenv("WEB_CONCURRENCY", "")
+    if not raw:
+        args = shlex.split(os.getenv("GUNICORN_CMD_ARGS", ""))
+        for i, arg in enumerate(args):
+            if arg in ("-w", "--workers") and i + 1 < len(args):
+                raw = args[i + 1]
+            elif arg.startswith("--workers="):
+                raw = arg.split("=", 1)[1]
+            elif arg.startswith("-w") and arg[2:].isdigit():
+                raw = arg[2:]
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return 1
+
+
+def _skip_reason():
+    backend = get_cache().backend
+    if backend is None:
+        return "cache disattivata"
+    if backend.name == "memory" and server_workers() > 1:
+        return f"CACHE_BACKEND=memory con {server_workers()} worker: si scalderebbe un solo processo"
+    return None
+
+
+def warm_cache(pairs=None, workers: int = CACHE_WARM_WORKERS) -> dict:
+    """Scalda la cache per le coppie attive (o quelle indicate). Ritorna il report per fase."""
+    reason = _skip_reason()
+    if reason:
+        return {"skipped": reason}
+
+    t0 = time.perf_counter()
+    session = SessionLocal()
+    try:
+        pairs = active_pairs(session) if pairs is None else sorted(pairs)
+        tasks = _plan(session, pairs)
+    finally:
+        session.close()
+
+    report = {
+        stage: {"tasks": 0, "items": 0, "busy_s": 0.0, "done_at_s": None}
+        for stage in STAGES
+    }
+    errors = []
+    lock = threading.Lock()
+
+    def run(stage, fn, args):
+        started = time.perf_counter()
+        items = fn(*args)
+        finished = time.perf_counter()
+        with lock:
+            r = report[stage]
+            r["tasks"] += 1
+            r["items"] += items
+            r["busy_s"] += finished - started
+            r["done_at_s"] = max(r["done_at_s"] or 0.0, finished - t0)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run, *task): task for task in tasks}
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                stage, _fn, args = futures[fut]
+                errors.append({"stage": stage, "args": repr(args)[:200], "error": str(e)})
+
+    out = {
+        "pairs": [{"competition": c, "season": s} for c, s in pairs],
+        "workers": max(1, workers),
+        "stages": report,
+        "elapsed_s": time.perf_counter() - t0,
+    }
+    backend = get_cache().backend
+    if backend.name == "memory" and backend.size() >= backend.max_entries:
+        # LRU: le prime voci scritte (le piu' importanti) sono le prime a uscire
+        out["warning"] = f"cache piena ({backend.max_entries} voci): alzare CACHE_MAX_ENTRIES"
+    if errors:
+        out["errors"] = errors
+    return out
+
+
+# ---- in background ----
+
+_bg_lock = threading.Lock()
+_bg = {"thread": None, "queued": False, "queued_pairs": None, "last": None}
+
+
+def _merge(a, b):
+    """Coppie da scaldare per due richieste (None = tutte le attive)."""
+    if a is None or b is None:
+        return None
+    return sorted(set(a) | set(b))
+
+
+def _run_background(pairs):
+    while True:
+        try:
+            report = warm_cache(pairs)
+        except Exception as e:
+            report = {"error": str(e)}
+        with _bg_lock:
+            _bg["last"] = report
+            if not _bg["queued"]:
+                _bg["thread"] = None
+                return
+            # dati cambiati durante il giro: se ne fa un altro con le coppie accodate
+            pairs = _bg["queued_pairs"]
+            _bg["queued"] = False
+            _bg["queued_pairs"] = None
+
+
+def start_warmup(pairs=None) -> dict:
+    """
+    Lancia warm_cache in un thread di sfondo e ritorna subito.
+    Con un warm-up gia' in corso la richiesta si accoda (coppie unite) e
+    parte appena quello finisce.
+    """
+    reason = _skip_reason()
+    if reason:
+        return {"skipped": reason}
+    pairs = None if pairs is None else sorted(pairs)
+    with _bg_lock:
+        if _bg["thread"] is not None:
+            _bg["queued_pairs"] = _merge(_bg["queued_pairs"], pairs) if _bg["queued"] else pairs
+            _bg["queued"] = True
+            return {"queued": True}
+        t = threading.Thread(target=_run_background, args=(pairs,), name="cache-warmup", daemon=True)
+        _bg["thread"] = t
+        t.start()
+    return {"started": True}
+
+
+def warmup_status() -> dict:
+    """Stato del warm-up in background: in corso, accodato, ultimo report."""
+    with _bg_lock:
+        return {"running": _bg["thread"] is not None, "queued": _bg["queued"], "last": _bg["last"]}
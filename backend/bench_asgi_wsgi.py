@@ -0,0 +1,174 @@
+"""
+Benchmark WSGI (gunicorn sync) vs ASGI (uvicorn, 1 processo) sugli stessi dati.
+
+Avvia ciascun server su un DB sintetico, lancia lo stesso mix di richieste
+(stats, standings, teams, predict) con N client concorrenti e riporta
+throughput e latenze p50/p95/p99.
+
+    python bench_asgi_wsgi.py --concurrency 32 --requests 2000 --wsgi-workers 2
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def http(method, url, body=None, timeout=60):
+    data = None
+    headers = {}
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.status, resp.read()
+
+
+def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            http("GET", f"{base_url}/api/teams", timeout=2)
+            return
+        except Exception:
+            time.sleep(0.3)
+    raise RuntimeError(f"server non pronto: {base_url}")
+
+
+def start_server(cmd, env):
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def build_workload(base_url, n, rng):
+    """Lista di (label, method, url, body) con lo stesso mix per entrambi i server."""
+    teams_by_comp = {}
+    _, raw = http("GET", f"{base_url}/api/matches")
+    upcoming = json.loads(raw)["matches"]
+    for m in upcoming:
+        teams_by_comp.setdefault((m["competition"], m["season"]), set()).update((m["home_team"], m["away_team"]))
+    keys = sorted(teams_by_comp)
+
+    out = []
+    for _ in range(n):
+        comp, season = rng.choice(keys)
+        team = rng.choice(sorted(teams_by_comp[(comp, season)]))
+        roll = rng.random()
+        if roll < 0.45:
+            q = urllib.parse.urlencode({"team": team, "competition": comp, "season": season})
+            out.append(("stats", "GET", f"{base_url}/api/stats?{q}", None))
+        elif roll < 0.65:
+            q = urllib.parse.urlencode({"competition": comp, "season": season, "date": f"{season + 1}-06-30"})
+            out.append(("standings", "GET", f"{base_url}/api/standings?{q}", None))
+        elif roll < 0.80:
+            q = urllib.parse.urlencode({"competition": comp, "season": season})
+            out.append(("teams", "GET", f"{base_url}/api/teams?{q}", None))
+        else:
+            m = rng.choice(upcoming)
+            out.append(("predict", "POST", f"{base_url}/api/predict", {"match_id": m["id"]}))
+    return out
+
+
+def run_load(workload, concurrency):
+    def one(item):
+        label, method, url, body = item
+        t0 = time.perf_counter()
+        try:
+            status, _ = http(method, url, body)
+            ok = status < 400
+        except Exception:
+            ok = False
+        return label, time.perf_counter() - t0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, workload))
+    wall = time.perf_counter() - t0
+
+    lat = sorted(r[1] for r in results)
+    errors = sum(1 for r in results if not r[2])
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "wall_s": wall,
+        "rps": len(results) / wall if wall else 0.0,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p95_ms": percentile(lat, 95) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WSGI vs ASGI")
+    parser.add_argument("--database-url", help="DB gia' popolato (default: SQLite sintetico temporaneo)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--wsgi-workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8911)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    tmpdir = None
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="bench_asgi_")
+        env["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+        subprocess.run([sys.executable, "seed_synthetic.py"], cwd=BACKEND_DIR, env=env, check=True)
+
+    servers = {
+        f"wsgi (gunicorn sync x{args.wsgi_workers})": [
+            sys.executable, "-m", "gunicorn", "-w", str(args.wsgi_workers), "-b", f"127.0.0.1:{args.port}", "wsgi:app",
+        ],
+        "asgi (uvicorn x1)": [
+            sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning",
+        ],
+    }
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    report = {}
+    workload = None
+    for name, cmd in servers.items():
+        proc = start_server(cmd, env)
+        try:
+            wait_ready(base_url)
+            if workload is None:
+                workload = build_workload(base_url, args.requests, random.Random(args.seed))
+            run_load(workload[: max(1, len(workload) // 10)], args.concurrency)  # warm-up
+            report[name] = run_load(workload, args.concurrency)
+        finally:
+            stop_server(proc)
+
+    print(f"{'server':32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, r in report.items():
+        print(f"{name:32} {r['rps']:8.1f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['errors']:7d}")
+
+
+if __name__ == "__main__":
+    main()
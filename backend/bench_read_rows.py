@@ -0,0 +1,187 @@
+"""
+Benchmark lettura ORM (entita' Match / MatchContext) vs righe a colonne.
+
+Per ogni endpoint di lettura esegue la stessa funzione di calcolo su due
+loader: quello "orm" (session.query(Match), come prima) e quello attuale
+(select delle sole colonne, Row senza identity map). Riporta latenza p50 e
+picco di memoria allocata (tracemalloc) per chiamata.
+
+    python bench_read_rows.py --seasons 6 --repeat 30
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def measure(fn, repeat):
+    """(p50 ms, picco KiB) su repeat chiamate; la prima serve da warm-up."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times) * 1000, peak / 1024
+
+
+def build_cases(SessionLocal):
+    # import qui: DATABASE_URL deve essere gia' impostato
+    from sqlalchemy import or_
+
+    from app import stats
+    from app.models import Match, MatchContext
+    from app.predictors import rules_v1
+
+    def orm_load_matches(session, teams, competition=None, season=None):
+        q = session.query(Match).filter(Match.status == "FINISHED")
+        if competition:
+            q = q.filter(Match.competition == competition)
+        if season is not None:
+            q = q.filter(Match.season == season)
+        if teams is not None:
+            q = q.filter(or_(Match.home_team.in_(teams), Match.away_team.in_(teams)))
+        return q.order_by(Match.date.asc(), Match.id.asc()).all()
+
+    def orm_load_context(session, teams, competition, season):
+        return (
+            session.query(MatchContext)
+            .filter(MatchContext.competition == competition)
+            .filter(MatchContext.season == season)
+            .filter(or_(MatchContext.home_team.in_(teams), MatchContext.away_team.in_(teams)))
+            .all()
+        )
+
+    def orm_past_matches(session, team, competition, season, date_cutoff):
+        return (
+            session.query(Match)
+            .filter(Match.status == "FINISHED")
+            .filter(Match.competition == competition)
+            .filter(Match.season == season)
+            .filter(Match.date < date_cutoff)
+            .filter(or_(Match.home_team == team, Match.away_team == team))
+            .order_by(Match.date.asc(), Match.id.asc())
+            .all()
+        )
+
+    session = SessionLocal()
+    try:
+        last = (
+            session.query(Match.competition, Match.season)
+            .order_by(Match.season.desc(), Match.competition.asc())
+            .first()
+        )
+        competition, season = last
+        team = session.query(Match.home_team).filter(Match.competition == competition).order_by(Match.home_team).first()[0]
+        rival = (
+            session.query(Match.away_team)
+            .filter(Match.home_team == team)
+            .order_by(Match.away_team)
+            .first()[0]
+        )
+        upcoming = (
+            session.query(Match.date)
+            .filter(Match.competition == competition, Match.season == season, Match.status != "FINISHED")
+            .order_by(Match.date)
+            .first()
+        )
+        cutoff = upcoming[0] if upcoming else f"{season + 1}-07-01"
+    finally:
+        session.close()
+
+    def with_session(fn):
+        def run():
+            session = SessionLocal()
+            try:
+                return fn(session)
+            finally:
+                session.close()
+        return run
+
+    def stats_case(load_m, load_c, comp, seas):
+        def fn(session):
+            matches = load_m(session, [team], comp, seas)
+            ctx = load_c(session, [team], comp, seas) if comp and seas is not None else []
+            return stats.compute_stats([team], matches, ctx, comp, seas)
+        return with_session(fn)
+
+    def leaderboard_case(load_m):
+        def fn(session):
+            matches = load_m(session, None, competition, season)
+            teams = sorted({m.home_team for m in matches} | {m.away_team for m in matches})
+            return stats.leaderboard_rows(stats.fold_matches(teams, matches))
+        return with_session(fn)
+
+    def predict_case(past):
+        def fn(session):
+            return [
+                rules_v1._compute_basic_splits(t, past(session, t, competition, season, cutoff))
+                for t in (team, rival)
+            ]
+        return with_session(fn)
+
+    return {
+        "stats (1 stagione)": (
+            stats_case(orm_load_matches, orm_load_context, competition, season),
+            stats_case(stats.load_matches, stats.load_context, competition, season),
+        ),
+        "stats (tutte le stagioni)": (
+            stats_case(orm_load_matches, orm_load_context, None, None),
+            stats_case(stats.load_matches, stats.load_context, None, None),
+        ),
+        "leaderboard": (
+            leaderboard_case(orm_load_matches),
+            leaderboard_case(stats.load_matches),
+        ),
+        "predict (storico squadre)": (
+            predict_case(orm_past_matches),
+            predict_case(rules_v1._team_past_matches),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ORM vs righe a colonne")
+    parser.add_argument("--database-url", help="DB gia' popolato (default: SQLite sintetico temporaneo)")
+    parser.add_argument("--competitions", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="bench_rows_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+        subprocess.run(
+            [sys.executable, "seed_synthetic.py", "--competitions", str(args.competitions), "--seasons", str(args.seasons)],
+            cwd=BACKEND_DIR, env=dict(os.environ), check=True,
+        )
+
+    from app.db import SessionLocal
+
+    cases = build_cases(SessionLocal)
+
+    print(f"{'endpoint':28} {'orm ms':>8} {'rows ms':>8} {'orm KiB':>9} {'rows KiB':>9} {'speedup':>8}")
+    for name, (orm_fn, rows_fn) in cases.items():
+        orm_ms, orm_kib = measure(orm_fn, args.repeat)
+        rows_ms, rows_kib = measure(rows_fn, args.repeat)
+        speedup = orm_ms / rows_ms if rows_ms else 0.0
+        print(f"{name:28} {orm_ms:8.2f} {rows_ms:8.2f} {orm_kib:9.0f} {rows_kib:9.0f} {speedup:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
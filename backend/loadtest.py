@@ -0,0 +1,258 @@
+"""
+Load test che rigioca i percorsi del frontend (frontend/script.js).
+
+Ogni utente virtuale apre la pagina (/api/bootstrap, come all'avvio di
+script.js) e poi esegue sessioni scelte a caso con i pesi indicati:
+  stats      cambio filtri -> /api/teams, poi /api/stats per 1-3 squadre
+  standings  /api/standings per competizione, stagione e data
+  predict    /api/matches, poi /api/predict per 1-4 partite in programma
+Gli utenti partono scaglionati sul ramp-up e girano per --duration secondi.
+Riporta throughput, p50/p95/p99 ed errori per endpoint.
+
+Di default avvia gunicorn in locale su un DB sintetico (seed_synthetic.py):
+
+    python loadtest.py --users 20 --ramp-up 10 --duration 60 --workers 2
+    python loadtest.py --base-url http://127.0.0.1:8000 --users 50   # server gia' avviato
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+from bench_asgi_wsgi import BACKEND_DIR, http, percentile, start_server, stop_server, wait_ready
+
+DEFAULT_WEIGHTS = "stats=5,standings=2,predict=3"
+
+
+def parse_weights(raw):
+    weights = {}
+    for part in (raw or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise ValueError(f"flow sconosciuto: {name} (disponibili: {', '.join(FLOWS)})")
+        weights[name] = float(value or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("servono pesi > 0")
+    return weights
+
+
+class Recorder:
+    """Latenze ed esiti per endpoint, condivisi tra i thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.sessions = 0
+
+    def add(self, label, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+
+class Client:
+    def __init__(self, base_url, recorder, catalog, rng, think):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.catalog = catalog
+        self.rng = rng
+        self.think = think
+
+    def call(self, label, method, path, params=None, body=None):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        t0 = time.perf_counter()
+        data = None
+        try:
+            status, raw = http(method, url, body)
+            ok = status < 400
+            data = json.loads(raw) if ok else None
+        except (urllib.error.URLError, OSError, ValueError):
+            ok = False
+        self.recorder.add(label, time.perf_counter() - t0, ok)
+        return data
+
+    def pause(self):
+        if self.think:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think)
+
+
+# ---- flussi (stesso ordine di chiamate di script.js) ----
+
+def flow_page_load(c):
+    c.call("bootstrap", "GET", "/api/bootstrap")
+
+
+def flow_stats(c):
+    comp, season = c.rng.choice(c.catalog["pairs"])
+    data = c.call("teams", "GET", "/api/teams", {"competition": comp, "season": season})
+    teams = (data or {}).get("teams") or c.catalog["teams"][(comp, season)]
+    for team in c.rng.sample(teams, min(len(teams), c.rng.randint(1, 3))):
+        c.pause()
+        c.call("stats", "GET", "/api/stats", {"team": team, "competition": comp, "season": season})
+
+
+def flow_standings(c):
+    comp, season = c.rng.choice(c.catalog["pairs"])
+    day = c.rng.choice(c.catalog["dates"][(comp, season)])
+    c.call("standings", "GET", "/api/standings", {"competition": comp, "season": season, "date": day})
+
+
+def flow_predict(c):
+    data = c.call("matches", "GET", "/api/matches")
+    upcoming = (data or {}).get("matches") or c.catalog["upcoming"]
+    if not upcoming:
+        return
+    for m in c.rng.sample(upcoming, min(len(upcoming), c.rng.randint(1, 4))):
+        c.pause()
+        c.call("predict", "POST", "/api/predict", body={"match_id": m["id"], "model": "rules_v1"})
+
+
+FLOWS = {
+    "stats": flow_stats,
+    "standings": flow_standings,
+    "predict": flow_predict,
+}
+
+
+def build_catalog(base_url):
+    """Coppie, squadre, date e partite in programma lette dal server stesso."""
+    _, raw = http("GET", f"{base_url}/api/matches")
+    upcoming = json.loads(raw)["matches"]
+    teams = {}
+    dates = {}
+    for m in upcoming:
+        key = (m["competition"], m["season"])
+        teams.setdefault(key, set()).update((m["home_team"], m["away_team"]))
+        if m.get("date"):
+            dates.setdefault(key, set()).add(m["date"])
+
+    pairs = sorted(teams)
+    for key in pairs:
+        teams[key] = sorted(teams[key])
+        dates[key] = sorted(dates.get(key) or {f"{key[1] + 1}-06-30"})
+    if not pairs:
+        raise RuntimeError("nessuna partita in programma: serve un DB con partite UPCOMING")
+    return {"pairs": pairs, "teams": teams, "dates": dates, "upcoming": upcoming}
+
+
+def run(base_url, users, ramp_up, duration, weights, think, seed):
+    catalog = build_catalog(base_url)
+    recorder = Recorder()
+    names = list(weights)
+    probs = [weights[n] for n in names]
+    start = time.monotonic()
+    stop_at = start + ramp_up + duration
+
+    def user(idx):
+        rng = random.Random(seed * 1000 + idx)
+        time.sleep(ramp_up * idx / max(1, users))
+        c = Client(base_url, recorder, catalog, rng, think)
+        flow_page_load(c)
+        while time.monotonic() < stop_at:
+            c.pause()
+            FLOWS[rng.choices(names, probs)[0]](c)
+            recorder.session_done()
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.monotonic() - start
+
+
+def report(recorder, wall):
+    rows = []
+    total = sum(len(v) for v in recorder.samples.values())
+    total_err = sum(recorder.errors.values())
+    for label in sorted(recorder.samples):
+        lat = sorted(recorder.samples[label])
+        err = recorder.errors.get(label, 0)
+        rows.append({
+            "endpoint": label,
+            "requests": len(lat),
+            "rps": len(lat) / wall if wall else 0.0,
+            "p50_ms": percentile(lat, 50) * 1000,
+            "p95_ms": percentile(lat, 95) * 1000,
+            "p99_ms": percentile(lat, 99) * 1000,
+            "error_rate": err / len(lat) if lat else 0.0,
+        })
+
+    print(f"{'endpoint':12} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>7}")
+    for r in rows:
+        print(f"{r['endpoint']:12} {r['requests']:7d} {r['rps']:8.1f} {r['p50_ms']:8.1f} "
+              f"{r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['error_rate'] * 100:7.2f}")
+    print(f"{'totale':12} {total:7d} {total / wall if wall else 0.0:8.1f} "
+          f"{'':>8} {'':>8} {'':>8} {(total_err / total * 100) if total else 0.0:7.2f}")
+    print(f"sessioni: {recorder.sessions} in {wall:.1f}s")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test sui flussi del frontend")
+    parser.add_argument("--base-url", help="server gia' avviato (altrimenti gunicorn locale su dati sintetici)")
+    parser.add_argument("--database-url", help="DB per il gunicorn locale (default: SQLite sintetico temporaneo)")
+    parser.add_argument("--workers", type=int, default=2, help="worker gunicorn (server locale)")
+    parser.add_argument("--threads", type=int, default=1, help="thread per worker gunicorn (server locale)")
+    parser.add_argument("--port", type=int, default=8912)
+    parser.add_argument("--users", type=int, default=20, help="utenti virtuali concorrenti")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="secondi per avviare tutti gli utenti")
+    parser.add_argument("--duration", type=float, default=60.0, help="secondi a pieno carico dopo il ramp-up")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help=f"pesi dei flussi (default {DEFAULT_WEIGHTS})")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa media tra le azioni, in secondi")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="scrive anche il report JSON in questo file")
+    args = parser.parse_args()
+
+    weights = parse_weights(args.weights)
+
+    proc = None
+    base_url = args.base_url
+    if not base_url:
+        env = dict(os.environ)
+        if args.database_url:
+            env["DATABASE_URL"] = args.database_url
+        else:
+            tmpdir = tempfile.mkdtemp(prefix="loadtest_")
+            env["DATABASE_URL"] = f"sqlite:///{tmpdir}/loadtest.db"
+            subprocess.run([sys.executable, "seed_synthetic.py"], cwd=BACKEND_DIR, env=env, check=True)
+        base_url = f"http://127.0.0.1:{args.port}"
+        proc = start_server([
+            sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads", str(args.threads),
+            "-b", f"127.0.0.1:{args.port}", "wsgi:app",
+        ], env)
+
+    try:
+        wait_ready(base_url)
+        recorder, wall = run(base_url, args.users, args.ramp_up, args.duration, weights, args.think, args.seed)
+    finally:
+        if proc is not None:
+            stop_server(proc)
+
+    rows = report(recorder, wall)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "wall_s": wall, "sessions": recorder.sessions, "endpoints": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
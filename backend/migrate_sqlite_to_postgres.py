@@ -1,10 +1,28 @@
+"""
+Migrazione SQLite -> Postgres in streaming.
+
+- legge a chunk (keyset sulla primary key), memoria costante
+- carica con COPY (psycopg2), fallback a INSERT batch se COPY non disponibile
+- copia tutte le colonne di tutte le tabelle del modello
+- verifica conteggi e checksum per tabella
+- riprendibile: ogni chunk e' una transazione, --resume riparte dall'ultima PK copiata
+
+Uso:
+    DATABASE_URL=postgresql://... python migrate_sqlite_to_postgres.py [--resume] [--chunk-size 5000]
+"""
+
+import argparse
+import hashlib
+import io
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+
+from sqlalchemy import create_engine, func, inspect, select, Integer, BigInteger
 
-from app import Base, Match, MatchContext
+from app.db import Base
+import app.models  # noqa: F401  (registra le tabelle su Base.metadata)
 
-SQLITE_URL = "sqlite:///calcio.db"
+SQLITE_URL = os.getenv("SQLITE_URL", "sqlite:///calcio.db")
 
 POSTGRES_URL = os.getenv("DATABASE_URL")
 if not POSTGRES_URL:
@@ -13,65 +31,217 @@ if not POSTGRES_URL:
 if POSTGRES_URL.startswith("postgres://"):
     POSTGRES_URL = POSTGRES_URL.replace("postgres://", "postgresql://", 1)
 
-sqlite_engine = create_engine(SQLITE_URL, connect_args={"check_same_thread": False})
-pg_engine = create_engine(POSTGRES_URL)
+DEFAULT_CHUNK = 5000
+
+
+def _pk(table):
+    cols = list(table.primary_key.columns)
+    if len(cols) != 1:
+        raise RuntimeError(f"{table.name}: serve una primary key a colonna singola")
+    return cols[0]
+
+
+def _int_pk(table) -> bool:
+    return isinstance(_pk(table).type, (Integer, BigInteger))
+
+
+def source_columns(src_engine, table):
+    """
+    Colonne del modello presenti nel SQLite sorgente (un calcio.db vecchio puo'
+    non avere le colonne aggiunte dopo). None se la tabella non esiste.
+    """
+    insp = inspect(src_engine)
+    if not insp.has_table(table.name):
+        return None
+    existing = {c["name"] for c in insp.get_columns(table.name)}
+    return [c for c in table.columns if c.name in existing]
+
+
+def _norm(v) -> str:
+    if v is None:
+        return "\\N"
+    if isinstance(v, float):
+        return repr(v)
+    return str(v)
+
+
+def _row_digest(row) -> int:
+    h = hashlib.md5("\x1f".join(_norm(v) for v in row).encode("utf-8")).digest()
+    return int.from_bytes(h, "big")
+
+
+def table_checksum(conn, columns, chunk_size: int):
+    """
+    (righe, checksum) indipendente dall'ordinamento: somma mod 2^128 degli md5 di riga.
+    Cosi' non dipende dalla collation dei due database.
+    """
+    total = 0
+    count = 0
+    result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(*columns)
+    )
+    for part in result.partitions(chunk_size):
+        for row in part:
+            total = (total + _row_digest(row)) % (1 << 128)
+            count += 1
+    return count, f"{total:032x}"
+
+
+def _iter_chunks(src_conn, table, columns, chunk_size: int, after=None):
+    """Chunk ordinati per PK (keyset pagination: niente OFFSET)."""
+    pk = _pk(table)
+    last = after
+    while True:
+        q = select(*columns).order_by(pk.asc()).limit(chunk_size)
+        if last is not None:
+            q = q.where(pk > last)
+        rows = src_conn.execute(q).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]._mapping[pk.name]
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_field(v) -> str:
+    """Campo COPY in formato text: None -> \\N (NULL), "" resta stringa vuota."""
+    if v is None:
+        return "\\N"
+    if isinstance(v, float):
+        return repr(v)
+    return str(v).translate(_COPY_ESCAPES)
+
+
+def copy_text(rows) -> str:
+    """Righe in formato COPY text (tab come separatore, una riga per record)."""
+    return "".join("\t".join(_copy_field(v) for v in r) + "\n" for r in rows)
+
+
+def _copy_chunk(dst_conn, table, columns, rows) -> None:
+    # formato text e non csv: in csv il writer non distingue NULL da "" (QUOTE_NONNUMERIC
+    # scrive None come "" quotato, che COPY legge come stringa vuota e rifiuta sugli interi)
+    buf = io.StringIO(copy_text(rows))
+
+    cols = ", ".join(c.name for c in columns)
+    raw = dst_conn.connection.dbapi_connection
+    with raw.cursor() as cur:
+        cur.copy_expert(f"COPY {table.name} ({cols}) FROM STDIN", buf)
+
+
+def _insert_chunk(dst_conn, table, rows) -> None:
+    dst_conn.execute(table.insert(), [dict(r._mapping) for r in rows])
+
+
+def _reset_sequence(dst_conn, table) -> None:
+    pk = _pk(table)
+    if dst_conn.dialect.name != "postgresql" or not pk.autoincrement or not _int_pk(table):
+        return
+    dst_conn.exec_driver_sql(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk.name}'), "
+        f"COALESCE((SELECT MAX({pk.name}) FROM {table.name}), 1))"
+    )
+
+
+def migrate_table(src_engine, dst_engine, table, chunk_size: int, resume: bool, use_copy: bool) -> dict:
+    t0 = time.perf_counter()
+    pk = _pk(table)
+
+    columns = source_columns(src_engine, table)
+    if columns is None:
+        return {"table": table.name, "copied": 0, "chunks": 0, "skipped": "tabella assente nel sorgente"}
+
+    after = None
+    if resume:
+        with dst_engine.begin() as dst:
+            if _int_pk(table):
+                after = dst.execute(select(func.max(pk))).scalar()
+            else:
+                # PK testuale: l'ordinamento dipende dalla collation, si ricopia per intero
+                dst.execute(table.delete())
+
+    copied = 0
+    chunks = 0
+    with src_engine.connect() as src:
+        for rows in _iter_chunks(src, table, columns, chunk_size, after=after):
+            # un chunk = una transazione: se si interrompe, --resume riparte da MAX(pk)
+            with dst_engine.begin() as dst:
+                if use_copy:
+                    _copy_chunk(dst, table, columns, rows)
+                else:
+                    _insert_chunk(dst, table, rows)
+            copied += len(rows)
+            chunks += 1
+            print(f"  {table.name}: chunk {chunks} ({copied} righe)")
+
+    with dst_engine.begin() as dst:
+        _reset_sequence(dst, table)
+
+    return {
+        "table": table.name,
+        "copied": copied,
+        "chunks": chunks,
+        "resumed_after": after,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def verify_table(src_engine, dst_engine, table, chunk_size: int) -> dict:
+    columns = source_columns(src_engine, table)
+    if columns is None:
+        return {"table": table.name, "ok": True, "skipped": "tabella assente nel sorgente"}
+
+    with src_engine.connect() as src:
+        src_count, src_sum = table_checksum(src, columns, chunk_size)
+    with dst_engine.connect() as dst:
+        dst_count, dst_sum = table_checksum(dst, columns, chunk_size)
+    return {
+        "table": table.name,
+        "source_rows": src_count,
+        "target_rows": dst_count,
+        "checksum_ok": src_sum == dst_sum,
+        "ok": src_count == dst_count and src_sum == dst_sum,
+    }
 
-SQLiteSession = sessionmaker(bind=sqlite_engine)
-PGSession = sessionmaker(bind=pg_engine)
 
 def main():
+    parser = argparse.ArgumentParser(description="Migrazione SQLite -> Postgres a chunk")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    parser.add_argument("--resume", action="store_true", help="non svuota le tabelle, riparte dall'ultima PK")
+    parser.add_argument("--no-copy", action="store_true", help="forza INSERT batch al posto di COPY")
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args()
+
+    sqlite_engine = create_engine(SQLITE_URL, connect_args={"check_same_thread": False})
+    pg_engine = create_engine(POSTGRES_URL)
+
     Base.metadata.create_all(bind=pg_engine)
 
-    s_sqlite = SQLiteSession()
-    s_pg = PGSession()
-
-    try:
-        # Pulisci Postgres (se ripeti la migrazione)
-        s_pg.query(MatchContext).delete()
-        s_pg.query(Match).delete()
-        s_pg.commit()
-
-        matches = s_sqlite.query(Match).all()
-        print(f"SQLite matches: {len(matches)}")
-
-        s_pg.bulk_save_objects([
-            Match(
-                id=m.id,
-                competition=m.competition,
-                home_team=m.home_team,
-                away_team=m.away_team,
-                date=m.date,
-                status=m.status,
-                home_goals=m.home_goals,
-                away_goals=m.away_goals,
-                season=m.season,
-            ) for m in matches
-        ])
-        s_pg.commit()
-        print("✅ Matches migrati")
-
-        ctx = s_sqlite.query(MatchContext).all()
-        print(f"SQLite match_context: {len(ctx)}")
-
-        s_pg.bulk_save_objects([
-            MatchContext(
-                match_id=c.match_id,
-                competition=c.competition,
-                season=c.season,
-                date=c.date,
-                home_team=c.home_team,
-                away_team=c.away_team,
-                home_rank_before=c.home_rank_before,
-                away_rank_before=c.away_rank_before,
-                total_teams=c.total_teams,
-            ) for c in ctx
-        ])
-        s_pg.commit()
-        print("✅ MatchContext migrato")
-
-    finally:
-        s_sqlite.close()
-        s_pg.close()
+    use_copy = (not args.no_copy) and pg_engine.dialect.name == "postgresql" and pg_engine.dialect.driver == "psycopg2"
+    print(f"Caricamento via {'COPY' if use_copy else 'INSERT batch'}, chunk={args.chunk_size}")
+
+    tables = Base.metadata.sorted_tables
+
+    if not args.verify_only:
+        if not args.resume:
+            with pg_engine.begin() as dst:
+                for table in reversed(tables):
+                    dst.execute(table.delete())
+
+        for table in tables:
+            summary = migrate_table(sqlite_engine, pg_engine, table, args.chunk_size, args.resume, use_copy)
+            print(f"✅ {summary}")
+
+    failed = False
+    for table in tables:
+        check = verify_table(sqlite_engine, pg_engine, table, args.chunk_size)
+        failed = failed or not check["ok"]
+        print(f"{'✅' if check['ok'] else '❌'} verifica {check}")
+
+    if failed:
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
     main()
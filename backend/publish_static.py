@@ -0,0 +1,35 @@
+"""
+Pubblica i JSON statici delle stagioni attive (vedi app/static_json.py).
+
+    python publish_static.py --out ../frontend/data
+    python publish_static.py --out ../frontend/data --pair "Serie A:2025"
+
+Riscrive solo i file il cui contenuto e' cambiato dall'ultima pubblicazione.
+"""
+
+import argparse
+import json
+
+from app.static_json import STATIC_JSON_DIR, publish_static
+
+
+def parse_pair(raw):
+    competition, _, season = raw.rpartition(":")
+    if not competition or not season.isdigit():
+        raise argparse.ArgumentTypeError(f"coppia non valida: {raw} (atteso Competizione:stagione)")
+    return competition, int(season)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON statici per CDN")
+    parser.add_argument("--out", default=STATIC_JSON_DIR or None, help="cartella di destinazione (default STATIC_JSON_DIR)")
+    parser.add_argument("--pair", action="append", type=parse_pair, help="solo questa coppia (ripetibile), es. 'Serie A:2025'")
+    args = parser.parse_args()
+
+    if not args.out:
+        parser.error("serve --out o STATIC_JSON_DIR")
+    print(json.dumps(publish_static(args.out, args.pair), indent=2))
+
+
+if __name__ == "__main__":
+    main()
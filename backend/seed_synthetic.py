@@ -0,0 +1,126 @@
+"""
+Dataset sintetico per benchmark e load test (mai contro il DB di produzione).
+
+Genera N competizioni x M stagioni di calendari andata/ritorno con risultati
+casuali; nell'ultima stagione le giornate dopo --played-rounds restano UPCOMING.
+Poi ricostruisce match_context ed Elo come dopo un import vero.
+
+    DATABASE_URL=sqlite:///bench.db python seed_synthetic.py --competitions 4 --seasons 3
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from app.audit import run_audit
+from app.context import rebuild_pairs
+from app.db import SessionLocal, init_db
+from app.models import Match, MatchContext, MatchRating, TeamRating, derived_columns, pair_key_for
+from app.ratings import update_ratings
+from app.snapshots import publish_snapshots
+from app.versioning import bump_data_version
+
+FIRST_SEASON = 2020
+
+
+def round_robin(teams):
+    """Calendario andata e ritorno (metodo del cerchio): lista di giornate [(home, away)]."""
+    teams = list(teams)
+    if len(teams) % 2:
+        teams.append(None)
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            a, b = teams[i], teams[n - 1 - i]
+            if a is not None and b is not None:
+                pairs.append((a, b) if r % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    return rounds + [[(b, a) for a, b in rnd] for rnd in rounds]
+
+
+def seed(competitions=4, seasons=3, teams_per_competition=20, played_rounds=20, rng_seed=42, force=False):
+    init_db()
+    rng = random.Random(rng_seed)
+    last_season = FIRST_SEASON + seasons - 1
+
+    session = SessionLocal()
+    try:
+        real = session.query(Match).filter(Match.external_source != "synthetic").count()
+        if real and not force:
+            raise RuntimeError(f"Il DB contiene {real} partite reali: usa un DATABASE_URL dedicato (o --force)")
+
+        for model in (MatchContext, MatchRating, TeamRating, Match):
+            session.query(model).delete()
+        session.commit()
+
+        ext_id = 1
+        pairs = []
+        for c in range(competitions):
+            comp = f"Synthetic League {c + 1}"
+            teams = [f"{comp} FC {t + 1:02d}" for t in range(teams_per_competition)]
+            strength = {t: rng.uniform(0.6, 1.8) for t in teams}
+
+            for season in range(FIRST_SEASON, last_season + 1):
+                pairs.append((comp, season))
+                start = date(season, 8, 17)
+                rows = []
+                for rnd_idx, rnd in enumerate(round_robin(teams)):
+                    day = start + timedelta(days=7 * rnd_idx)
+                    finished = season < last_season or rnd_idx < played_rounds
+                    for home, away in rnd:
+                        hg = ag = None
+                        if finished:
+                            hg = min(7, int(rng.expovariate(1 / (strength[home] * 1.1))))
+                            ag = min(7, int(rng.expovariate(1 / strength[away])))
+                        status = "FINISHED" if finished else "UPCOMING"
+                        rows.append({
+                            "external_source": "synthetic",
+                            "external_id": ext_id,
+                            "competition": comp,
+                            "home_team": home,
+                            "away_team": away,
+                            "utc_date": f"{day.isoformat()}T15:00:00Z",
+                            "date": day.isoformat(),
+                            "status": status,
+                            "home_goals": hg,
+                            "away_goals": ag,
+                            "season": season,
+                            "pair_key": pair_key_for(home, away),
+                            **derived_columns(status, hg, ag),
+                        })
+                        ext_id += 1
+                session.execute(insert(Match), rows)
+            session.commit()
+
+        rebuild_pairs(session, pairs)
+        update_ratings(session)
+        version = bump_data_version(session)
+        session.commit()
+    finally:
+        session.close()
+    publish_snapshots(version)
+    run_audit(full=True)
+    return ext_id - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popola il DB con dati sintetici")
+    parser.add_argument("--competitions", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--played-rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="svuota anche un DB con partite reali")
+    args = parser.parse_args()
+
+    n = seed(args.competitions, args.seasons, args.teams, args.played_rounds, args.seed, args.force)
+    print(f"✅ {n} partite sintetiche generate")
+
+
+if __name__ == "__main__":
+    main()
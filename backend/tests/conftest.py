@@ -0,0 +1,65 @@
+# backend/tests/conftest.py
+"""
+I test girano su un SQLite temporaneo popolato da seed_synthetic
+(2 competizioni x 2 stagioni da 10 squadre, ultima stagione giocata a meta').
+
+Le variabili d'ambiente vanno impostate prima di importare app.*:
+db.py, snapshots.py, versioning.py e cache.py le leggono all'import.
+
+    cd backend && python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+TMP_DIR = Path(tempfile.mkdtemp(prefix="calcio-tests-"))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR / 'test.db'}"
+os.environ["SNAPSHOT_DIR"] = str(TMP_DIR / "snapshots")
+os.environ["RAW_ARCHIVE_DIR"] = str(TMP_DIR / "raw_archive")
+os.environ["DATA_VERSION_TTL"] = "0"
+os.environ["CACHE_BACKEND"] = "memory"
+for name in ("CACHE_URL", "SINGLEFLIGHT_LOCK_DIR", "STATIC_JSON_DIR", "ADMIN_TOKEN"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+import pytest  # noqa: E402
+
+COMPETITIONS = 2
+SEASONS = 2
+TEAMS = 10
+PLAYED_ROUNDS = 9
+
+
+@pytest.fixture
+def db():
+    """DB sintetico appena rigenerato e cache di processo vuote."""
+    from seed_synthetic import FIRST_SEASON, seed
+
+    from app import cache, singleflight
+
+    seed(COMPETITIONS, SEASONS, TEAMS, PLAYED_ROUNDS)
+    cache._cache = None
+    singleflight._singleflight = None
+    yield {
+        "competitions": [f"Synthetic League {c + 1}" for c in range(COMPETITIONS)],
+        "seasons": list(range(FIRST_SEASON, FIRST_SEASON + SEASONS)),
+        "last_season": FIRST_SEASON + SEASONS - 1,
+    }
+    cache._cache = None
+    singleflight._singleflight = None
+
+
+@pytest.fixture
+def session(db):
+    from app.db import SessionLocal
+
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
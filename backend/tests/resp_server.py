@@ -0,0 +1,89 @@
+# backend/tests/resp_server.py
+"""
+Server RESP minimo in un thread, al posto di Redis nei test di RedisBackend.
+Comandi: GET, SET (con PX), DEL, DBSIZE, SELECT, AUTH, PING.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError(f"atteso un array RESP: {line!r}")
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                args = self._command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            cmd = args[0].upper()
+            server.commands.append(cmd.decode())
+            with server.lock:
+                if cmd == b"GET":
+                    item = server.data.get(args[1])
+                    if item is not None and item[1] is not None and item[1] < time.time():
+                        del server.data[args[1]]
+                        item = None
+                    reply = self._bulk(None if item is None else item[0])
+                elif cmd == b"SET":
+                    expires = None
+                    if len(args) >= 5 and args[3].upper() == b"PX":
+                        expires = time.time() + int(args[4]) / 1000
+                    server.data[args[1]] = (args[2], expires)
+                    reply = b"+OK\r\n"
+                elif cmd == b"DEL":
+                    reply = b":%d\r\n" % sum(server.data.pop(k, None) is not None for k in args[1:])
+                elif cmd == b"DBSIZE":
+                    reply = b":%d\r\n" % len(server.data)
+                elif cmd in (b"SELECT", b"AUTH"):
+                    reply = b"+OK\r\n"
+                elif cmd == b"PING":
+                    reply = b"+PONG\r\n"
+                else:
+                    reply = b"-ERR unknown command '%s'\r\n" % cmd
+            self.wfile.write(reply)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data = {}
+        self.commands = []
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://{host}:{port}/1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,64 @@
+# backend/tests/test_admin.py
+import pytest
+
+HEADERS = {"X-Admin-Token": "test"}
+
+
+@pytest.fixture
+def warmups(monkeypatch):
+    """Richieste di warm-up delle route admin, senza thread di sfondo."""
+    from app.routes import admin
+
+    calls = []
+
+    def fake_start(pairs=None):
+        calls.append(pairs)
+        return {"started": True}
+
+    def no_sync_warm(*args, **kwargs):
+        raise AssertionError("le route admin non aspettano il warm-up")
+
+    monkeypatch.setattr(admin, "start_warmup", fake_start)
+    monkeypatch.setattr(admin, "warm_cache", no_sync_warm)
+    return calls
+
+
+@pytest.fixture
+def client(db, monkeypatch, warmups):
+    from app import create_app
+
+    monkeypatch.setenv("ADMIN_TOKEN", "test")
+    return create_app().test_client()
+
+
+@pytest.mark.parametrize("payload", [
+    {"workers": "abc"}, {"workers": 0}, {"workers": 2.5}, {"workers": True}, {"limit": "x"}, {"limit": 0},
+])
+def test_rebuild_all_rejects_bad_numbers(client, payload):
+    resp = client.post("/api/admin/context/rebuild-all", json=payload, headers=HEADERS)
+    assert resp.status_code == 400
+
+
+def test_rebuild_all_clamps_workers(client, monkeypatch):
+    from app.routes import admin
+
+    seen = {}
+
+    def fake_rebuild(only_finished=True, limit=None, workers=1):
+        seen["workers"] = workers
+        return {"ok": True, "pairs": 0, "results": []}
+
+    monkeypatch.setattr(admin, "_rebuild_context_all_internal", fake_rebuild)
+    monkeypatch.setattr(admin, "default_workers", lambda: 2)
+    resp = client.post("/api/admin/context/rebuild-all", json={"workers": 64}, headers=HEADERS)
+    assert resp.status_code == 200
+    assert seen["workers"] == 2
+
+
+def test_rebuild_starts_warmup_in_background(client, db, warmups):
+    competition, season = db["competitions"][0], db["last_season"]
+    resp = client.post("/api/admin/context/rebuild", json={"competition": competition, "season": season},
+                       headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.get_json()["warmup"] == {"started": True}
+    assert warmups == [[(competition, season)]]
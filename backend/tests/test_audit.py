@@ -0,0 +1,118 @@
+# backend/tests/test_audit.py
+import subprocess
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from app import audit
+from app.models import AuditFinding, Match
+
+
+@pytest.fixture
+def clock(db, monkeypatch):
+    """Orologio dell'audit controllato: marker e updated_at confrontabili senza sleep."""
+    now = {"value": "2100-01-01T00:00:00Z"}
+    monkeypatch.setattr(audit, "utcnow_iso", lambda: now["value"])
+    audit.run_audit()  # assorbe le righe scritte dal seed
+    return now
+
+
+def _touch(session, match_id, stamp, **values):
+    session.execute(update(Match).where(Match.id == match_id).values(updated_at=stamp, **values))
+    session.commit()
+
+
+def _findings(session, kind):
+    return sorted(session.execute(
+        select(AuditFinding.match_id).where(AuditFinding.kind == kind)
+    ).scalars())
+
+
+def test_incremental_run_checks_only_changed_rows(session, clock):
+    clock["value"] = "2100-01-01T00:00:10Z"
+    quiet = audit.run_audit()
+    assert quiet["mode"] == "incremental"
+    assert (quiet["matches_checked"], quiet["contexts_checked"], quiet["pairs_checked"]) == (0, 0, 0)
+
+    match_id = session.execute(select(Match.id).where(Match.status == "FINISHED").limit(1)).scalar()
+    _touch(session, match_id, "2100-01-01T00:00:15Z", home_goals=None)
+    clock["value"] = "2100-01-01T00:00:20Z"
+    out = audit.run_audit()
+    assert (out["matches_checked"], out["pairs_checked"]) == (1, 1)
+    assert _findings(session, "finished_missing_score") == [match_id]
+
+    # il marker avanza: il giro dopo non ricontrolla la stessa riga
+    clock["value"] = "2100-01-01T00:00:30Z"
+    assert audit.run_audit()["matches_checked"] == 0
+    assert _findings(session, "finished_missing_score") == [match_id]
+
+    _touch(session, match_id, "2100-01-01T00:00:35Z", home_goals=1)
+    clock["value"] = "2100-01-01T00:00:40Z"
+    audit.run_audit()
+    assert _findings(session, "finished_missing_score") == []
+
+
+def test_duplicate_finding_cleared_when_duplicate_deleted(session, clock):
+    original = session.execute(select(Match).limit(1)).scalar_one()
+    values = {c.name: getattr(original, c.name) for c in Match.__table__.columns if c.name != "id"}
+    dup_id = session.execute(
+        insert(Match).values(**{**values, "updated_at": "2100-01-01T00:00:05Z"}).returning(Match.id)
+    ).scalar()
+    session.commit()
+
+    clock["value"] = "2100-01-01T00:00:10Z"
+    audit.run_audit()
+    assert _findings(session, "duplicate_external") == sorted([original.id, dup_id])
+
+    # la riga che resta non cambia: niente updated_at nuovo
+    session.execute(delete(Match).where(Match.id == dup_id))
+    session.commit()
+    clock["value"] = "2100-01-01T00:00:20Z"
+    out = audit.run_audit()
+    assert out["matches_checked"] == 0
+    assert out["duplicates_rechecked"] == 1
+    assert _findings(session, "duplicate_external") == []
+
+
+def test_full_run_resets_findings(session, clock):
+    match_id = session.execute(select(Match.id).where(Match.status == "FINISHED").limit(1)).scalar()
+    _touch(session, match_id, "2100-01-01T00:00:05Z", away_goals=None)
+    out = audit.run_audit(full=True)
+    assert out["mode"] == "full"
+    assert out["matches_checked"] == len(session.execute(select(Match.id)).all())
+    assert _findings(session, "finished_missing_score") == [match_id]
+
+
+def test_admin_import_runs_audit_once(db, monkeypatch):
+    from app import create_app
+    from app.routes import admin
+    from app.versioning import current_data_version
+
+    calls = {"script": [], "audit": 0, "publish": 0}
+
+    def fake_run(cmd, **kwargs):
+        calls["script"].append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    def counting_audit(*args, **kwargs):
+        calls["audit"] += 1
+        return audit.run_audit(*args, **kwargs)
+
+    monkeypatch.setenv("ADMIN_TOKEN", "test")
+    monkeypatch.setattr(admin.subprocess, "run", fake_run)
+    monkeypatch.setattr(admin, "run_audit", counting_audit)
+    monkeypatch.setattr(admin, "start_warmup", lambda: {"skipped": "test"})
+
+    def counting_publish(*args, **kwargs):
+        calls["publish"] += 1
+
+    monkeypatch.setattr(admin, "publish_snapshots", counting_publish)
+    before = current_data_version(max_age=0)
+
+    resp = create_app().test_client().post("/api/admin/import", headers={"X-Admin-Token": "test"})
+    assert resp.status_code == 200
+    assert calls["script"][0][-1] == "--no-audit"
+    assert calls["audit"] == 1
+    # versione e snapshot sono dello script: la route non rifa' bump ne' publish
+    assert resp.get_json()["data_version"] == before
+    assert calls["publish"] == 0
@@ -0,0 +1,53 @@
+# backend/tests/test_bootstrap.py
+import pytest
+
+
+@pytest.fixture
+def client(db):
+    from app import create_app
+
+    return create_app().test_client()
+
+
+def test_bootstrap_without_filters_skips_predictions(client, monkeypatch):
+    from app import bootstrap
+
+    def no_predictions(*args, **kwargs):
+        raise AssertionError("nessuna previsione senza competition + season")
+
+    monkeypatch.setattr(bootstrap, "predict_with_session", no_predictions)
+    data = client.get("/api/bootstrap").get_json()
+    assert data["matches"] and data["teams"]
+    assert all("probabilities" not in m for m in data["matches"])
+    assert data["standings"] is None and data["standings_date"] is None
+    assert data["matches"] == client.get("/api/matches").get_json()["matches"]
+
+
+def test_bootstrap_without_filters_attaches_cached_predictions(client):
+    from app.cache import get_cache
+
+    first = client.get("/api/bootstrap").get_json()["matches"][0]
+    pred = client.post("/api/predict", json={"match_id": first["id"]}).get_json()
+    misses = get_cache().stats()["namespaces"]["predict"]["misses"]
+
+    matches = client.get("/api/bootstrap").get_json()["matches"]
+    # solo la partita gia' prevista, e le letture a vuoto non contano come miss
+    assert [m["id"] for m in matches if "probabilities" in m] == [first["id"]]
+    assert matches[0]["probabilities"] == pred["probabilities"]
+    assert get_cache().stats()["namespaces"]["predict"]["misses"] == misses
+
+
+def test_bootstrap_for_pair_has_predictions_and_standings(client, db):
+    competition, season = db["competitions"][0], db["last_season"]
+    data = client.get(f"/api/bootstrap?competition={competition}&season={season}").get_json()
+    assert data["matches"]
+    assert all(m["competition"] == competition and m["season"] == season for m in data["matches"])
+
+    first = data["matches"][0]
+    pred = client.post("/api/predict", json={"match_id": first["id"]}).get_json()
+    assert first["probabilities"] == pred["probabilities"]
+
+    standings = client.get(
+        f"/api/standings?competition={competition}&season={season}&date={data['standings_date']}"
+    ).get_json()
+    assert data["standings"] == standings["standings"]
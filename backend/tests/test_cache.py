@@ -0,0 +1,126 @@
+# backend/tests/test_cache.py
+import threading
+
+import pytest
+
+from app.cache import MISS, Cache, FileBackend, MemoryBackend, RedisBackend
+from app.versioning import TAG_ALL, bump_data_version, pair_tag
+from resp_server import RespServer
+
+SERIE = pair_tag("Synthetic League 1", 2021)
+OTHER = pair_tag("Synthetic League 2", 2021)
+
+
+@pytest.fixture
+def resp_server():
+    server = RespServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(params=["memory", "file", "redis"])
+def cache(request, db, tmp_path):
+    if request.param == "memory":
+        backend = MemoryBackend(64)
+    elif request.param == "file":
+        backend = FileBackend(tmp_path / "cache")
+    else:
+        backend = RedisBackend(request.getfixturevalue("resp_server").url)
+    return Cache(backend, ttl=60)
+
+
+def test_round_trip_and_tag_invalidation(cache):
+    cache.set("stats", ["a"], [SERIE], {"x": 1})
+    cache.set("stats", ["b"], [OTHER], {"x": 2})
+    cache.set("matches", [], [TAG_ALL], [1, 2])
+    assert cache.get("stats", ["a"]) == {"x": 1}
+
+    # import di una coppia: invalida lei e TAG_ALL, non le altre coppie
+    bump_data_version(tags=[SERIE])
+    assert cache.get("stats", ["a"]) is MISS
+    assert cache.get("matches", []) is MISS
+    assert cache.get("stats", ["b"]) == {"x": 2}
+
+    # bump senza tag: invalida tutto
+    bump_data_version()
+    assert cache.get("stats", ["b"]) is MISS
+    assert cache.stats()["namespaces"]["stats"]["stale"] == 2
+
+
+def test_redis_backend_speaks_resp(db, resp_server):
+    backend = RedisBackend(resp_server.url)
+    cache = Cache(backend, ttl=60)
+    cache.set("predict", [1, None, True], [SERIE], {"ok": True})
+    assert cache.get("predict", [1, None, True]) == {"ok": True}
+    assert backend.size() == 1
+    backend.delete(Cache.make_key("predict", [1, None, True]))
+    assert cache.get("predict", [1, None, True]) is MISS
+    assert "SELECT" in resp_server.commands and "SET" in resp_server.commands
+
+
+def test_redis_backend_error_is_a_miss(db, resp_server):
+    cache = Cache(RedisBackend(resp_server.url), ttl=60)
+    resp_server.stop()
+    assert cache.get("stats", ["a"]) is MISS
+    cache.set("stats", ["a"], [SERIE], {"x": 1})  # nessuna eccezione verso la route
+    assert cache.stats()["namespaces"]["stats"]["errors"] == 2
+
+
+def test_bump_during_compute_does_not_store_fresh_entry(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            # import che finisce mentre il calcolo (sui dati vecchi) e' in corso
+            bump_data_version(tags=[SERIE])
+            return "old"
+        return "new"
+
+    assert cache.get_or_compute("stats", ["a"], [SERIE], compute) == ("old", False)
+    # la voce porta le versioni di prima del calcolo: gia' stale, si ricalcola
+    assert cache.get("stats", ["a"]) is MISS
+    assert cache.get_or_compute("stats", ["a"], [SERIE], compute) == ("new", False)
+    assert cache.get_or_compute("stats", ["a"], [SERIE], compute) == ("new", True)
+
+
+def test_set_with_versions_read_before_compute(cache):
+    from app.versioning import tag_versions
+
+    versions = tag_versions()
+    bump_data_version(tags=[SERIE])
+    cache.set("stats", ["a"], [SERIE], "old", versions=versions)
+    cache.set("stats", ["b"], [OTHER], "other", versions=versions)
+    assert cache.get("stats", ["a"]) is MISS
+    assert cache.get("stats", ["b"]) == "other"
+
+
+def test_concurrent_bump_never_leaves_stale_value(db):
+    """Calcoli concorrenti sui dati vecchi, import nel mezzo: poi nessuna voce vecchia servita."""
+    cache = Cache(MemoryBackend(64), ttl=60)
+    generation = {"value": 0}
+    reached = threading.Barrier(5)
+    release = threading.Event()
+
+    def compute():
+        snapshot = generation["value"]
+        reached.wait()
+        release.wait()
+        return snapshot
+
+    threads = [
+        threading.Thread(target=cache.get_or_compute, args=("stats", [i], [SERIE], compute))
+        for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    reached.wait()  # tutti hanno letto i dati vecchi
+    generation["value"] = 1
+    bump_data_version(tags=[SERIE])
+    release.set()
+    for t in threads:
+        t.join()
+
+    for i in range(4):
+        value, _hit = cache.get_or_compute("stats", [i], [SERIE], lambda: generation["value"])
+        assert value == 1
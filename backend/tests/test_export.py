@@ -0,0 +1,45 @@
+# backend/tests/test_export.py
+from sqlalchemy import select, update
+
+from app import export
+from app.db import init_db
+from app.models import Match, MatchContext
+from app.predictors.rules_v1 import predict_rule_based
+
+
+def test_rows_without_updated_at_are_dated_at_startup(session):
+    session.execute(update(Match).where(Match.id <= 5).values(updated_at=None))
+    session.execute(update(MatchContext).where(MatchContext.match_id <= 5).values(updated_at=None))
+    session.commit()
+    since = "2099-01-01T00:00:00Z"
+    assert not [r for r in export.iter_rows("matches", since=since) if r["id"] <= 5]
+
+    init_db()  # come all'avvio dopo l'aggiunta della colonna
+    session.expire_all()
+    assert session.execute(select(Match.id).where(Match.updated_at.is_(None))).first() is None
+    assert session.execute(select(MatchContext.match_id).where(MatchContext.updated_at.is_(None))).first() is None
+
+    marker = session.execute(select(Match.updated_at).where(Match.id == 1)).scalar()
+    ids = {r["id"] for r in export.iter_rows("matches", since=marker)}
+    assert set(range(1, 6)) <= ids
+
+
+def test_predictions_export_uses_one_session(db, monkeypatch):
+    competition, season = db["competitions"][0], db["last_season"]
+    expected = {}
+    for r in export.iter_rows("matches", competition=competition, season=season):
+        if r["status"] != "FINISHED":
+            expected[r["id"]] = predict_rule_based(r["id"])["probabilities"]
+
+    opened = []
+    real = export.SessionLocal
+    monkeypatch.setattr(export, "SessionLocal", lambda: opened.append(1) or real())
+    monkeypatch.setattr(export, "EXPORT_CHUNK", 7)  # piu' pagine di id
+    rows = list(export.iter_rows("predictions", competition=competition, season=season))
+
+    assert len(opened) == 1
+    assert [r["match_id"] for r in rows] == sorted(expected)
+    assert all(
+        (r["home_win"], r["draw"], r["away_win"]) == tuple(expected[r["match_id"]][k] for k in ("home_win", "draw", "away_win"))
+        for r in rows
+    )
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import select
+
+import update_leagues
+from app.context import rebuild_pairs
+from app.models import Match, MatchContext, MatchRating, TeamRating
+from app.ratings import rebuild_ratings
+from app.snapshots import HEADER, get_snapshot, snapshot_path
+from app.versioning import current_data_version
+
+
+def _payload(m, home_goals, away_goals):
+    return {
+        "id": m.external_id,
+        "status": "FINISHED",
+        "utcDate": m.utc_date,
+        "homeTeam": {"name": m.home_team},
+        "awayTeam": {"name": m.away_team},
+        "score": {"fullTime": {"home": home_goals, "away": away_goals}},
+    }
+
+
+def _ratings(session):
+    session.expire_all()
+    teams = {r.team: (round(r.rating, 9), r.matches, r.last_date) for r in session.query(TeamRating)}
+    matches = {
+        r.match_id: (round(r.home_rating_after, 9), round(r.away_rating_after, 9))
+        for r in session.query(MatchRating)
+    }
+    return teams, matches
+
+
+def _context(session, competition, season):
+    return sorted(session.execute(
+        select(MatchContext.match_id, MatchContext.home_rank_before, MatchContext.away_rank_before)
+        .where(MatchContext.competition == competition, MatchContext.season == season)
+    ).all())
+
+
+@pytest.fixture
+def live(db, session, monkeypatch):
+    """import_live su una sola partita gia' FINISHED, con il risultato ribaltato."""
+    comp, other, season = db["competitions"][0], db["competitions"][1], db["last_season"]
+    m = session.execute(
+        select(Match)
+        .where(Match.competition == comp, Match.season == season, Match.status == "FINISHED")
+        .order_by(Match.date, Match.id)
+        .limit(1)
+    ).scalar()
+    payload = _payload(m, m.away_goals + 3, m.home_goals)
+
+    monkeypatch.setattr(update_leagues, "EXTERNAL_SOURCE", "synthetic")
+    monkeypatch.setattr(update_leagues, "fetch_live_window", lambda *a: [payload])
+    monkeypatch.setattr(update_leagues, "group_by_competition", lambda ms: {(comp, season): ms})
+    monkeypatch.setattr(update_leagues, "run_audit", lambda: None)
+
+    before = current_data_version(max_age=0)
+    update_leagues.import_live()
+    return {"match_id": m.id, "comp": comp, "other": other, "season": season,
+            "score": (m.away_goals + 3, m.home_goals), "before": before}
+
+
+def test_corrected_score_matches_full_rebuild(session, live):
+    got_ratings = _ratings(session)
+    got_context = _context(session, live["comp"], live["season"])
+
+    rebuild_pairs(session, [(live["comp"], live["season"])])
+    rebuild_ratings(session)
+
+    assert got_context == _context(session, live["comp"], live["season"])
+    assert got_ratings == _ratings(session)
+
+
+def test_snapshots_follow_live_version(session, live):
+    version = current_data_version(max_age=0)
+    assert version == live["before"] + 1
+
+    snap = get_snapshot(live["comp"], live["season"])
+    assert snap is not None and snap.data_version == version
+    row = next(r for r in snap.rows()[0] if r.id == live["match_id"])
+    assert (row.home_goals, row.away_goals) == live["score"]
+
+    # coppia non toccata: stesso contenuto, solo ri-timbrata
+    other = get_snapshot(live["other"], live["season"])
+    assert other is not None and other.data_version == version
+    path = snapshot_path(live["other"], live["season"], version)
+    previous = snapshot_path(live["other"], live["season"], version - 1)
+    assert path.read_bytes()[HEADER.size:] == previous.read_bytes()[HEADER.size:]
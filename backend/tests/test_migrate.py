@@ -0,0 +1,68 @@
+# backend/tests/test_migrate.py
+import os
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+import migrate_sqlite_to_postgres as migrate
+
+ROWS = [
+    (1, 2, 1, "Serie A", "FINISHED"),
+    # partita non giocata: gol NULL, stringa vuota da non confondere con NULL
+    (2, None, None, "", "TIMED"),
+    (3, None, 0, None, "tab\tnewline\nback\\slash \\N"),
+]
+
+
+def _parse_copy_text(text):
+    """Lettura del formato COPY text come fa Postgres (\\N = NULL, escape con backslash)."""
+    escapes = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}
+    rows = []
+    for line in text.split("\n")[:-1]:
+        row = []
+        for field in line.split("\t"):
+            if field == "\\N":
+                row.append(None)
+                continue
+            out, i = [], 0
+            while i < len(field):
+                if field[i] == "\\":
+                    out.append(escapes[field[i + 1]])
+                    i += 2
+                else:
+                    out.append(field[i])
+                    i += 1
+            row.append("".join(out))
+        rows.append(tuple(row))
+    return rows
+
+
+def test_copy_text_round_trip_keeps_nulls():
+    parsed = _parse_copy_text(migrate.copy_text(ROWS))
+    expected = [tuple(None if v is None else str(v) for v in r) for r in ROWS]
+    assert parsed == expected
+    assert parsed[1][1] is None and parsed[1][3] == ""
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL non impostata")
+def test_copy_chunk_round_trip_on_postgres():
+    pytest.importorskip("psycopg2")
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    table = Table(
+        "copy_round_trip", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("home_goals", Integer, nullable=True),
+        Column("away_goals", Integer, nullable=True),
+        Column("competition", String, nullable=True),
+        Column("status", String, nullable=True),
+    )
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    try:
+        with engine.begin() as conn:
+            migrate._copy_chunk(conn, table, list(table.columns), ROWS)
+        with engine.connect() as conn:
+            back = [tuple(r) for r in conn.execute(select(table).order_by(table.c.id))]
+        assert back == ROWS
+    finally:
+        table.drop(engine)
@@ -0,0 +1,46 @@
+# backend/tests/test_predict.py
+import pytest
+
+
+@pytest.fixture
+def client(db):
+    from app import create_app
+
+    return create_app().test_client()
+
+
+@pytest.fixture
+def match_id(session):
+    from sqlalchemy import select
+
+    from app.models import Match
+
+    return session.execute(select(Match.id).where(Match.status != "FINISHED").limit(1)).scalar()
+
+
+@pytest.mark.parametrize("weights, message", [
+    ({"rank_pos_weight": "abc"}, "valori non numerici"),
+    ({"rank_pos_weight": True}, "valori non numerici"),
+    ({"rank_pos_weight": float("nan")}, "valori non numerici"),
+    ({"unknown_weight": 1}, "chiavi sconosciute"),
+    ([1, 2], "oggetto"),
+])
+def test_invalid_weights_are_rejected(client, db, match_id, weights, message):
+    resp = client.post("/api/predict", json={"match_id": match_id, "weights": weights})
+    assert resp.status_code == 400 and message in resp.get_json()["error"]
+
+    resp = client.post("/api/predict/whatif", json={
+        "home_team": f"{db['competitions'][0]} FC 01", "away_team": f"{db['competitions'][0]} FC 02",
+        "competition": db["competitions"][0], "season": db["last_season"], "date": "2021-12-01",
+        "weights": weights,
+    })
+    assert resp.status_code == 400 and message in resp.get_json()["error"]
+
+
+def test_valid_weights_change_the_prediction(client, match_id):
+    base = client.post("/api/predict", json={"match_id": match_id, "debug": 0}).get_json()
+    tuned = client.post("/api/predict", json={
+        "match_id": match_id, "debug": 0, "weights": {"rank_pos_weight": 2, "elo_diff_weight": 0.5},
+    }).get_json()
+    assert base["ok"] and tuned["ok"]
+    assert base["probabilities"] != tuned["probabilities"]
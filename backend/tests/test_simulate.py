@@ -0,0 +1,122 @@
+# backend/tests/test_simulate.py
+import random
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from app import simulate
+from app.stats import compute_standings
+
+Row = namedtuple("Row", "home_team away_team home_goals away_goals")
+
+
+def _inputs(teams, finished, remaining, outcome_scores):
+    """Input di simulate_chunk da partite giocate e da giocare con esito fisso."""
+    idx = {t: i for i, t in enumerate(teams)}
+    base = np.zeros((4, len(teams)), dtype=np.int64)
+    for r in finished:
+        h, a = idx[r.home_team], idx[r.away_team]
+        o = simulate._outcome(r.home_goals, r.away_goals)
+        base[0, h] += (3, 1, 0)[o]
+        base[0, a] += (0, 1, 3)[o]
+        base[1, h] += r.home_goals
+        base[2, h] += r.away_goals
+        base[1, a] += r.away_goals
+        base[2, a] += r.home_goals
+        base[3, h] += 1
+        base[3, a] += 1
+    probs = np.zeros((len(remaining), 3))
+    for j, (_home, _away, o) in enumerate(remaining):
+        probs[j, o] = 1.0
+    return {
+        "teams": teams,
+        "base": base,
+        "home": np.array([idx[h] for h, _a, _o in remaining], dtype=np.int64),
+        "away": np.array([idx[a] for _h, a, _o in remaining], dtype=np.int64),
+        "probs": probs,
+        "scores": [np.array([s], dtype=np.int64) for s in outcome_scores],
+    }
+
+
+def _positions(inputs):
+    counts, _points = simulate.simulate_chunk(inputs, 3, seed=1)
+    # esiti certi: ogni simulazione da' la stessa classifica
+    assert (counts.max(axis=1) == 3).all()
+    return {team: int(np.argmax(counts[i])) + 1 for i, team in enumerate(inputs["teams"])}
+
+
+def test_tie_breaks_follow_standings_sort_key():
+    teams = ["A", "B", "C", "X", "Y", "Z"]
+    finished = [
+        # A, B, C: pari punti / diff. reti / gol fatti / giocate, decide il nome
+        Row("A", "Z", 2, 1), Row("B", "Z", 2, 1), Row("C", "Z", 2, 1),
+        # X e Y: 3 punti, diff. 0, 1 gol fatto; X ha giocato una partita in piu'
+        Row("X", "Z", 0, 0), Row("Z", "X", 1, 1), Row("X", "Z", 0, 0),
+        Row("Y", "Z", 1, 0), Row("Z", "Y", 1, 0),
+    ]
+    inputs = _inputs(teams, finished, [], [(1, 0), (1, 1), (0, 1)])
+    expected = {r["team"]: r["rank"] for r in compute_standings(finished)}
+    assert _positions(inputs) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_final_table_matches_compute_standings(seed):
+    rng = random.Random(seed)
+    teams = [f"Team {i:02d}" for i in range(8)]
+    fixtures = [(h, a) for h in teams for a in teams if h != a]
+    rng.shuffle(fixtures)
+    split = rng.randint(0, len(fixtures))
+    # punteggi bassi: molti pari merito da risolvere con gli spareggi
+    finished = [Row(h, a, rng.randint(0, 2), rng.randint(0, 2)) for h, a in fixtures[:split]]
+    outcome_scores = [(1, 0), (0, 0), (0, 1)]
+    remaining = [(h, a, rng.randint(0, 2)) for h, a in fixtures[split:]]
+
+    inputs = _inputs(teams, finished, remaining, outcome_scores)
+    played_out = [Row(h, a, *outcome_scores[o]) for h, a, o in remaining]
+    expected = {r["team"]: r["rank"] for r in compute_standings(finished + played_out)}
+    assert _positions(inputs) == expected
+
+
+def test_same_seed_same_result_in_chunks():
+    rng = random.Random(3)
+    teams = [f"T{i}" for i in range(6)]
+    remaining = [(h, a, 0) for h in teams for a in teams if h != a]
+    inputs = _inputs(teams, [], remaining, [(2, 1), (1, 1), (0, 2)])
+    inputs["probs"] = np.array([[rng.random() + 0.1 for _ in range(3)] for _ in remaining])
+    inputs["probs"] /= inputs["probs"].sum(axis=1, keepdims=True)
+
+    first = simulate.run_simulation(inputs, n=2500, seed=7)
+    second = simulate.run_simulation(inputs, n=2500, seed=7)
+    assert all((a == b).all() for a, b in zip(first, second))
+    assert (first[0].sum(axis=1) == 2500).all() and (first[0].sum(axis=0) == 2500).all()
+
+
+def test_simulate_season_on_db(db):
+    out = simulate.simulate_season(db["competitions"][0], db["last_season"], n=500)
+    assert out["simulations"] == 500 and out["remaining_matches"] > 0
+    assert sum(t["title"] for t in out["teams"]) == pytest.approx(1.0)
+    for t in out["teams"]:
+        assert sum(t["positions"]) == pytest.approx(1.0)
+        assert t["expected_points"] >= t["points"]
+
+
+def test_public_route_ignores_n_and_seed(db, monkeypatch):
+    from app import create_app
+    from app.routes import public
+
+    calls = []
+
+    def fake_simulate(competition, season, **options):
+        calls.append(options)
+        return {"competition": competition, "season": season}
+
+    monkeypatch.setattr(public, "simulate_season", fake_simulate)
+    client = create_app().test_client()
+    competition, season = db["competitions"][0], db["last_season"]
+    for query in ("", "&n=7", "&n=100000&seed=3", "&seed=4"):
+        resp = client.get(f"/api/simulate?competition={competition}&season={season}{query}")
+        assert resp.status_code == 200
+
+    # una sola voce in cache per coppia / modello / posti
+    assert calls == [{"n": simulate.DEFAULT_SIMULATIONS, "model": "rules_v1", "europe": 4, "relegation": 3}]
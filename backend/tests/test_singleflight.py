@@ -0,0 +1,159 @@
+# backend/tests/test_singleflight.py
+import threading
+import time
+
+import pytest
+
+from app import singleflight
+from app.singleflight import NOT_FOUND, SingleFlight
+
+needs_fcntl = pytest.mark.skipif(singleflight.fcntl is None, reason="flock non disponibile")
+
+
+def _keys_on_stripes(sf, n):
+    """n chiavi su stripe diversi."""
+    found = {}
+    i = 0
+    while len(found) < n:
+        found.setdefault(sf._stripe(f"k{i}"), f"k{i}")
+        i += 1
+    return list(found.values())
+
+
+def test_concurrent_calls_share_one_computation():
+    sf = SingleFlight(lock_dir="")
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    def worker():
+        start.wait()
+        results.append(sf.do("key", fn))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 7
+    stats = sf.stats()
+    assert (stats["leaders"], stats["waiters"], stats["in_flight"]) == (1, 7, 0)
+
+
+def test_waiters_receive_the_leader_exception():
+    sf = SingleFlight(lock_dir="")
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    def waiter():
+        started.wait()
+        try:
+            sf.do("key", lambda: "never")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    with pytest.raises(RuntimeError):
+        sf.do("key", failing)
+    t.join()
+    assert errors == ["boom"]
+
+
+def test_same_key_nested_in_own_computation():
+    sf = SingleFlight(lock_dir="", timeout=5)
+    t0 = time.perf_counter()
+    value, shared = sf.do("key", lambda: sf.do("key", lambda: 1)[0] + 1)
+    assert (value, shared) == (2, False)
+    assert time.perf_counter() - t0 < 1
+
+
+@needs_fcntl
+def test_nested_keys_on_same_stripe_do_not_block(tmp_path):
+    # un solo stripe: ogni chiave interna collide con quella esterna
+    sf = SingleFlight(lock_dir=tmp_path, timeout=5, stripes=1)
+    t0 = time.perf_counter()
+    value, _shared = sf.do("bootstrap", lambda: sf.do("predict", lambda: sf.do("standings", lambda: 3)[0])[0])
+    assert value == 3
+    assert time.perf_counter() - t0 < 1
+    stats = sf.stats()
+    assert stats["timeouts"] == 0 and stats["nested_unlocked"] == 2
+
+
+@needs_fcntl
+def test_workers_with_crossed_nesting_do_not_wait_on_each_other(tmp_path):
+    # due "worker" (istanze separate = file aperti separatamente, come due processi)
+    one = SingleFlight(lock_dir=tmp_path, timeout=5, stripes=2)
+    two = SingleFlight(lock_dir=tmp_path, timeout=5, stripes=2)
+    a, b = _keys_on_stripes(one, 2)
+    both_locked = threading.Barrier(2)
+    results = {}
+
+    def run(sf, outer, inner):
+        def compute():
+            both_locked.wait()  # ognuno tiene il proprio stripe e chiede quello dell'altro
+            return sf.do(inner, lambda: inner)[0]
+        results[outer] = sf.do(outer, compute)[0]
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(one, a, b)), threading.Thread(target=run, args=(two, b, a))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {a: b, b: a}
+    assert time.perf_counter() - t0 < 2
+    assert one.stats()["timeouts"] == two.stats()["timeouts"] == 0
+
+
+@needs_fcntl
+def test_file_lock_shares_value_across_workers(tmp_path):
+    one = SingleFlight(lock_dir=tmp_path, timeout=5)
+    two = SingleFlight(lock_dir=tmp_path, timeout=5)
+    store = {}
+    computing = threading.Event()
+
+    def slow():
+        computing.set()
+        time.sleep(0.2)
+        store["key"] = "value"
+        return "value"
+
+    t = threading.Thread(target=one.do, args=("key", slow))
+    t.start()
+    computing.wait()
+    value, shared = two.do("key", lambda: "recomputed", recheck=lambda: store.get("key", NOT_FOUND))
+    t.join()
+    assert (value, shared) == ("value", True)
+    assert two.stats()["shared_across_workers"] == 1
+
+
+@needs_fcntl
+def test_nested_get_or_compute_with_lock_dir(db, tmp_path):
+    from app.cache import Cache, MemoryBackend
+
+    singleflight._singleflight = SingleFlight(lock_dir=tmp_path, timeout=5, stripes=1)
+    cache = Cache(MemoryBackend(16), ttl=60)
+
+    def outer():
+        inner, _hit = cache.get_or_compute("matches", [], ["all"], lambda: [1, 2])
+        return {"matches": inner}
+
+    t0 = time.perf_counter()
+    assert cache.get_or_compute("bootstrap", [None, None], ["all"], outer) == ({"matches": [1, 2]}, False)
+    assert time.perf_counter() - t0 < 1
+    assert cache.get_or_compute("matches", [], ["all"], lambda: None) == ([1, 2], True)
+    assert singleflight._singleflight.stats()["timeouts"] == 0
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import select, update
+
+import update_leagues
+from app.models import Match
+from app.stats import backfill_derived_columns, compute_standings, load_standings
+
+ROW_KEYS = ("external_source", "external_id", "competition", "home_team", "away_team",
+            "utc_date", "date", "status", "season")
+
+
+@pytest.fixture
+def pair(db, session):
+    comp, season = db["competitions"][0], db["last_season"]
+    finished = session.execute(
+        select(Match)
+        .where(Match.competition == comp, Match.season == season, Match.status == "FINISHED")
+        .order_by(Match.date, Match.id)
+    ).scalars().all()
+    return comp, season, finished[0]
+
+
+def _assert_standings(session, comp, season):
+    session.expire_all()
+    matches = session.execute(
+        select(Match).where(Match.competition == comp, Match.season == season, Match.status == "FINISHED")
+    ).scalars().all()
+    assert load_standings(session, comp, season, "9999-12-31") == compute_standings(matches)
+
+
+def test_upsert_score_correction_keeps_standings(session, pair, monkeypatch):
+    comp, season, m = pair
+    monkeypatch.setattr(update_leagues, "EXTERNAL_SOURCE", "synthetic")
+    row = {key: getattr(m, key) for key in ROW_KEYS}
+    # risultato ribaltato: cambiano esito, punti e btts
+    row.update(home_goals=m.away_goals + 2, away_goals=0)
+    assert update_leagues.upsert_matches(session, [row]) == {"inserted": 0, "updated": 1}
+    session.commit()
+
+    _assert_standings(session, comp, season)
+    assert backfill_derived_columns(session) == 0
+
+
+def test_backfill_repairs_raw_score_update(session, pair):
+    comp, season, m = pair
+    # UPDATE che non passa da derived_columns: result/punti restano quelli vecchi
+    session.execute(update(Match).where(Match.id == m.id).values(home_goals=m.away_goals + 2, away_goals=0))
+    session.execute(update(Match).where(Match.status != "FINISHED").values(result="H"))
+    session.commit()
+    scheduled = session.execute(select(Match.id).where(Match.status != "FINISHED")).scalars().all()
+
+    assert backfill_derived_columns(session) == 1 + len(scheduled)
+    _assert_standings(session, comp, season)
+    assert backfill_derived_columns(session) == 0
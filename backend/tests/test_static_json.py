@@ -0,0 +1,63 @@
+# backend/tests/test_static_json.py
+import json
+
+from sqlalchemy import select, update
+
+from app.models import Match
+from app.static_json import publish_static, slug
+
+
+def _manifest(root):
+    return json.loads((root / "manifest.json").read_text(encoding="utf-8"))["files"]
+
+
+def _index_pairs(root):
+    return [(p["competition"], p["season"]) for p in json.loads((root / "index.json").read_text(encoding="utf-8"))["pairs"]]
+
+
+def test_republish_writes_nothing(db, tmp_path):
+    first = publish_static(tmp_path)
+    assert first["written"] == first["files"] > 0
+    again = publish_static(tmp_path)
+    assert (again["written"], again["removed"], again["unchanged"]) == (0, 0, first["files"])
+
+
+def test_partial_run_keeps_other_pairs(db, session, tmp_path):
+    full = publish_static(tmp_path)
+    pairs = _index_pairs(tmp_path)
+    before = _manifest(tmp_path)
+    target = (db["competitions"][0], db["last_season"])
+    prefix = f"{slug(target[0])}/{target[1]}/"
+
+    out = publish_static(tmp_path, pairs=[target])
+    assert out["removed"] == 0 and out["written"] == 0
+    assert out["kept"] == len([rel for rel in before if rel != "index.json" and not rel.startswith(prefix)])
+    assert _manifest(tmp_path) == before
+    assert _index_pairs(tmp_path) == pairs
+    assert all((tmp_path / rel).exists() for rel in before)
+
+    # una partita della coppia giocata: la sua previsione sparisce, le altre coppie no
+    match_id = session.execute(
+        select(Match.id)
+        .where(Match.competition == target[0]).where(Match.season == target[1])
+        .where(Match.status != "FINISHED").limit(1)
+    ).scalar()
+    session.execute(update(Match).where(Match.id == match_id).values(
+        status="FINISHED", home_goals=2, away_goals=0, result="H", total_goals=2, btts=0,
+        home_points=3, away_points=0,
+    ))
+    session.commit()
+
+    out = publish_static(tmp_path, pairs=[target])
+    after = _manifest(tmp_path)
+    assert out["removed"] == 1 and out["written"] > 0
+    assert f"{prefix}predictions/{match_id}.json" not in after
+    assert not (tmp_path / f"{prefix}predictions/{match_id}.json").exists()
+    assert {rel: d for rel, d in after.items() if not rel.startswith(prefix) and rel != "index.json"} == {
+        rel: d for rel, d in before.items() if not rel.startswith(prefix) and rel != "index.json"
+    }
+    assert _index_pairs(tmp_path) == pairs
+
+    # una pubblicazione completa dopo la parziale non trova altro da fare
+    assert publish_static(tmp_path)["written"] == 0
+    assert full["files"] - 1 == len(_manifest(tmp_path))
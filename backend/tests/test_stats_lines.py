@@ -0,0 +1,79 @@
+# backend/tests/test_stats_lines.py
+import random
+
+import pytest
+
+from app import stats
+
+LINES = (0, 0.5, 1, 1.5, 2, 2.25, 2.5, 3, 3.75, 4.5, 7, 12)
+
+
+def _brute(goals, line):
+    over = sum(g > line for g in goals)
+    push = sum(g == line for g in goals)
+    return over, push, len(goals) - over - push
+
+
+def _bucket(results):
+    bucket = stats.empty_bucket()
+    for gf, ga in results:
+        stats.push_match(bucket, gf, ga, stats._result(gf, ga))
+    return bucket
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_line_stats_match_brute_force(seed):
+    rng = random.Random(seed)
+    results = [(rng.randint(0, 5), rng.randint(0, 4)) for _ in range(rng.randint(1, 40))]
+    bucket = _bucket(results)
+    totals = [gf + ga for gf, ga in results]
+    tail = stats.cumulative(bucket["hist_total"])
+
+    for line in LINES:
+        out = stats.line_stats(tail, len(results), line)
+        over, push, under = _brute(totals, line)
+        assert (out["over"], out["under"]) == (over, under), line
+        assert out["over"] + out["under"] + out.get("push", 0) == len(results)
+        if line == int(line):
+            assert out["push"] == push
+            assert out["push_rate"] == pytest.approx(push / len(results))
+        else:
+            # linee .5 e .25/.75: nessun push
+            assert "push" not in out and push == 0
+
+
+def test_push_only_on_integer_lines():
+    tail = stats.cumulative(_bucket([(1, 1), (2, 0), (3, 1), (0, 0)])["hist_total"])
+    assert stats.line_stats(tail, 4, 2) == {
+        "line": 2, "over": 1, "under": 1, "push": 2,
+        "over_rate": 0.25, "under_rate": 0.25, "push_rate": 0.5,
+    }
+    assert "push" not in stats.line_stats(tail, 4, 2.5)
+    assert stats.line_stats(tail, 4, 2.5)["over"] == 1
+
+
+def test_empty_bucket_lines():
+    out = stats.line_stats(stats.cumulative([]), 0, 2.5)
+    assert (out["over"], out["under"], out["over_rate"]) == (0, 0, 0.0)
+
+
+def test_summarize_team_lines_use_scored_and_conceded():
+    results = [(0, 2), (1, 1), (3, 0), (2, 2), (1, 0)]
+    out = stats.summarize(_bucket(results), lines=(0.5, 1, 2.5))["over_under"]
+
+    assert set(out["lines"]) == {"0_5", "1", "2_5"}
+    scored = out["team_lines"]["scored"]
+    conceded = out["team_lines"]["conceded"]
+    assert scored["0_5"]["over"] == sum(gf > 0.5 for gf, _ga in results)
+    assert scored["1"]["push"] == sum(gf == 1 for gf, _ga in results)
+    assert conceded["2_5"]["under"] == sum(ga < 2.5 for _gf, ga in results)
+    # over_25 storico uguale alla linea 2.5
+    assert out["over_25"] == out["lines"]["2_5"]["over"]
+
+
+def test_parse_lines():
+    assert stats.parse_lines(None) is None
+    assert stats.parse_lines("2.5, 0.5,2.5,3") == (0.5, 2.5, 3.0)
+    for raw in ("abc", "-1", str(stats.MAX_LINE_VALUE + 1), ",".join(str(i) for i in range(stats.MAX_LINES + 1))):
+        with pytest.raises(ValueError):
+            stats.parse_lines(raw)
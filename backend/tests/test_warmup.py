@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from app import warmup
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({}, 1),
+    ({"WEB_CONCURRENCY": "3"}, 3),
+    ({"WEB_CONCURRENCY": "x"}, 1),
+    ({"GUNICORN_CMD_ARGS": "--bind 0.0.0.0:8000 -w 4"}, 4),
+    ({"GUNICORN_CMD_ARGS": "--workers=2 --timeout 60"}, 2),
+    ({"GUNICORN_CMD_ARGS": "-w5"}, 5),
+    ({"WEB_CONCURRENCY": "2", "GUNICORN_CMD_ARGS": "-w 6"}, 2),
+])
+def test_server_workers(monkeypatch, env, expected):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("GUNICORN_CMD_ARGS", raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert warmup.server_workers() == expected
+
+
+def test_memory_backend_with_several_workers_skips(db, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    assert "memory" in warmup.warm_cache()["skipped"]
+    assert "memory" in warmup.start_warmup()["skipped"]
+
+
+def test_background_warmup_queues_and_merges(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("GUNICORN_CMD_ARGS", raising=False)
+    monkeypatch.setattr(warmup, "_skip_reason", lambda: None)
+    monkeypatch.setattr(warmup, "_bg", {"thread": None, "queued": False, "queued_pairs": None, "last": None})
+
+    release = threading.Event()
+    calls = []
+
+    def fake_warm(pairs=None):
+        calls.append(pairs)
+        release.wait(5)
+        return {"pairs": pairs}
+
+    monkeypatch.setattr(warmup, "warm_cache", fake_warm)
+    assert warmup.start_warmup([("B", 2021)]) == {"started": True}
+    thread = warmup._bg["thread"]
+    # durante il giro in corso le richieste si accodano in uno solo
+    assert warmup.start_warmup([("A", 2021)]) == {"queued": True}
+    assert warmup.start_warmup([("B", 2021), ("C", 2020)]) == {"queued": True}
+    assert warmup.warmup_status()["running"]
+
+    release.set()
+    thread.join(5)
+    assert calls == [[("B", 2021)], [("A", 2021), ("B", 2021), ("C", 2020)]]
+    status = warmup.warmup_status()
+    assert not status["running"] and not status["queued"]
+    assert status["last"] == {"pairs": [("A", 2021), ("B", 2021), ("C", 2020)]}
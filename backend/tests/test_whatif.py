@@ -0,0 +1,55 @@
+import threading
+
+from app.predictors import whatif
+
+
+def _blocking_loader(monkeypatch, blocked_key):
+    """load_season_state che si ferma su blocked_key finche' release non e' settato."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    real = whatif.load_season_state
+
+    def load(session, competition, season, version):
+        calls.append((competition, season))
+        if (competition, season) == blocked_key:
+            started.set()
+            release.wait(5)
+        return real(session, competition, season, version)
+
+    monkeypatch.setattr(whatif, "load_season_state", load)
+    monkeypatch.setattr(whatif, "_states", whatif.OrderedDict())
+    monkeypatch.setattr(whatif, "_loading", {})
+    return started, release, calls
+
+
+def test_slow_load_does_not_block_other_pairs(db, monkeypatch):
+    slow = (db["competitions"][0], db["last_season"])
+    other = (db["competitions"][1], db["last_season"])
+    started, release, _calls = _blocking_loader(monkeypatch, slow)
+
+    t = threading.Thread(target=whatif.get_season_state, args=slow)
+    t.start()
+    try:
+        assert started.wait(5)
+        assert whatif.get_season_state(*other).competition == other[0]
+    finally:
+        release.set()
+        t.join(5)
+
+
+def test_concurrent_requests_load_once(db, monkeypatch):
+    key = (db["competitions"][0], db["last_season"])
+    started, release, calls = _blocking_loader(monkeypatch, key)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(whatif.get_season_state(*key))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    assert started.wait(5)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [key]
+    assert len(results) == 4 and all(r is results[0] for r in results)
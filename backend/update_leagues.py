@@ -1,14 +1,25 @@
-﻿import os
+﻿import argparse
+import os
+import time
+from datetime import date, timedelta
+
 import requests
-from app.models import Match
-from app.db import SessionLocal
+from sqlalchemy import insert, update
+
+from app.archive import archive_payload, iter_entries, load_payload
+from app.audit import run_audit
+from app.context import advance_context, rebuild_pairs
+from app.models import Match, derived_columns, pair_key_for
+from app.db import SessionLocal, init_db
+from app.ratings import rebuild_ratings, rewind_ratings, update_ratings
+from app.snapshots import publish_snapshots
+from app.static_json import STATIC_JSON_DIR, publish_static
+from app.versioning import bump_data_version, pair_tag
 
 API_KEY = os.getenv("FOOTBALL_DATA_API_KEY")
-if not API_KEY:
-    raise RuntimeError("Missing FOOTBALL_DATA_API_KEY env var")
 
 BASE_URL = "https://api.football-data.org/v4/competitions/{code}/matches"
-HEADERS = {"X-Auth-Token": API_KEY}
+LIVE_URL = "https://api.football-data.org/v4/matches"
 
 EXTERNAL_SOURCE = "football-data"
 
@@ -24,24 +35,49 @@ LEAGUES = [
 SEASONS = [2024, 2025]
 
 
+# Status intermedi di Football-Data che teniamo cosi' come sono (partita in corso / sospesa)
+LIVE_STATUSES = {"IN_PLAY", "PAUSED", "EXTRA_TIME", "PENALTY_SHOOTOUT", "SUSPENDED"}
+KEPT_STATUSES = LIVE_STATUSES | {"POSTPONED", "CANCELLED", "AWARDED"}
+
+
 def convert_status(api_status: str) -> str:
     """
     Converte lo status di Football-Data in uno dei nostri:
     - FINISHED
-    - UPCOMING
+    - UPCOMING (SCHEDULED / TIMED)
+    - gli status intermedi (IN_PLAY, PAUSED, POSTPONED, ...) restano invariati
+    Tutto il codice di lettura filtra su FINISHED / != FINISHED, quindi gli
+    status intermedi restano "non giocate" per stats e classifiche.
     """
     if api_status == "FINISHED":
         return "FINISHED"
+    if api_status in KEPT_STATUSES:
+        return api_status
     return "UPCOMING"
 
 
+def api_headers():
+    # la chiave serve solo per scaricare: il replay dall'archivio gira senza
+    if not API_KEY:
+        raise RuntimeError("Missing FOOTBALL_DATA_API_KEY env var")
+    return {"X-Auth-Token": API_KEY}
+
+
+def archive_response(response, kind: str, params: dict) -> None:
+    """Copia grezza della risposta nell'archivio; un errore su disco non blocca l'import."""
+    try:
+        archive_payload(response.content, kind, params)
+    except OSError as e:
+        print(f"⚠️ Archivio non scritto ({kind} {params}): {e}")
+
+
 def fetch_matches(league_code: str, season: int):
     print(f"ðŸ”„ Recupero partite per {league_code}, stagione {season}...")
     url = BASE_URL.format(code=league_code)
     params = {"season": season}
 
     try:
-        response = requests.get(url, headers=HEADERS, params=params, timeout=30)
+        response = requests.get(url, headers=api_headers(), params=params, timeout=30)
     except requests.RequestException as e:
         print(f"âŒ Errore di rete per {league_code} {season}: {e}")
         return None
@@ -54,89 +90,343 @@ def fetch_matches(league_code: str, season: int):
         )
         return None
 
+    archive_response(response, "season", {"code": league_code, "season": season})
     data = response.json()
     return data.get("matches", [])
 
 
+def fetch_live_window(days_back: int = 1, days_ahead: int = 1):
+    """
+    Una sola richiesta per tutte le leghe: partite nella finestra [oggi-back, oggi+ahead].
+    """
+    today = date.today()
+    params = {
+        "competitions": ",".join(league["code"] for league in LEAGUES),
+        "dateFrom": (today - timedelta(days=days_back)).isoformat(),
+        "dateTo": (today + timedelta(days=days_ahead)).isoformat(),
+    }
+    print(f"🔄 Live: partite dal {params['dateFrom']} al {params['dateTo']}...")
+
+    try:
+        response = requests.get(LIVE_URL, headers=api_headers(), params=params, timeout=30)
+    except requests.RequestException as e:
+        print(f"❌ Errore di rete (live): {e}")
+        return None
+
+    if response.status_code != 200:
+        print("❌ Errore API (live):", response.status_code, response.text)
+        return None
+
+    archive_response(response, "live", params)
+    return response.json().get("matches", [])
+
+
+def has_score(status: str) -> bool:
+    return status == "FINISHED" or status in LIVE_STATUSES
+
+
+def match_row(m, competition_name: str, season: int):
+    """Payload Football-Data -> colonne di Match (None se la partita non ha id)."""
+    match_external_id = m.get("id")
+    if match_external_id is None:
+        return None
+
+    status = convert_status(m.get("status", ""))
+
+    # Date
+    utc_date = m.get("utcDate") or ""
+    date_only = utc_date[:10] if len(utc_date) >= 10 else ""  # YYYY-MM-DD
+
+    # Goals (FINISHED o punteggio parziale se in corso)
+    home_goals = None
+    away_goals = None
+    if has_score(status):
+        ft = ((m.get("score") or {}).get("fullTime")) or {}
+        home_goals = ft.get("home")
+        away_goals = ft.get("away")
+
+    return {
+        "external_source": EXTERNAL_SOURCE,
+        "external_id": match_external_id,
+        "competition": competition_name,
+        "home_team": (m.get("homeTeam") or {}).get("name") or "",
+        "away_team": (m.get("awayTeam") or {}).get("name") or "",
+        "utc_date": utc_date,
+        "date": date_only,
+        "status": status,
+        "home_goals": home_goals,
+        "away_goals": away_goals,
+        "season": season,
+    }
+
+
+def group_by_competition(matches):
+    """Partite di /v4/matches (piu' leghe) raggruppate per (nome lega, stagione)."""
+    names = {league["code"]: league["name"] for league in LEAGUES}
+    groups = {}
+    for m in matches:
+        code = (m.get("competition") or {}).get("code")
+        start = ((m.get("season") or {}).get("startDate") or "")[:4]
+        if code not in names or not start.isdigit():
+            continue
+        groups.setdefault((names[code], int(start)), []).append(m)
+    return groups
+
+
 def import_matches(matches, competition_name: str, season: int):
+    """
+    Upsert per (external_source, external_id).
+    Ritorna un riepilogo con le righe davvero cambiate, se qualche partita
+    e' appena diventata FINISHED (serve per aggiornare context ed Elo) e i
+    risultati FINISHED corretti, con la data del primo (corrected_from).
+    """
     session = SessionLocal()
 
     inserted = 0
     updated = 0
+    changed = 0
+    newly_finished = 0
+    corrected = 0
+    corrected_from = None
 
     for m in matches:
-        match_external_id = m.get("id")
-        if match_external_id is None:
+        row = match_row(m, competition_name, season)
+        if row is None:
             # match senza id -> ignoriamo
             continue
 
-        status = convert_status(m.get("status", ""))
-
-        # Date
-        utc_date = m.get("utcDate") or ""
-        date_only = utc_date[:10] if len(utc_date) >= 10 else ""  # YYYY-MM-DD
-
-        # Teams
-        home_team = (m.get("homeTeam") or {}).get("name") or ""
-        away_team = (m.get("awayTeam") or {}).get("name") or ""
-
-        # Goals (solo se FINISHED)
-        home_goals = None
-        away_goals = None
-        if status == "FINISHED":
-            ft = ((m.get("score") or {}).get("fullTime")) or {}
-            home_goals = ft.get("home")
-            away_goals = ft.get("away")
-
         # Cerca per (external_source, external_id) â€” non per PK interna!
         db_match = (
             session.query(Match)
             .filter(Match.external_source == EXTERNAL_SOURCE)
-            .filter(Match.external_id == match_external_id)
+            .filter(Match.external_id == row["external_id"])
             .first()
         )
 
         if db_match is None:
             # Nuova partita
-            new_match = Match(
-                external_source=EXTERNAL_SOURCE,
-                external_id=match_external_id,
-                competition=competition_name,
-                home_team=home_team,
-                away_team=away_team,
-                utc_date=utc_date,
-                date=date_only,
-                status=status,
-                home_goals=home_goals,
-                away_goals=away_goals,
-                season=season,
-            )
-            session.add(new_match)
+            session.add(Match(**row))
             inserted += 1
+            if row["status"] == "FINISHED":
+                newly_finished += 1
         else:
+            if row["status"] == "FINISHED" and db_match.status != "FINISHED":
+                newly_finished += 1
+            elif db_match.status == "FINISHED" and (
+                row["status"] != "FINISHED"
+                or (row["home_goals"], row["away_goals"]) != (db_match.home_goals, db_match.away_goals)
+                or row["date"] != db_match.date
+            ):
+                # risultato gia' contato da context ed Elo che cambia
+                corrected += 1
+                first = min(filter(None, (db_match.date, row["date"])), default=None)
+                if first and (corrected_from is None or first < corrected_from):
+                    corrected_from = first
+
             # Aggiorna dati base
-            db_match.competition = competition_name
-            db_match.home_team = home_team
-            db_match.away_team = away_team
-            db_match.utc_date = utc_date
-            db_match.date = date_only
-            db_match.status = status
-            db_match.season = season
-
-            # NON sovrascrivere gol se non FINISHED (evita di cancellare score)
-            if status == "FINISHED":
-                db_match.home_goals = home_goals
-                db_match.away_goals = away_goals
+            for key in ("competition", "home_team", "away_team", "utc_date", "date", "status", "season"):
+                setattr(db_match, key, row[key])
+
+            # NON sovrascrivere gol se non FINISHED / in corso (evita di cancellare score)
+            if has_score(row["status"]):
+                db_match.home_goals = row["home_goals"]
+                db_match.away_goals = row["away_goals"]
 
             updated += 1
+            if session.is_modified(db_match):
+                changed += 1
 
     session.commit()
     session.close()
 
     print(f"âœ… {competition_name} {season} â†’ Inseriti: {inserted} | Aggiornati: {updated}")
+    return {
+        "inserted": inserted, "updated": updated, "changed": changed,
+        "newly_finished": newly_finished, "corrected": corrected, "corrected_from": corrected_from,
+    }
+
+
+def import_live(days_back: int = 1, days_ahead: int = 1):
+    """
+    Ingest "live": solo le partite nella finestra di date, poi context ed Elo
+    avanzati in modo incrementale per le sole coppie con risultati nuovi.
+    Un risultato FINISHED corretto ricostruisce il context della sua coppia e
+    rigioca l'Elo dal giorno della partita in poi.
+    """
+    matches = fetch_live_window(days_back, days_ahead)
+    if matches is None:
+        raise SystemExit(1)
+
+    groups = group_by_competition(matches)
+
+    touched = []
+    changed_pairs = []
+    corrected = []
+    corrected_from = None
+    writes = 0
+    for (name, season), group in sorted(groups.items()):
+        summary = import_matches(group, name, season)
+        writes += summary["inserted"] + summary["changed"]
+        if summary["inserted"] or summary["changed"]:
+            changed_pairs.append((name, season))
+        if summary["corrected"]:
+            corrected.append((name, season))
+            first = summary["corrected_from"]
+            if first and (corrected_from is None or first < corrected_from):
+                corrected_from = first
+        elif summary["newly_finished"]:
+            touched.append((name, season))
+
+    session = SessionLocal()
+    version = None
+    try:
+        ctx_written = 0
+        for name, season in touched:
+            ctx_written += advance_context(session, name, season)
+        for report in rebuild_pairs(session, corrected):
+            ctx_written += report["inserted"]
+        if corrected_from is not None:
+            rewind_ratings(session, corrected_from)
+        rated = update_ratings(session)
+        dirty = changed_pairs + touched + corrected
+        if writes or ctx_written or rated:
+            # cache: solo le coppie con righe cambiate; una correzione rigioca
+            # l'Elo di tutte le squadre, quindi si invalida tutto
+            tags = None if corrected else [pair_tag(n, s) for n, s in dirty]
+            version = bump_data_version(session, tags=tags)
+        session.commit()
+    finally:
+        session.close()
+    if version is not None:
+        # le altre coppie non sono cambiate: il loro file viene solo ri-timbrato
+        publish_snapshots(version, pairs=dirty)
+        run_audit()
+
+    print(f"🏁 Live: {len(matches)} partite in finestra | righe scritte: {writes} | "
+          f"context: {ctx_written} | Elo: {rated}")
+
+
+def upsert_matches(session, rows) -> dict:
+    """
+    Upsert bulk per (external_source, external_id): una query per gli id
+    esistenti, poi INSERT e UPDATE per PK in executemany, niente ORM per riga.
+    Stessa regola di import_matches sui gol. Non fa commit.
+    """
+    existing = dict(
+        session.query(Match.external_id, Match.id)
+        .filter(Match.external_source == EXTERNAL_SOURCE)
+        .all()
+    )
+
+    new_rows = []
+    updates = []
+    for row in rows:
+        row = dict(
+            row,
+            pair_key=pair_key_for(row["home_team"], row["away_team"]),
+            **derived_columns(row["status"], row["home_goals"], row["away_goals"]),
+        )
+        match_id = existing.get(row["external_id"])
+        if match_id is None:
+            new_rows.append(row)
+            continue
+        if not has_score(row["status"]):
+            del row["home_goals"], row["away_goals"]
+        del row["external_source"], row["external_id"]
+        updates.append(dict(row, id=match_id))
+
+    if new_rows:
+        session.execute(insert(Match), new_rows)
+    if updates:
+        session.execute(update(Match), updates)
+    return {"inserted": len(new_rows), "updated": len(updates)}
+
+
+def replay_archive(root=None):
+    """
+    Ricostruisce matches dall'archivio delle risposte, senza rete.
+    Le risposte vengono rigiocate in ordine di fetch (per ogni partita vince
+    l'ultima), poi upsert bulk, rebuild di match_context ed Elo da zero.
+    """
+    init_db()
+    names = {league["code"]: league["name"] for league in LEAGUES}
+    t0 = time.perf_counter()
+
+    latest = {}
+    payloads = 0
+    for entry in iter_entries(root):
+        try:
+            data = load_payload(entry["sha256"], root)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Payload {entry.get('sha256')} saltato: {e}")
+            continue
+        payloads += 1
+
+        params = entry.get("params") or {}
+        if entry.get("kind") == "season":
+            name = names.get(params.get("code"))
+            if name is None:
+                continue
+            groups = {(name, params.get("season")): data.get("matches", [])}
+        else:
+            groups = group_by_competition(data.get("matches", []))
+
+        for (name, season), matches in groups.items():
+            for m in matches:
+                row = match_row(m, name, season)
+                if row is None:
+                    continue
+                prev = latest.get(row["external_id"])
+                if prev is not None and not has_score(row["status"]):
+                    row["home_goals"], row["away_goals"] = prev["home_goals"], prev["away_goals"]
+                latest[row["external_id"]] = row
+    t1 = time.perf_counter()
+
+    session = SessionLocal()
+    try:
+        summary = upsert_matches(session, list(latest.values()))
+        session.commit()
+        t2 = time.perf_counter()
+
+        pairs = sorted({(r["competition"], r["season"]) for r in latest.values()})
+        rebuild_pairs(session, pairs)
+        rated = rebuild_ratings(session)
+        version = bump_data_version(session)
+        session.commit()
+    finally:
+        session.close()
+    publish_snapshots(version)
+    audit = run_audit()
+    t3 = time.perf_counter()
+
+    print(f"♻️ Replay: {payloads} payload, {len(latest)} partite | Inseriti: {summary['inserted']} | "
+          f"Aggiornati: {summary['updated']} | Elo: {rated}")
+    print(f"   lettura {t1 - t0:.2f}s | upsert {t2 - t1:.2f}s | context+Elo {t3 - t2:.2f}s")
+    print(f"🔎 Audit: {audit['new_findings']} anomalie su {audit['matches_checked']} partite controllate")
+    return summary
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Import partite da football-data.org")
+    parser.add_argument("--live", action="store_true", help="solo la finestra di date intorno a oggi")
+    parser.add_argument("--days-back", type=int, default=1)
+    parser.add_argument("--days-ahead", type=int, default=1)
+    parser.add_argument("--replay", action="store_true", help="ricostruisce dall'archivio delle risposte, senza rete")
+    parser.add_argument("--archive-dir", help="archivio da usare con --replay (default: RAW_ARCHIVE_DIR)")
+    parser.add_argument("--no-audit", action="store_true",
+                        help="niente audit a fine import (lo lancia il chiamante, es. /api/admin/import)")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay_archive(args.archive_dir)
+        return
+
+    if args.live:
+        import_live(args.days_back, args.days_ahead)
+        return
+
+    changed_pairs = []
+    corrected_from = None
     for league in LEAGUES:
         code = league["code"]
         name = league["name"]
@@ -147,7 +437,35 @@ def main():
                 print(f"âš ï¸ Nessuna partita per {name} {season}")
                 continue
 
-            import_matches(matches, name, season)
+            summary = import_matches(matches, name, season)
+            if summary["inserted"] or summary["changed"]:
+                changed_pairs.append((name, season))
+            first = summary["corrected_from"]
+            if first and (corrected_from is None or first < corrected_from):
+                corrected_from = first
+
+    # context delle coppie cambiate + Elo incrementale (solo i risultati nuovi,
+    # o dal primo risultato corretto in poi); la cache perde solo le voci di
+    # quelle coppie, tutta se l'Elo e' stato rigiocato
+    session = SessionLocal()
+    try:
+        rebuild_pairs(session, changed_pairs)
+        if corrected_from is not None:
+            rewind_ratings(session, corrected_from)
+        rated = update_ratings(session)
+        tags = None if corrected_from is not None else [pair_tag(n, s) for n, s in changed_pairs]
+        version = bump_data_version(session, tags=tags)
+        session.commit()
+    finally:
+        session.close()
+    publish_snapshots(version, pairs=changed_pairs)
+    print(f"📈 Elo aggiornato per {rated} nuove partite")
+    if not args.no_audit:
+        audit = run_audit()
+        print(f"🔎 Audit: {audit['new_findings']} anomalie su {audit['matches_checked']} partite controllate")
+    if STATIC_JSON_DIR:
+        published = publish_static()
+        print(f"🗂️ JSON statici: {published['written']} file scritti, {published['unchanged']} invariati in {published['out_dir']}")
 
     print("ðŸ Import completato per tutte le leghe e stagioni richieste.")
 
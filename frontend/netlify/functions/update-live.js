@@ -0,0 +1,18 @@
+export async function handler() {
+  const res = await fetch(
+    "https://predizioni-sito.onrender.com/api/admin/import-live",
+    {
+      method: "POST",
+      headers: {
+        "X-Admin-Token": process.env.ADMIN_TOKEN,
+        "Content-Type": "application/json"
+      },
+      body: JSON.stringify({ days_back: 1, days_ahead: 1 })
+    }
+  );
+
+  return {
+    statusCode: res.status,
+    body: await res.text()
+  };
+}
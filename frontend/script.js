@@ -424,6 +424,22 @@ function renderStats(stats) {
   setText("stats-form10-ga", f10.goals_conceded ?? 0);
 }
 
+function renderTeamOptions(teams) {
+  const sel = $("stats-team");
+  if (!sel) return;
+  const current = sel.value;
+
+  sel.innerHTML = `<option value="">Seleziona squadra</option>`;
+  teams.forEach((t) => {
+    const opt = document.createElement("option");
+    opt.value = t;
+    opt.textContent = t;
+    sel.appendChild(opt);
+  });
+
+  if ([...sel.options].some((o) => o.value === current)) sel.value = current;
+}
+
 async function fetchTeamsForFilters() {
   clearUserMessage();
   const competition = $("stats-competition")?.value || "";
@@ -437,20 +453,7 @@ async function fetchTeamsForFilters() {
 
   try {
     const data = await fetchJSON(url, {}, { label: "fetch teams", timeoutMs: 20000 });
-
-    const sel = $("stats-team");
-    if (!sel) return;
-    const current = sel.value;
-
-    sel.innerHTML = `<option value="">Seleziona squadra</option>`;
-    (data.teams || []).forEach((t) => {
-      const opt = document.createElement("option");
-      opt.value = t;
-      opt.textContent = t;
-      sel.appendChild(opt);
-    });
-
-    if ([...sel.options].some((o) => o.value === current)) sel.value = current;
+    renderTeamOptions(data.teams || []);
     return;
   } catch (e) {
     console.warn("fetchTeamsForFilters primary failed:", e);
@@ -544,8 +547,6 @@ function setStatsView(view) {
   if (bOverall) bOverall.addEventListener("click", () => setStatsView("overall"));
   if (bHome) bHome.addEventListener("click", () => setStatsView("home"));
   if (bAway) bAway.addEventListener("click", () => setStatsView("away"));
-
-  fetchTeamsForFilters();
 })();
 
 /* =========================
@@ -794,8 +795,6 @@ async function predict() {
 }
 
 (function initPredictions() {
-  fetchMatchesForPredictions();
-
   const btn = $("predict-button");
   if (btn) btn.addEventListener("click", () => predict());
 
@@ -804,3 +803,26 @@ async function predict() {
   if (compSel) compSel.addEventListener("change", () => renderPredMatchSelect());
   if (seasonSel) seasonSel.addEventListener("change", () => renderPredMatchSelect());
 })();
+
+/* =========================
+   Bootstrap: squadre + match futuri in un solo round-trip
+========================= */
+(async function bootstrapPage() {
+  const competition = $("stats-competition")?.value || "";
+  const season = $("stats-season")?.value || "";
+  const params = new URLSearchParams();
+  if (competition) params.set("competition", competition);
+  if (season) params.set("season", season);
+
+  try {
+    const data = await fetchJSON(`${BACKEND_URL}/api/bootstrap?${params.toString()}`, {}, { label: "bootstrap", timeoutMs: 25000 });
+    renderTeamOptions(data.teams || []);
+    upcomingMatchesCache = Array.isArray(data.matches) ? data.matches : [];
+    buildPredFiltersFromMatches();
+  } catch (e) {
+    // backend senza /api/bootstrap: chiamate separate come prima
+    console.warn("bootstrap failed:", e);
+    fetchTeamsForFilters();
+    fetchMatchesForPredictions();
+  }
+})();